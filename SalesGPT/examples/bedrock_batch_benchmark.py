@@ -0,0 +1,127 @@
+"""
+Measures BedrockCustomModel.abatch throughput at different concurrency levels.
+
+Runs against Bedrock with the credentials from .env by default. Pass
+--simulated-latency to replay the same batch against an in-process stand-in
+for the Bedrock runtime, which is useful to compare concurrency settings
+without spending tokens:
+
+    python examples/bedrock_batch_benchmark.py --requests 32 --concurrency 1 4 8 16
+    python examples/bedrock_batch_benchmark.py --simulated-latency 0.8 --throttle-above 8
+"""
+import argparse
+import asyncio
+import io
+import json
+import time
+from unittest.mock import patch
+
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from salesgpt.models import BedrockCustomModel
+
+load_dotenv()
+
+
+class SimulatedBedrockRuntime:
+    """Answers invoke_model after a fixed delay and throttles above a concurrency limit."""
+
+    def __init__(self, latency: float, throttle_above: int):
+        self.latency = latency
+        self.throttle_above = throttle_above
+        self.in_flight = 0
+        self.throttled = 0
+
+    async def invoke_model(self, body, modelId):
+        self.in_flight += 1
+        try:
+            if self.throttle_above and self.in_flight > self.throttle_above:
+                self.throttled += 1
+                raise ClientError(
+                    {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                    "InvokeModel",
+                )
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        payload = json.dumps({"content": [{"type": "text", "text": "Hello!"}]}).encode()
+        return {"body": _AsyncBody(payload)}
+
+
+class _AsyncBody:
+    def __init__(self, payload: bytes):
+        self._body = io.BytesIO(payload)
+
+    async def read(self):
+        return self._body.read()
+
+
+class _SimulatedManager:
+    def __init__(self, runtime):
+        self.runtime = runtime
+
+    async def aclient(self, region_name=None):
+        return self.runtime
+
+
+async def run_level(model, prompts, concurrency):
+    start = time.perf_counter()
+    results = await model.abatch(
+        prompts, config={"max_concurrency": concurrency}, return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    failures = sum(isinstance(result, Exception) for result in results)
+    return elapsed, failures
+
+
+async def main(args):
+    model = BedrockCustomModel(
+        type="bedrock-model",
+        model=args.model,
+        system_prompt="You are a helpful assistant.",
+        throttle_backoff=args.throttle_backoff,
+    )
+    prompts = [
+        f"Write a one sentence opener for a mattress sales call #{i}."
+        for i in range(args.requests)
+    ]
+
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>7} {'failed':>6} {'throttled':>9}")
+    for concurrency in args.concurrency:
+        runtime = None
+        if args.simulated_latency is not None:
+            runtime = SimulatedBedrockRuntime(args.simulated_latency, args.throttle_above)
+            with patch(
+                "salesgpt.bedrock.get_bedrock_client_manager",
+                return_value=_SimulatedManager(runtime),
+            ):
+                elapsed, failures = await run_level(model, prompts, concurrency)
+        else:
+            elapsed, failures = await run_level(model, prompts, concurrency)
+        throttled = runtime.throttled if runtime else "-"
+        print(
+            f"{concurrency:>11} {elapsed:>8.2f} {args.requests / elapsed:>7.2f} "
+            f"{failures:>6} {throttled:>9}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--model", default="anthropic.claude-3-haiku-20240307-v1:0")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--throttle-backoff", type=float, default=0.5)
+    parser.add_argument(
+        "--simulated-latency",
+        type=float,
+        default=None,
+        help="Seconds per request for the simulated runtime; omit to call Bedrock.",
+    )
+    parser.add_argument(
+        "--throttle-above",
+        type=int,
+        default=0,
+        help="Simulated runtime throttles requests above this many in flight (0 = never).",
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -1,18 +1,72 @@
+import asyncio
 import json
+import logging
 import os
-from typing import List, Optional
+import threading
+import uuid
+from typing import Callable, List, Optional
+
+from salesgpt.prewarm import activate_prewarm_artifact
+from salesgpt.startup import Readiness, install_readiness
+
+# Created before the heavy imports below so /ready can report how long they took.
+readiness = Readiness()
+# Use the tokenizer files baked into the image before litellm loads its encoding.
+prewarm_artifact = activate_prewarm_artifact()
 
 import uvicorn
-from dotenv import load_dotenv
-from fastapi import FastAPI, Query, Header, HTTPException, Depends
+from fastapi import FastAPI, Query, Header, HTTPException, Depends, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
+from salesgpt.accounting import get_usage_accountant
+from salesgpt.admission import (
+    PRIORITIES,
+    AdmissionRejected,
+    current_priority,
+    install_admission_control,
+)
+from salesgpt.bedrock import get_bedrock_client_manager
+from salesgpt.deadlines import (
+    DeadlineExceeded,
+    cancel_on_disconnect,
+    deadline_scope,
+    deadline_settings,
+    install_deadlines,
+    run_within_deadline,
+)
+from salesgpt.http_client import get_http_client
+from salesgpt.llm_cache import configure_llm_cache_from_env
+from salesgpt.logger import setup_logging
+from salesgpt.metrics import get_app_metrics, instrument_app
 from salesgpt.salesgptapi import SalesGPTAPI
+from salesgpt.scheduling import warm_scheduling_link_pool
+from salesgpt.session_backends import SessionConflictError, session_backend_from_env
+from salesgpt.settings import ApiSettings, get_settings, get_settings_store
+from salesgpt.sessions import (
+    SessionStore,
+    run_periodically,
+    session_store_settings,
+    session_sweep_interval,
+)
+from salesgpt.tracing import add_span_listener, configure_tracing_from_env, get_span_exporter
+from salesgpt.turns import (
+    SessionBusyError,
+    TurnSerializer,
+    request_fingerprint,
+    turn_serializer_settings,
+)
+from salesgpt.ws_chat import ChatSocket
 
-# Load environment variables
-load_dotenv()
+# Load environment variables once; handlers read the parsed snapshot, reloaded on SIGHUP
+settings_store = get_settings_store()
+setup_logging()
+configure_llm_cache_from_env()
+configure_tracing_from_env()
+
+logger = logging.getLogger(__name__)
 
 # Access environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -34,15 +88,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def watch_settings():
+    """Reloads settings on SIGHUP and when .env or the agent config changes."""
+    settings_store.install_sighup()
+    settings_store.start()
+
+
+@app.on_event("startup")
+async def warm_up():
+    """Builds the agent template in the background; /ready answers 503 until it is done."""
+    steps = [("agent_template", get_agent_template)]
+    if settings_store.get().use_tools:
+        # Once per process: sessions take pre-created booking links from the shared pool.
+        steps.append(("scheduling_links", warm_scheduling_link_pool))
+    # Keep a reference so the task is not garbage collected while it runs.
+    app.state.warmup = asyncio.ensure_future(readiness.warm_up(steps))
+
+
+@app.on_event("startup")
+async def expire_sessions():
+    """Evicts idle sessions and deletes expired spilled and shared state in the background."""
+    interval = session_sweep_interval()
+    app.state.session_expiry = [asyncio.ensure_future(run_periodically(sessions.expire, interval))]
+    if session_backend is not None:
+        app.state.session_expiry.append(
+            asyncio.ensure_future(run_periodically(session_backend.prune, interval))
+        )
+
+
+@app.on_event("shutdown")
+async def close_pooled_clients():
+    """Closes long-lived clients, flushes pending spans and spills live sessions to disk."""
+    for task in getattr(app.state, "session_expiry", []):
+        task.cancel()
+    await get_bedrock_client_manager().aclose()
+    await get_http_client().aclose()
+    settings_store.stop()
+    exporter = get_span_exporter()
+    if exporter is not None:
+        exporter.shutdown()
+    # Keep in-flight conversations resumable across restarts.
+    sessions.spill_all()
+    if session_backend is not None:
+        session_backend.close()
+
+
 class AuthenticatedResponse(BaseModel):
     message: str
 
-def get_auth_key(authorization: str = Header(...)) -> None:
-    auth_key = os.getenv("AUTH_KEY")
-    if not auth_key:
+def get_auth_key(authorization: Optional[str], settings: ApiSettings) -> None:
+    if not settings.auth_key:
         raise HTTPException(status_code=500, detail="AUTH_KEY not configured")
-    expected_header = f"Bearer {auth_key}"
-    if authorization != expected_header:
+    if not settings.authorized(authorization):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
 @app.get("/")
@@ -55,29 +153,133 @@ class MessageList(BaseModel):
     human_say: str
 
 
-sessions = {}
+_agent_template: Optional[SalesGPTAPI] = None
+_agent_template_lock = threading.Lock()
+
+
+def get_agent_template() -> SalesGPTAPI:
+    """The agent built once from the configured settings; every session is cloned from it."""
+    global _agent_template
+    with _agent_template_lock:
+        if _agent_template is None:
+            settings = settings_store.get()
+            _agent_template = SalesGPTAPI(
+                config_path=settings.config_path,
+                verbose=True,
+                product_catalog=settings.product_catalog,
+                model_name=settings.model_name,
+                use_tools=settings.use_tools,
+                session_id="template",
+                secondary_model_name=settings.secondary_model_name,
+            )
+            logger.info("Built agent template %s", _agent_template.config_key)
+        return _agent_template
+
+
+def rebuild_agent_template(previous: ApiSettings, current: ApiSettings) -> None:
+    """Drops the template when a reload changes the agent; live sessions keep theirs."""
+    global _agent_template
+    if previous.agent_fields == current.agent_fields:
+        return
+    with _agent_template_lock:
+        _agent_template = None
+    logger.info("Agent settings changed, new sessions will use the reloaded agent")
+
+
+settings_store.subscribe(rebuild_agent_template)
+
+
+def create_session(session_id: str) -> SalesGPTAPI:
+    logger.info("Creating new session %s", session_id)
+    return get_agent_template().clone(session_id)
+
+
+def rehydrate_session(session_id: str, state: dict) -> SalesGPTAPI:
+    logger.info("Rehydrating spilled session %s", session_id)
+    sales_api = create_session(session_id)
+    sales_api.restore_state(state)
+    return sales_api
+
+
+async def load_session(session_id: str) -> SalesGPTAPI:
+    """
+    The live session for `session_id`, brought up to date with the shared backend.
+
+    Without a shared backend the in-memory store is authoritative. With one, another
+    worker may have advanced the conversation, so its stored version is compared with
+    the one this worker last saw and the newer state is applied.
+    """
+    # Eviction spills to disk, rehydration clones the template (which warmup may still
+    # be building): neither belongs on the event loop.
+    sales_api = await run_in_threadpool(sessions.get_or_create, session_id, create_session)
+    if session_backend is None:
+        return sales_api
+    state = await run_in_threadpool(session_backend.load, session_id)
+    if state is not None and state.version != sales_api.state_version:
+        if state.config_key != sales_api.config_key:
+            logger.warning(
+                "Session %s was saved with agent config %s, resuming on %s",
+                session_id,
+                state.config_key,
+                sales_api.config_key,
+            )
+        sales_api.apply_session_state(state)
+    return sales_api
+
+
+async def save_session(sales_api: SalesGPTAPI) -> None:
+    """Writes the session back to the shared backend; 409 if another writer got there first."""
+    if session_backend is None:
+        return
+    try:
+        saved = await run_in_threadpool(session_backend.save, sales_api.to_session_state())
+    except SessionConflictError:
+        logger.warning("Concurrent update of session %s, discarding this turn", sales_api.session_id)
+        state = await run_in_threadpool(session_backend.load, sales_api.session_id)
+        if state is not None:
+            sales_api.apply_session_state(state)
+        raise HTTPException(
+            status_code=409, detail="Session was updated concurrently, please retry"
+        )
+    sales_api.state_version = saved.version
+
+
+metrics = get_app_metrics()
+session_backend = session_backend_from_env()
+store_settings = session_store_settings()
+if session_backend is not None:
+    # The shared backend already holds every session; evicted ones are simply reloaded.
+    store_settings["tier"] = None
+sessions = SessionStore(
+    dump=SalesGPTAPI.export_state,
+    load=rehydrate_session,
+    metrics=metrics,
+    **store_settings,
+)
+if sessions.tier is not None:
+    metrics.spilled_sessions.set_function(lambda: len(sessions.tier))
+turns = TurnSerializer(metrics=metrics, **turn_serializer_settings())
+instrument_app(app, metrics=metrics, active_sessions=lambda: len(sessions))
+admission = install_admission_control(app)
+deadlines = deadline_settings()
+install_deadlines(app, metrics=metrics, **deadlines)
+add_span_listener(metrics.observe_span)
+install_readiness(app, readiness)
 
 
 @app.get("/botname", response_model=None)
-async def get_bot_name(authorization: Optional[str] = Header(None)):
-    load_dotenv()
-    if os.getenv("ENVIRONMENT") == "production":
-        get_auth_key(authorization)
-        
-    sales_api = SalesGPTAPI(
-        config_path=os.getenv("CONFIG_PATH", "examples/example_agent_setup.json"),
-        product_catalog=os.getenv(
-            "PRODUCT_CATALOG", "examples/sample_product_catalog.txt"
-        ),
-        verbose=True,
-        model_name=os.getenv("GPT_MODEL", "gpt-3.5-turbo-0613"),
-    )
-    name = sales_api.sales_agent.salesperson_name
-    return {"name": name, "model": sales_api.sales_agent.model_name}
+async def get_bot_name(
+    authorization: Optional[str] = Header(None),
+    settings: ApiSettings = Depends(get_settings),
+):
+    """The agent's name and model, from the settings snapshot rather than by building an agent."""
+    if settings.production:
+        get_auth_key(authorization, settings)
+    return {"name": settings.salesperson_name, "model": settings.model_name}
 
 
 @app.post("/chat")
-async def chat_with_sales_agent(req: MessageList, stream: bool = Query(False), authorization: Optional[str] = Header(None)):
+async def chat_with_sales_agent(request: Request, req: MessageList, stream: bool = Query(False), authorization: Optional[str] = Header(None), settings: ApiSettings = Depends(get_settings)):
     """
     Handles chat interactions with the sales agent.
 
@@ -92,45 +294,156 @@ async def chat_with_sales_agent(req: MessageList, stream: bool = Query(False), a
 
     Note:
         Streaming functionality is planned but not yet available. The current implementation only supports synchronous responses.
-    """
-    sales_api = None
-    if os.getenv("ENVIRONMENT") == "production":
-        get_auth_key(authorization)
-    # print(f"Received request: {req}")
-    if req.session_id in sessions:
-        print("Session is found!")
-        sales_api = sessions[req.session_id]
-        print(f"Are tools activated: {sales_api.sales_agent.use_tools}")
-        print(f"Session id: {req.session_id}")
-    else:
-        print("Creating new session")
-        sales_api = SalesGPTAPI(
-            config_path=os.getenv("CONFIG_PATH", "examples/example_agent_setup.json"),
-            verbose=True,
-            product_catalog=os.getenv(
-                "PRODUCT_CATALOG", "examples/sample_product_catalog.txt"
-            ),
-            model_name=os.getenv("GPT_MODEL", "gpt-3.5-turbo-0613"),
-            use_tools=os.getenv("USE_TOOLS_IN_API", "True").lower()
-            in ["true", "1", "t"],
-        )
-        print(f"TOOLS?: {sales_api.sales_agent.use_tools}")
-        sessions[req.session_id] = sales_api
 
+        The turn must finish within the X-Request-Timeout header's seconds (REQUEST_TIMEOUT
+        by default) or the request fails with 504, and it is cancelled as soon as the
+        client disconnects.
+    """
+    if settings.production:
+        get_auth_key(authorization, settings)
     # TODO stream not working
     if stream:
+        try:
+            turns.check(req.session_id)
+        except SessionBusyError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        # Refuse now, while a status code can still be sent.
+        admission.check()
 
         async def stream_response():
-            stream_gen = sales_api.do_stream(req.conversation_history, req.human_say)
-            async for message in stream_gen:
-                data = {"token": message}
-                yield json.dumps(data).encode("utf-8") + b"\n"
+            try:
+                async with turns.turn(req.session_id):
+                    sales_api = await load_session(req.session_id)
+                    stream_gen = sales_api.do_stream(
+                        list(sales_api.sales_agent.conversation_history), req.human_say
+                    )
+                    async for message in stream_gen:
+                        data = {"token": message}
+                        yield json.dumps(data).encode("utf-8") + b"\n"
+                    await save_session(sales_api)
+            except (SessionBusyError, AdmissionRejected):
+                yield json.dumps({"error": "busy"}).encode("utf-8") + b"\n"
+            except DeadlineExceeded:
+                yield json.dumps({"error": "timeout"}).encode("utf-8") + b"\n"
+            except HTTPException:
+                yield json.dumps({"error": "conflict"}).encode("utf-8") + b"\n"
 
         return StreamingResponse(stream_response())
-    else:
+
+    async def take_turn():
+        sales_api = await load_session(req.session_id)
         response = await sales_api.do(req.human_say)
+        await save_session(sales_api)
         return response
 
+    try:
+        # A retried POST with the same message joins the turn already in flight; the
+        # turn itself is only cancelled once every request waiting for it is gone.
+        turn = turns.run(
+            req.session_id, take_turn, fingerprint=request_fingerprint(req.human_say)
+        )
+        return await cancel_on_disconnect(
+            request, run_within_deadline(turn, "chat turn"), metrics=metrics
+        )
+    except SessionBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+async def run_socket_turn(session_id: str, human_input: Optional[str], emit: Callable) -> None:
+    """Runs one WebSocket turn, emitting its events and any failure as an error event."""
+    try:
+        # Sockets have no per-request header: each turn gets the default deadline.
+        with deadline_scope(deadlines["default"]):
+            async with turns.turn(session_id):
+                sales_api = await load_session(session_id)
+                events = sales_api.astream_turn(human_input)
+                try:
+                    async for event in events:
+                        emit(event)
+                finally:
+                    # Release the admission slot now, even if the client was dropped mid-turn.
+                    await events.aclose()
+                await save_session(sales_api)
+    except SessionBusyError:
+        emit({"type": "error", "code": "session_busy"})
+    except AdmissionRejected as e:
+        emit({"type": "error", "code": "overloaded", "retry_after": e.retry_after})
+    except DeadlineExceeded:
+        emit({"type": "error", "code": "timeout"})
+    except HTTPException as e:
+        emit({"type": "error", "code": "conflict" if e.status_code == 409 else "turn_failed"})
+
+
+@app.websocket("/ws/chat")
+async def chat_socket(
+    websocket: WebSocket,
+    session_id: Optional[str] = Query(None),
+    greet: bool = Query(False),
+    priority: str = Query("chat"),
+    token: Optional[str] = Query(None),
+    settings: ApiSettings = Depends(get_settings),
+):
+    """
+    Chat over one WebSocket per session; see `ChatSocket` for the message protocol.
+
+    Args:
+        session_id (str, optional): Session to bind; a new one is created if omitted.
+        greet (bool): Let the agent open the conversation.
+        priority (str): Admission priority class for this connection's turns.
+        token (str, optional): AUTH_KEY in production, as browsers cannot set headers here.
+    """
+    if settings.production:
+        authorization = websocket.headers.get("authorization")
+        if not settings.auth_key or (
+            token != settings.auth_key and not settings.authorized(authorization)
+        ):
+            await websocket.close(code=1008)
+            return
+    if priority not in PRIORITIES:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    session_id = session_id or str(uuid.uuid4())
+    current_priority.set(priority)
+
+    async def run_turn(human_input: Optional[str], emit: Callable) -> None:
+        await run_socket_turn(session_id, human_input, emit)
+
+    await ChatSocket(
+        websocket,
+        session_id,
+        run_turn,
+        greet=greet,
+        idle_followup=settings.ws_idle_followup,
+        max_buffered_chars=settings.ws_max_buffered_chars,
+        max_queued_turns=settings.ws_max_queued_turns,
+    ).serve()
+
+
+@app.get("/usage/{session_id}")
+async def get_session_usage(
+    session_id: str,
+    authorization: Optional[str] = Header(None),
+    settings: ApiSettings = Depends(get_settings),
+):
+    """
+    Returns token, cost and latency accounting for a session.
+
+    Args:
+        session_id (str): The chat session to report on.
+
+    Returns:
+        dict: Session totals, a per-model breakdown and one rollup per turn.
+    """
+    if settings.production:
+        get_auth_key(authorization, settings)
+    summary = get_usage_accountant().session_summary(session_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Unknown session")
+    return summary
+
+
+readiness.imports_finished()
 
 # Main entry point
 if __name__ == "__main__":
@@ -0,0 +1,389 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+import litellm
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from salesgpt.context import current_session_id
+from salesgpt.deadlines import check_deadline
+from salesgpt.metrics import (
+    ROLE_STAGE_ANALYZER,
+    ROLE_UTTERANCE,
+    ROUTER_RUN_TAG,
+    get_app_metrics,
+)
+from salesgpt.tracing import start_span
+
+# USD per token for models litellm's cost map does not know, matched by substring.
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "claude-3-haiku": (0.25e-6, 1.25e-6),
+    "claude-3-sonnet": (3e-6, 15e-6),
+    "claude-3-5-sonnet": (3e-6, 15e-6),
+    "claude-3-opus": (15e-6, 75e-6),
+}
+
+
+def _field(usage: Any, *names: str) -> int:
+    for name in names:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if value:
+            return int(value)
+    return 0
+
+
+def parse_usage(usage: Any) -> Tuple[int, int, int]:
+    """
+    Normalizes an OpenAI/litellm or Anthropic usage block.
+
+    Returns:
+        Tuple[int, int, int]: prompt, completion and cached prompt tokens.
+    """
+    if not usage:
+        return 0, 0, 0
+    prompt = _field(usage, "prompt_tokens", "input_tokens")
+    completion = _field(usage, "completion_tokens", "output_tokens")
+    details = (
+        usage.get("prompt_tokens_details")
+        if isinstance(usage, dict)
+        else getattr(usage, "prompt_tokens_details", None)
+    )
+    cached = _field(details, "cached_tokens") if details else 0
+    cached = cached or _field(usage, "cache_read_input_tokens")
+    return prompt, completion, cached
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """USD cost of a call, or None if the model's pricing is unknown."""
+    for name, (input_cost, output_cost) in MODEL_PRICING.items():
+        if name in model:
+            return prompt_tokens * input_cost + completion_tokens * output_cost
+    pricing = litellm.model_cost.get(model) or litellm.model_cost.get(model.split("/")[-1])
+    if not pricing:
+        return None
+    return (
+        prompt_tokens * pricing.get("input_cost_per_token", 0)
+        + completion_tokens * pricing.get("output_cost_per_token", 0)
+    )
+
+
+@dataclass
+class LLMCallRecord:
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency: float = 0.0
+    time_to_first_token: Optional[float] = None
+    cost: Optional[float] = None
+    source: str = ROLE_UTTERANCE
+    # Exception type name of a call that failed, timed out or was cancelled.
+    error: Optional[str] = None
+
+
+@dataclass
+class _SessionUsage:
+    turn: int = 0
+    calls: List[Tuple[int, LLMCallRecord]] = field(default_factory=list)
+
+
+def summarize(records: List[LLMCallRecord]) -> Dict[str, Any]:
+    """Totals and a per-model breakdown for `records`."""
+
+    def totals(group: List[LLMCallRecord]) -> Dict[str, Any]:
+        ttfts = [r.time_to_first_token for r in group if r.time_to_first_token is not None]
+        return {
+            "calls": len(group),
+            "errors": sum(1 for r in group if r.error is not None),
+            "prompt_tokens": sum(r.prompt_tokens for r in group),
+            "completion_tokens": sum(r.completion_tokens for r in group),
+            "cached_tokens": sum(r.cached_tokens for r in group),
+            "cost_usd": round(sum(r.cost or 0.0 for r in group), 6),
+            "cost_complete": all(r.cost is not None for r in group),
+            "latency_s": round(sum(r.latency for r in group), 4),
+            "avg_time_to_first_token_s": round(sum(ttfts) / len(ttfts), 4) if ttfts else None,
+        }
+
+    by_model: Dict[str, List[LLMCallRecord]] = {}
+    for record in records:
+        by_model.setdefault(record.model, []).append(record)
+    return {
+        **totals(records),
+        "by_model": {model: totals(group) for model, group in by_model.items()},
+    }
+
+
+class UsageAccountant:
+    """
+    Keeps every LLM call per session and rolls it up per turn and per session.
+
+    Args:
+        max_sessions (int): Least recently active sessions beyond this are dropped.
+    """
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _SessionUsage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id: str) -> _SessionUsage:
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _SessionUsage()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def start_turn(self, session_id: str) -> int:
+        """Starts a new turn for `session_id`; later calls are attributed to it."""
+        with self._lock:
+            session = self._session(session_id)
+            session.turn += 1
+            return session.turn
+
+    def record(self, session_id: Optional[str], record: LLMCallRecord) -> None:
+        if session_id is None:
+            return
+        with self._lock:
+            session = self._session(session_id)
+            session.calls.append((session.turn, record))
+
+    def turn_summary(self, session_id: str, turn: Optional[int] = None) -> Dict[str, Any]:
+        """Rollup of one turn, the current one by default."""
+        with self._lock:
+            session = self._sessions.get(session_id) or _SessionUsage()
+            turn = session.turn if turn is None else turn
+            records = [record for t, record in session.calls if t == turn]
+        return {"turn": turn, **summarize(records)}
+
+    def session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Session totals plus one rollup per turn, or None for an unknown session."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            calls = list(session.calls)
+        turns: Dict[int, List[LLMCallRecord]] = {}
+        for turn, record in calls:
+            turns.setdefault(turn, []).append(record)
+        return {
+            "session_id": session_id,
+            **summarize([record for _, record in calls]),
+            "turns": [{"turn": turn, **summarize(records)} for turn, records in sorted(turns.items())],
+        }
+
+    def calls(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            session = self._sessions.get(session_id) or _SessionUsage()
+            return [{"turn": turn, **asdict(record)} for turn, record in session.calls]
+
+
+_accountant: Optional[UsageAccountant] = None
+_accountant_lock = threading.Lock()
+
+
+def get_usage_accountant() -> UsageAccountant:
+    global _accountant
+    with _accountant_lock:
+        if _accountant is None:
+            _accountant = UsageAccountant()
+        return _accountant
+
+
+class LLMCallTimer:
+    """Measures one LLM call made outside LangChain; see `track_llm_call`."""
+
+    def __init__(self, model: str, source: str):
+        self.record = LLMCallRecord(model=model, source=source)
+        self.started_at = time.monotonic()
+
+    def first_token(self) -> None:
+        if self.record.time_to_first_token is None:
+            self.record.time_to_first_token = time.monotonic() - self.started_at
+
+    def set_usage(self, usage: Any) -> None:
+        prompt, completion, cached = parse_usage(usage)
+        self.record.prompt_tokens = prompt
+        self.record.completion_tokens = completion
+        self.record.cached_tokens = cached
+
+
+@contextmanager
+def track_llm_call(
+    model: str, source: str, session_id: Optional[str] = None
+) -> Iterator[LLMCallTimer]:
+    """
+    Accounts an LLM call made outside LangChain (tool helpers, streaming turns) to
+    `session_id`, the current session by default. Call `set_usage` with the
+    response's usage block and, when streaming, `first_token` on the first chunk.
+    Calls that raise are accounted too, with the exception type as their `error`.
+
+    Raises:
+        DeadlineExceeded: If the request's deadline passed before the call started.
+    """
+    check_deadline(f"{source} LLM call")
+    timer = LLMCallTimer(model, source)
+    record = timer.record
+    session_id = session_id or current_session_id.get()
+    attributes = {"llm.model": model, "llm.source": source}
+    if session_id is not None:
+        attributes["session.id"] = session_id
+    llm_span = start_span("llm", attributes)
+    try:
+        yield timer
+    except BaseException as e:
+        llm_span.record_error(e)
+        record.error = type(e).__name__
+        raise
+    finally:
+        llm_span.end()
+        record.latency = time.monotonic() - timer.started_at
+        record.cost = estimate_cost(model, record.prompt_tokens, record.completion_tokens)
+        get_usage_accountant().record(session_id, record)
+        get_app_metrics().observe_llm_call(source, model, record.latency, record.time_to_first_token)
+
+
+def _chunk_text(chunk: Any) -> str:
+    try:
+        return chunk.choices[0]["delta"]["content"] or ""
+    except (AttributeError, IndexError, KeyError, TypeError):
+        return ""
+
+
+def _stream_usage(model: str, messages: List[Dict[str, Any]], parts: List[str]) -> Dict[str, int]:
+    # Streamed responses carry no usage block, so both sides are counted locally.
+    completion = "".join(parts)
+    try:
+        return {
+            "prompt_tokens": litellm.token_counter(model=model, messages=messages),
+            "completion_tokens": litellm.token_counter(model=model, text=completion)
+            if completion
+            else 0,
+        }
+    except Exception:
+        return {}
+
+
+def account_stream(
+    stream: Iterable[Any], model: str, messages: List[Dict[str, Any]], source: str = ROLE_UTTERANCE
+) -> Iterator[Any]:
+    """
+    Passes a litellm-shaped chunk stream through, accounting it to the session that
+    was current when the stream was wrapped.
+    """
+    session_id = current_session_id.get()
+
+    def generator() -> Iterator[Any]:
+        parts = []
+        with track_llm_call(model, source, session_id) as call:
+            for chunk in stream:
+                call.first_token()
+                parts.append(_chunk_text(chunk))
+                yield chunk
+            call.set_usage(_stream_usage(model, messages, parts))
+
+    return generator()
+
+
+def aaccount_stream(
+    stream: AsyncIterator[Any], model: str, messages: List[Dict[str, Any]], source: str = ROLE_UTTERANCE
+) -> AsyncIterator[Any]:
+    """Async variant of `account_stream`."""
+    session_id = current_session_id.get()
+
+    async def generator() -> AsyncIterator[Any]:
+        parts = []
+        with track_llm_call(model, source, session_id) as call:
+            async for chunk in stream:
+                call.first_token()
+                parts.append(_chunk_text(chunk))
+                yield chunk
+            call.set_usage(_stream_usage(model, messages, parts))
+
+    return generator()
+
+
+@dataclass
+class _Run:
+    session_id: Optional[str]
+    model: str
+    source: str
+    started_at: float
+    time_to_first_token: Optional[float] = None
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """
+    Records tokens, cost, latency and time-to-first-token of every LangChain model
+    call into the `UsageAccountant`, attributed to the session bound when the call started.
+    """
+
+    run_inline = True
+
+    def __init__(self, accountant: Optional[UsageAccountant] = None):
+        self.accountant = accountant or get_usage_accountant()
+        self._runs: Dict[UUID, _Run] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or ""
+        # StageAnalyzerChain tags its runs; every other chat model call writes the reply.
+        tags = kwargs.get("tags") or []
+        if ROUTER_RUN_TAG in tags:
+            # The router's backends report their own runs; counting it too would double up.
+            return
+        source = ROLE_STAGE_ANALYZER if ROLE_STAGE_ANALYZER in tags else ROLE_UTTERANCE
+        with self._lock:
+            self._runs[run_id] = _Run(current_session_id.get(), model, source, time.monotonic())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.get(run_id)
+            if run is not None and run.time_to_first_token is None:
+                run.time_to_first_token = time.monotonic() - run.started_at
+
+    def _finish(self, run: _Run, model: str, usage: Any, error: Optional[str] = None) -> None:
+        prompt, completion, cached = parse_usage(usage)
+        record = LLMCallRecord(
+            model=model,
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            cached_tokens=cached,
+            latency=time.monotonic() - run.started_at,
+            time_to_first_token=run.time_to_first_token,
+            cost=estimate_cost(model, prompt, completion),
+            source=run.source,
+            error=error,
+        )
+        self.accountant.record(run.session_id, record)
+        get_app_metrics().observe_llm_call(
+            run.source, model, record.latency, record.time_to_first_token
+        )
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        llm_output = response.llm_output or {}
+        model = llm_output.get("model") or llm_output.get("model_name") or run.model
+        self._finish(run, model, llm_output.get("token_usage"))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            self._finish(run, run.model, None, error=type(error).__name__)
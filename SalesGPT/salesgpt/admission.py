@@ -0,0 +1,304 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+# Stdlib only, like salesgpt.sessions, so the standalone app/ server can use it too.
+
+logger = logging.getLogger(__name__)
+
+# Lower outranks higher. A live phone call must not wait behind web previews.
+PRIORITIES: Dict[str, int] = {"call": 0, "chat": 1, "preview": 2}
+DEFAULT_PRIORITY = "chat"
+PRIORITY_HEADER = "X-Request-Priority"
+
+current_priority: ContextVar[str] = ContextVar("current_priority", default=DEFAULT_PRIORITY)
+# Set while the current task holds a slot, so nested provider calls (a tool's helper
+# LLM call inside an agent turn) do not queue behind their own parent.
+_holding_slot: ContextVar[bool] = ContextVar("holding_slot", default=False)
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised instead of queueing work the controller cannot take on in time.
+
+    Args:
+        reason (str): "queue_full" when refused on arrival, "timeout" when the wait ran out.
+        retry_after (int): Seconds the client should wait before retrying.
+        priority (str): The priority class that was refused.
+    """
+
+    def __init__(self, reason: str, retry_after: int, priority: str):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.priority = priority
+
+    @property
+    def status_code(self) -> int:
+        # Refused outright: the client is sending faster than we serve. Timed out
+        # after queueing: the server, not the client, fell behind.
+        return 429 if self.reason == "queue_full" else 503
+
+
+class _Waiter:
+    __slots__ = ("priority", "granted", "_loop", "_future")
+
+    def __init__(self, priority: str, loop: asyncio.AbstractEventLoop):
+        self.priority = priority
+        self.granted = False
+        self._loop = loop
+        self._future = loop.create_future()
+
+    def grant(self) -> None:
+        self.granted = True
+        self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Caps concurrent provider work (LLM turns, helper calls, TTS) across the process.
+
+    Work past `slots` waits in a priority queue, highest class first and FIFO within
+    a class. Lower classes are shed earlier: a class may only join the queue while it
+    holds fewer than its share of `queue_limit` entries, so previews are refused well
+    before live calls are. Nobody waits longer than `max_wait`.
+
+    Args:
+        slots (int): Units of provider work allowed to run at once.
+        queue_limit (int): Waiters allowed in total.
+        max_wait (float): Seconds a waiter may queue before it is refused.
+        metrics (AppMetrics, optional): Receives queue depth, wait times and rejections.
+    """
+
+    def __init__(
+        self,
+        slots: int = 16,
+        queue_limit: int = 64,
+        max_wait: float = 10.0,
+        metrics: Any = None,
+    ):
+        self.slots = slots
+        self.queue_limit = queue_limit
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.in_use = 0
+        self._queue: List = []
+        self._depth = {priority: 0 for priority in PRIORITIES}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        # Smoothed seconds a slot is held, for Retry-After estimates.
+        self._hold_time = 1.0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        if metrics is not None:
+            metrics.admission_in_use.set_function(lambda: self.in_use)
+            for priority in PRIORITIES:
+                metrics.admission_queue_depth.set(0, priority=priority)
+
+    def _change_depth(self, priority: str, delta: int) -> None:
+        self._depth[priority] += delta
+        if self.metrics is not None:
+            self.metrics.admission_queue_depth.set(self._depth[priority], priority=priority)
+
+    def _queue_share(self, priority: str) -> int:
+        rank = PRIORITIES[priority]
+        return math.ceil(self.queue_limit * (len(PRIORITIES) - rank) / len(PRIORITIES))
+
+    def retry_after(self) -> int:
+        """Seconds until a new arrival could plausibly be served."""
+        waves = (len(self._queue) + 1) / max(self.slots, 1)
+        return max(1, math.ceil(waves * self._hold_time))
+
+    def _reject(self, reason: str, priority: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        if self.metrics is not None:
+            self.metrics.admission_rejected.inc(priority=priority, reason=reason)
+        return AdmissionRejected(reason, self.retry_after(), priority)
+
+    def check(self, priority: Optional[str] = None) -> None:
+        """
+        Raises `AdmissionRejected` now if work of `priority` would be refused on arrival.
+
+        For callers that must answer with a status code before their work starts,
+        such as a streamed response.
+        """
+        priority = priority or current_priority.get()
+        with self._lock:
+            if self.in_use >= self.slots and self._depth[priority] >= self._queue_share(priority):
+                raise self._reject("queue_full", priority)
+
+    def _enter(self, priority: str, loop: asyncio.AbstractEventLoop) -> Optional[_Waiter]:
+        """Takes a free slot (returns None) or queues a waiter; raises if the class is full."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        with self._lock:
+            if self.in_use < self.slots and not self._queue:
+                self.in_use += 1
+                return None
+            if self._depth[priority] >= self._queue_share(priority):
+                raise self._reject("queue_full", priority)
+            waiter = _Waiter(priority, loop)
+            heapq.heappush(self._queue, (PRIORITIES[priority], next(self._sequence), waiter))
+            self._change_depth(priority, 1)
+            return waiter
+
+    def _abandon(self, waiter: _Waiter, reason: Optional[str]) -> Optional[AdmissionRejected]:
+        """Withdraws a waiter that gave up; returns the rejection to raise, if any."""
+        with self._lock:
+            if waiter.granted:
+                if reason is None:
+                    # Cancelled just as it was granted: hand the slot on, don't leak it.
+                    self._release_locked()
+                # Timed out just as it was granted: keep the slot.
+                return None
+            self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+            heapq.heapify(self._queue)
+            self._change_depth(waiter.priority, -1)
+            return self._reject(reason, waiter.priority) if reason else None
+
+    def _release_locked(self) -> None:
+        if self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            self._change_depth(waiter.priority, -1)
+            waiter.grant()
+        else:
+            self.in_use -= 1
+
+    def release(self, held: float = 0.0) -> None:
+        """Frees a slot, handing it straight to the highest-priority waiter."""
+        with self._lock:
+            self._hold_time = 0.8 * self._hold_time + 0.2 * held
+            self._release_locked()
+
+    def _observe_wait(self, priority: str, started: float) -> None:
+        if self.metrics is not None:
+            self.metrics.admission_wait.observe(time.monotonic() - started, priority=priority)
+
+    async def acquire(self, priority: Optional[str] = None, timeout: Optional[float] = None) -> None:
+        """
+        Waits for a slot on the event loop.
+
+        Args:
+            priority (str, optional): Priority class; defaults to the request's class.
+            timeout (float, optional): Seconds to wait at most; defaults to `max_wait`.
+
+        Raises:
+            AdmissionRejected: If the class's queue is full or the wait timed out.
+        """
+        priority = priority or current_priority.get()
+        started = time.monotonic()
+        waiter = self._enter(priority, asyncio.get_running_loop())
+        if waiter is not None:
+            wait = self.max_wait if timeout is None else min(timeout, self.max_wait)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter._future), max(wait, 0))
+            except asyncio.TimeoutError:
+                rejection = self._abandon(waiter, "timeout")
+                if rejection is not None:
+                    raise rejection
+            except asyncio.CancelledError:
+                self._abandon(waiter, None)
+                raise
+        self._observe_wait(priority, started)
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None) -> AsyncIterator[None]:
+        """Holds a slot for the block; a no-op if the caller already holds one."""
+        if _holding_slot.get():
+            yield
+            return
+        await self.acquire(priority)
+        token = _holding_slot.set(True)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            _holding_slot.reset(token)
+            self.release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slots": self.slots,
+                "in_use": self.in_use,
+                "queued": dict(self._depth),
+                "rejected": dict(self.rejected),
+                "retry_after": self.retry_after(),
+            }
+
+
+_admission_controller: Optional[AdmissionController] = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """
+    Returns the process-wide admission controller, configured from ADMISSION_SLOTS,
+    ADMISSION_QUEUE_LIMIT and ADMISSION_MAX_WAIT.
+    """
+    global _admission_controller
+    with _admission_controller_lock:
+        if _admission_controller is None:
+            from salesgpt.metrics import get_app_metrics
+
+            _admission_controller = AdmissionController(
+                slots=int(os.getenv("ADMISSION_SLOTS", "16")),
+                queue_limit=int(os.getenv("ADMISSION_QUEUE_LIMIT", "64")),
+                max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "10")),
+                metrics=get_app_metrics(),
+            )
+        return _admission_controller
+
+
+def install_admission_control(
+    app: Any, controller: Optional[AdmissionController] = None
+) -> AdmissionController:
+    """
+    Reads each request's priority class from the X-Request-Priority header and turns
+    `AdmissionRejected` into a 429/503 response with Retry-After.
+
+    Args:
+        app (FastAPI): The app to install into.
+        controller (AdmissionController, optional): Defaults to the process-wide controller.
+
+    Returns:
+        AdmissionController: The controller the app admits work through.
+    """
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse
+
+    controller = controller or get_admission_controller()
+
+    @app.middleware("http")
+    async def bind_request_priority(request: Request, call_next):
+        priority = request.headers.get(PRIORITY_HEADER, DEFAULT_PRIORITY).lower()
+        if priority not in PRIORITIES:
+            return JSONResponse(
+                {"detail": f"Unknown {PRIORITY_HEADER}: {priority}"}, status_code=400
+            )
+        token = current_priority.set(priority)
+        try:
+            return await call_next(request)
+        finally:
+            current_priority.reset(token)
+
+    async def admission_rejected(request: Request, exc: AdmissionRejected):
+        return JSONResponse(
+            {"detail": str(exc)},
+            status_code=exc.status_code,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    app.add_exception_handler(AdmissionRejected, admission_rejected)
+    return controller
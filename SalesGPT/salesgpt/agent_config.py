@@ -0,0 +1,71 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Matches the SalesGPT field default and the fallback in SalesGPTAPI.initialize_agent.
+DEFAULT_SALESPERSON_NAME = "Ted Lasso"
+
+
+class AgentConfigCache:
+    """
+    Parsed agent config files, re-read only when the file changes on disk.
+
+    A file is considered changed when its mtime or size differs from the parsed copy,
+    so a lookup costs one `os.stat` instead of reading and parsing JSON.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    def load(self, path: str) -> Dict[str, Any]:
+        """
+        Returns the config at `path`, parsing it only if it changed since the last call.
+
+        Args:
+            path (str): Location of the agent config JSON file.
+
+        Returns:
+            dict: A copy of the parsed config, safe for the caller to update.
+        """
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return dict(entry[1])
+        with open(path, "r") as f:
+            config = json.load(f)
+        with self._lock:
+            self._entries[path] = (signature, config)
+            self.loads += 1
+        logger.debug("Parsed agent config %s", path)
+        return dict(config)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"files": len(self._entries), "hits": self.hits, "loads": self.loads}
+
+
+_agent_config_cache: Optional[AgentConfigCache] = None
+_agent_config_cache_lock = threading.Lock()
+
+
+def get_agent_config_cache() -> AgentConfigCache:
+    """Returns the process-wide agent config cache."""
+    global _agent_config_cache
+    with _agent_config_cache_lock:
+        if _agent_config_cache is None:
+            _agent_config_cache = AgentConfigCache()
+        return _agent_config_cache
@@ -1,30 +1,43 @@
+import logging
 from copy import deepcopy
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Callable, Dict, List, Optional, Union
 
-from langchain.agents import (
-    AgentExecutor,
-    LLMSingleActionAgent,
-    create_openai_tools_agent,
-)
 from langchain.chains import LLMChain, RetrievalQA
 from langchain.chains.base import Chain
 from langchain_community.chat_models import ChatLiteLLM
-from langchain_core.agents import (
-    _convert_agent_action_to_messages,
-    _convert_agent_observation_to_messages,
-)
-from langchain_core.language_models.llms import create_base_retry_decorator
-from litellm import acompletion
 from pydantic import Field
+from tenacity import (
+    before_sleep_log,
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_exponential,
+)
 
+from salesgpt.accounting import aaccount_stream, account_stream
 from salesgpt.chains import SalesConversationChain, StageAnalyzerChain
-from salesgpt.custom_invoke import CustomAgentExecutor
-from salesgpt.logger import time_logger
-from salesgpt.parsers import SalesConvoOutputParser
+from salesgpt.deadlines import check_deadline, run_within_deadline, stop_at_deadline
+from salesgpt.llm_cache import acompletion
+from salesgpt.memo import ToolResultCache
+from salesgpt.models import BedrockCustomModel
 from salesgpt.prompts import SALES_AGENT_TOOLS_PROMPT
+from salesgpt.router import HedgedRouterChatModel
+from salesgpt.semantic_cache import (
+    SemanticResponseCache,
+    agent_config_hash,
+    get_semantic_response_cache,
+    is_cacheable_question,
+    is_semantically_cacheable,
+    text_hash,
+)
 from salesgpt.stages import CONVERSATION_STAGES
-from salesgpt.templates import CustomPromptTemplateForTools
-from salesgpt.tools import get_tools, setup_knowledge_base
+from salesgpt.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+def _agent_span_attributes(agent: "SalesGPT", *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    return {"agent.id": agent_config_hash(agent)[:16], "agent.name": agent.salesperson_name}
 
 
 def _create_retry_decorator(llm: Any) -> Callable[[Any], Any]:
@@ -33,7 +46,8 @@ def _create_retry_decorator(llm: Any) -> Callable[[Any], Any]:
 
     This function creates a retry decorator that will retry a function call
     if it raises any of the specified OpenAI API errors. The maximum number of retries
-    is determined by the 'max_retries' attribute of the 'llm' object.
+    is determined by the 'max_retries' attribute of the 'llm' object, and no retry is
+    attempted whose backoff would outlast the current request's deadline.
 
     Args:
         llm (Any): An object that has a 'max_retries' attribute specifying the maximum number of retries.
@@ -50,7 +64,14 @@ def _create_retry_decorator(llm: Any) -> Callable[[Any], Any]:
         openai.RateLimitError,
         openai.APIStatusError,
     ]
-    return create_base_retry_decorator(error_types=errors, max_retries=llm.max_retries)
+    retry_on = retry_if_exception_type(tuple(errors))
+    return retry(
+        reraise=True,
+        stop=stop_after_attempt(llm.max_retries) | stop_at_deadline,
+        wait=wait_exponential(multiplier=1, min=4, max=10),
+        retry=retry_on,
+        before_sleep=before_sleep_log(logger, logging.WARNING),
+    )
 
 
 class SalesGPT(Chain):
@@ -60,10 +81,15 @@ class SalesGPT(Chain):
     conversation_stage_id: str = "1"
     current_conversation_stage: str = CONVERSATION_STAGES.get("1")
     stage_analyzer_chain: StageAnalyzerChain = Field(...)
-    sales_agent_executor: Union[CustomAgentExecutor, None] = Field(...)
+    # A CustomAgentExecutor when use_tools is set; typed loosely so that the agent
+    # machinery is only imported for agents that use tools.
+    sales_agent_executor: Union[Chain, None] = Field(...)
     knowledge_base: Union[RetrievalQA, None] = Field(...)
     sales_conversation_utterance_chain: SalesConversationChain = Field(...)
     conversation_stage_dict: Dict = CONVERSATION_STAGES
+    tool_cache: Optional[ToolResultCache] = None
+    semantic_cache: Optional[SemanticResponseCache] = None
+    last_utterance_cached: bool = False
 
     model_name: str = "gpt-3.5-turbo-0613"  # TODO - make this an env variable
 
@@ -117,7 +143,7 @@ class SalesGPT(Chain):
         """
         return []
 
-    @time_logger
+    @traced("agent.seed", _agent_span_attributes)
     def seed_agent(self):
         """
         This method seeds the conversation by setting the initial conversation stage and clearing the conversation history.
@@ -130,7 +156,7 @@ class SalesGPT(Chain):
         self.current_conversation_stage = self.retrieve_conversation_stage("1")
         self.conversation_history = []
 
-    @time_logger
+    @traced("agent.determine_stage", _agent_span_attributes)
     def determine_conversation_stage(self):
         """
         Determines the current conversation stage based on the conversation history.
@@ -147,9 +173,8 @@ class SalesGPT(Chain):
         Returns:
             None
         """
-        print(f"Conversation Stage ID before analysis: {self.conversation_stage_id}")
-        print("Conversation history:")
-        print(self.conversation_history)
+        logger.debug("Conversation stage id before analysis: %s", self.conversation_stage_id)
+        logger.debug("Conversation history: %s", self.conversation_history)
         stage_analyzer_output = self.stage_analyzer_chain.invoke(
             input={
                 "conversation_history": "\n".join(self.conversation_history).rstrip(
@@ -165,17 +190,16 @@ class SalesGPT(Chain):
             },
             return_only_outputs=False,
         )
-        print("Stage analyzer output")
-        print(stage_analyzer_output)
+        logger.debug("Stage analyzer output: %s", stage_analyzer_output)
         self.conversation_stage_id = stage_analyzer_output.get("text")
 
         self.current_conversation_stage = self.retrieve_conversation_stage(
             self.conversation_stage_id
         )
 
-        print(f"Conversation Stage: {self.current_conversation_stage}")
+        logger.debug("Conversation stage: %s", self.current_conversation_stage)
 
-    @time_logger
+    @traced("agent.determine_stage", _agent_span_attributes)
     async def adetermine_conversation_stage(self):
         """
         Determines the current conversation stage based on the conversation history.
@@ -192,9 +216,8 @@ class SalesGPT(Chain):
         Returns:
             None
         """
-        print(f"Conversation Stage ID before analysis: {self.conversation_stage_id}")
-        print("Conversation history:")
-        print(self.conversation_history)
+        logger.debug("Conversation stage id before analysis: %s", self.conversation_stage_id)
+        logger.debug("Conversation history: %s", self.conversation_history)
         stage_analyzer_output = await self.stage_analyzer_chain.ainvoke(
             input={
                 "conversation_history": "\n".join(self.conversation_history).rstrip(
@@ -210,15 +233,14 @@ class SalesGPT(Chain):
             },
             return_only_outputs=False,
         )
-        print("Stage analyzer output")
-        print(stage_analyzer_output)
+        logger.debug("Stage analyzer output: %s", stage_analyzer_output)
         self.conversation_stage_id = stage_analyzer_output.get("text")
 
         self.current_conversation_stage = self.retrieve_conversation_stage(
             self.conversation_stage_id
         )
 
-        print(f"Conversation Stage: {self.current_conversation_stage}")
+        logger.debug("Conversation stage: %s", self.current_conversation_stage)
 
     def human_step(self, human_input):
         """
@@ -235,7 +257,58 @@ class SalesGPT(Chain):
         human_input = "User: " + human_input + " <END_OF_TURN>"
         self.conversation_history.append(human_input)
 
-    @time_logger
+    def _last_user_turn(self) -> Optional[str]:
+        """The prospect's latest message, or None if the agent spoke last."""
+        if not self.conversation_history:
+            return None
+        last_turn = self.conversation_history[-1]
+        if not last_turn.startswith("User: "):
+            return None
+        return last_turn[len("User: ") :].replace("<END_OF_TURN>", "").strip() or None
+
+    def _previous_agent_turn(self) -> str:
+        """What the agent said just before the prospect's latest message, if anything."""
+        if len(self.conversation_history) < 2:
+            return ""
+        previous = self.conversation_history[-2]
+        return "" if previous.startswith("User: ") else previous
+
+    def _semantic_scope(self):
+        # The same question after a different agent message may need a different answer.
+        return (
+            agent_config_hash(self),
+            self.current_conversation_stage,
+            text_hash(self._previous_agent_turn()),
+        )
+
+    def _semantic_lookup(self, question: Optional[str]):
+        if not is_cacheable_question(question):
+            return None, None
+        try:
+            return self.semantic_cache.lookup(self._semantic_scope(), question)
+        except Exception as e:
+            # The cache is an optimisation; a failing embedding call must not fail the turn.
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None, None
+
+    async def _asemantic_lookup(self, question: Optional[str]):
+        if not is_cacheable_question(question):
+            return None, None
+        try:
+            return await self.semantic_cache.alookup(self._semantic_scope(), question)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None, None
+
+    def _semantic_store(self, question, vector, ai_message, output) -> None:
+        if vector is not None and is_semantically_cacheable(ai_message):
+            self.semantic_cache.store(self._semantic_scope(), question, output, vector)
+
+    def _cached_ai_message(self, inputs: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        output_key = "output" if self.use_tools else "text"
+        return {**inputs, output_key: answer, "intermediate_steps": []}
+
+    @traced("agent.step", _agent_span_attributes)
     def step(self, stream: bool = False):
         """
         Executes a step in the conversation. If the stream argument is set to True,
@@ -254,7 +327,7 @@ class SalesGPT(Chain):
         else:
             return self._streaming_generator()
 
-    @time_logger
+    @traced("agent.step", _agent_span_attributes)
     async def astep(self, stream: bool = False):
         """
         Executes an asynchronous step in the conversation.
@@ -274,7 +347,7 @@ class SalesGPT(Chain):
         else:
             return await self._astreaming_generator()
 
-    @time_logger
+    @traced("agent.generate", _agent_span_attributes)
     async def acall(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
     
         """
@@ -295,6 +368,7 @@ class SalesGPT(Chain):
             The AI message generated by the sales agent.
 
         """
+        check_deadline("agent turn")
         # override inputs temporarily
         inputs = {
             "input": "",
@@ -309,15 +383,31 @@ class SalesGPT(Chain):
             "conversation_type": self.conversation_type,
         }
 
-        # Generate agent's utterance
-        if self.use_tools:
-            ai_message = await self.sales_agent_executor.ainvoke(inputs)
+        # Serve a near-identical earlier question from the semantic cache if enabled
+        question = self._last_user_turn() if self.semantic_cache is not None else None
+        cached_answer, question_vector = await self._asemantic_lookup(question)
+        self.last_utterance_cached = cached_answer is not None
+
+        # Generate agent's utterance, cancelling the provider calls and tools still
+        # running when the request's deadline passes
+        if cached_answer is not None:
+            ai_message = self._cached_ai_message(inputs, cached_answer)
+            output = cached_answer
+        elif self.use_tools:
+            ai_message = await run_within_deadline(
+                self.sales_agent_executor.ainvoke(inputs), "agent turn"
+            )
             output = ai_message["output"]
         else:
-            ai_message = await self.sales_conversation_utterance_chain.ainvoke(
-                inputs, return_intermediate_steps=True
+            ai_message = await run_within_deadline(
+                self.sales_conversation_utterance_chain.ainvoke(
+                    inputs, return_intermediate_steps=True
+                ),
+                "agent turn",
             )
             output = ai_message["text"]
+        if cached_answer is None:
+            self._semantic_store(question, question_vector, ai_message, output)
 
         # Add agent's response to conversation history
         agent_name = self.salesperson_name
@@ -328,14 +418,12 @@ class SalesGPT(Chain):
 
         if self.verbose:
             tool_status = "USE TOOLS INVOKE:" if self.use_tools else "WITHOUT TOOLS:"
-            print(f"{tool_status}\n#\n#\n#\n#\n------------------")
-            print(f"AI Message: {ai_message}")
-            print()
-            print(f"Output: {output.replace('<END_OF_TURN>', '')}")
+            logger.debug("%s AI message: %s", tool_status, ai_message)
+            logger.debug("Output: %s", output.replace("<END_OF_TURN>", ""))
 
         return ai_message
 
-    @time_logger
+    @traced("agent.prep_messages", _agent_span_attributes)
     def _prep_messages(self):
         """
         Prepares a list of messages for the streaming generator.
@@ -374,7 +462,7 @@ class SalesGPT(Chain):
             # print("\033[92m" + inception_messages[0].content + "\033[0m")
         return [message_dict]
 
-    @time_logger
+    @traced("agent.stream", _agent_span_attributes)
     def _streaming_generator(self):
         """
         Generates a streaming generator for partial LLM output manipulation.
@@ -402,12 +490,22 @@ class SalesGPT(Chain):
 
         messages = self._prep_messages()
 
-        return self.sales_conversation_utterance_chain.llm.completion_with_retry(
+        llm = self._streaming_llm()
+        model = getattr(llm, "model", self.model_name)
+        stream = llm.completion_with_retry(
             messages=messages,
             stop="<END_OF_TURN>",
             stream=True,
-            model=self.model_name,
+            model=model,
         )
+        return account_stream(stream, model, messages)
+
+    def _streaming_llm(self):
+        llm = self.sales_conversation_utterance_chain.llm
+        if isinstance(llm, HedgedRouterChatModel):
+            # Streamed turns are not hedged; they go to the currently preferred backend.
+            return llm.streaming_backend
+        return llm
 
     async def acompletion_with_retry(self, llm: Any, **kwargs: Any) -> Any:
         """
@@ -471,14 +569,22 @@ class SalesGPT(Chain):
 
         messages = self._prep_messages()
 
-        return await self.acompletion_with_retry(
-            llm=self.sales_conversation_utterance_chain.llm,
-            messages=messages,
-            stop="<END_OF_TURN>",
-            stream=True,
-            model=self.model_name,
-        )
+        llm = self._streaming_llm()
+        model = getattr(llm, "model", self.model_name)
+        if isinstance(llm, BedrockCustomModel):
+            # Bedrock streams through its response-stream API in the same chunk shape as litellm.
+            stream = llm.acompletion_with_retry(messages=messages, stop="<END_OF_TURN>")
+        else:
+            stream = await self.acompletion_with_retry(
+                llm=llm,
+                messages=messages,
+                stop="<END_OF_TURN>",
+                stream=True,
+                model=model,
+            )
+        return aaccount_stream(stream, model, messages)
 
+    @traced("agent.generate", _agent_span_attributes)
     def _call(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """
         Executes one step of the sales agent.
@@ -512,8 +618,16 @@ class SalesGPT(Chain):
             "conversation_type": self.conversation_type,
         }
 
+        # Serve a near-identical earlier question from the semantic cache if enabled
+        question = self._last_user_turn() if self.semantic_cache is not None else None
+        cached_answer, question_vector = self._semantic_lookup(question)
+        self.last_utterance_cached = cached_answer is not None
+
         # Generate agent's utterance
-        if self.use_tools:
+        if cached_answer is not None:
+            ai_message = self._cached_ai_message(inputs, cached_answer)
+            output = cached_answer
+        elif self.use_tools:
             ai_message = self.sales_agent_executor.invoke(inputs)
             output = ai_message["output"]
         else:
@@ -521,6 +635,8 @@ class SalesGPT(Chain):
                 inputs, return_intermediate_steps=True
             )
             output = ai_message["text"]
+        if cached_answer is None:
+            self._semantic_store(question, question_vector, ai_message, output)
 
         # Add agent's response to conversation history
         agent_name = self.salesperson_name
@@ -531,15 +647,13 @@ class SalesGPT(Chain):
 
         if self.verbose:
             tool_status = "USE TOOLS INVOKE:" if self.use_tools else "WITHOUT TOOLS:"
-            print(f"{tool_status}\n#\n#\n#\n#\n------------------")
-            print(f"AI Message: {ai_message}")
-            print()
-            print(f"Output: {output.replace('<END_OF_TURN>', '')}")
+            logger.debug("%s AI message: %s", tool_status, ai_message)
+            logger.debug("Output: %s", output.replace("<END_OF_TURN>", ""))
 
         return ai_message
 
     @classmethod
-    @time_logger
+    @traced("agent.from_llm")
     def from_llm(cls, llm: ChatLiteLLM, verbose: bool = False, **kwargs) -> "SalesGPT":
         """
         Class method to initialize the SalesGPT Controller from a given ChatLiteLLM instance.
@@ -593,10 +707,31 @@ class SalesGPT(Chain):
             )
         sales_agent_executor = None
         knowledge_base = None
+        tool_cache = None
+
+        # Memoize tool results per session unless explicitly disabled
+        memoize_tools = kwargs.pop("memoize_tools", True)
+
+        # Share answers to near-identical questions across sessions, opt-in
+        use_semantic_cache = kwargs.pop("use_semantic_cache", False)
+        if isinstance(use_semantic_cache, str):
+            use_semantic_cache = use_semantic_cache.lower() in ["true", "1", "t"]
+        semantic_cache = get_semantic_response_cache() if use_semantic_cache else None
 
         if use_tools:
+            # Imported here: langchain.agents, the vector store, embeddings and email
+            # support cost seconds of startup that a tool-less chat never needs.
+            from langchain.agents import LLMSingleActionAgent
+
+            from salesgpt.custom_invoke import CustomAgentExecutor
+            from salesgpt.parsers import SalesConvoOutputParser
+            from salesgpt.templates import CustomPromptTemplateForTools
+            from salesgpt.tools import get_tools, is_cacheable_observation
+
             product_catalog = kwargs.pop("product_catalog", None)
-            tools = get_tools(product_catalog)
+            if memoize_tools:
+                tool_cache = ToolResultCache(is_cacheable=is_cacheable_observation)
+            tools = get_tools(product_catalog, tool_cache=tool_cache)
 
             prompt = CustomPromptTemplateForTools(
                 template=SALES_AGENT_TOOLS_PROMPT,
@@ -638,6 +773,8 @@ class SalesGPT(Chain):
             sales_conversation_utterance_chain=sales_conversation_utterance_chain,
             sales_agent_executor=sales_agent_executor,
             knowledge_base=knowledge_base,
+            tool_cache=tool_cache,
+            semantic_cache=semantic_cache,
             model_name=llm.model,
             verbose=verbose,
             use_tools=use_tools,
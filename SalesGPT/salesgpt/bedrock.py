@@ -0,0 +1,274 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+from salesgpt.llm_cache import get_llm_cache
+
+SERVICE_NAME = "bedrock-runtime"
+
+# Error codes Bedrock uses when a request should be retried after backing off.
+THROTTLING_ERROR_CODES = frozenset(
+    {
+        "ThrottlingException",
+        "TooManyRequestsException",
+        "ServiceUnavailableException",
+        "ModelNotReadyException",
+    }
+)
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """True if `error` is a botocore ClientError carrying one of THROTTLING_ERROR_CODES."""
+    response = getattr(error, "response", None)
+    if not isinstance(response, dict):
+        return False
+    return response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+class BedrockClientManager:
+    """
+    Process-wide owner of long-lived Bedrock runtime clients.
+
+    Sync `boto3` clients are created lazily, one per region, and shared by every
+    thread. Async `aioboto3` clients are created lazily, one per (event loop, region),
+    and kept open until `aclose` is called. This way credential resolution and the
+    TLS handshake are paid once instead of on every completion.
+
+    Args:
+        max_pool_connections (int): Size of each client's HTTP connection pool.
+            Defaults to BEDROCK_MAX_POOL_CONNECTIONS or 25.
+        default_region (str): Region used when none is given. Defaults to AWS_REGION_NAME.
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: Optional[int] = None,
+        default_region: Optional[str] = None,
+    ):
+        self.max_pool_connections = max_pool_connections or int(
+            os.getenv("BEDROCK_MAX_POOL_CONNECTIONS", "25")
+        )
+        self.default_region = default_region or os.environ.get("AWS_REGION_NAME")
+        self._session = None
+        self._async_session = None
+        self._clients: Dict[Optional[str], Any] = {}
+        self._async_clients: Dict[Tuple[asyncio.AbstractEventLoop, Optional[str]], Any] = {}
+        self._async_stacks: Dict[asyncio.AbstractEventLoop, AsyncExitStack] = {}
+        self._lock = threading.Lock()
+        self._async_locks: Dict[asyncio.AbstractEventLoop, asyncio.Lock] = {}
+
+    def _config(self):
+        from botocore.config import Config
+
+        return Config(max_pool_connections=self.max_pool_connections)
+
+    def client(self, region_name: Optional[str] = None):
+        """Returns the shared sync client for `region_name`."""
+        region_name = region_name or self.default_region
+        with self._lock:
+            client = self._clients.get(region_name)
+            if client is None:
+                if self._session is None:
+                    import boto3
+
+                    self._session = boto3.session.Session()
+                client = self._session.client(
+                    service_name=SERVICE_NAME,
+                    region_name=region_name,
+                    config=self._config(),
+                )
+                self._clients[region_name] = client
+            return client
+
+    async def aclient(self, region_name: Optional[str] = None):
+        """Returns the shared async client for `region_name` on the running event loop."""
+        region_name = region_name or self.default_region
+        loop = asyncio.get_running_loop()
+        key = (loop, region_name)
+        client = self._async_clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            async_lock = self._async_locks.setdefault(loop, asyncio.Lock())
+        async with async_lock:
+            client = self._async_clients.get(key)
+            if client is None:
+                if self._async_session is None:
+                    import aioboto3
+
+                    self._async_session = aioboto3.Session()
+                stack = self._async_stacks.setdefault(loop, AsyncExitStack())
+                client = await stack.enter_async_context(
+                    self._async_session.client(
+                        service_name=SERVICE_NAME,
+                        region_name=region_name,
+                        config=self._config(),
+                    )
+                )
+                self._async_clients[key] = client
+            return client
+
+    def close(self) -> None:
+        """Closes every sync client. Safe to call more than once."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Closes the async clients opened on the running loop, then the sync clients."""
+        loop = asyncio.get_running_loop()
+        stack = self._async_stacks.pop(loop, None)
+        self._async_locks.pop(loop, None)
+        for key in [key for key in self._async_clients if key[0] is loop]:
+            del self._async_clients[key]
+        if stack is not None:
+            await stack.aclose()
+        self.close()
+
+
+_manager: Optional[BedrockClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_bedrock_client_manager() -> BedrockClientManager:
+    """Returns the process-wide `BedrockClientManager`, creating it on first use."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = BedrockClientManager()
+            atexit.register(_manager.close)
+        return _manager
+
+
+def _anthropic_body(system_prompt, messages, max_tokens, stop=None):
+    body = {
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "system": system_prompt,
+        "messages": messages,
+    }
+    if stop:
+        body["stop_sequences"] = [stop] if isinstance(stop, str) else list(stop)
+    return json.dumps(body)
+
+
+def _stream_event_text(event: Dict[str, Any]) -> Optional[str]:
+    """Returns the text delta carried by one response-stream event, if any."""
+    chunk = event.get("chunk")
+    if not chunk:
+        return None
+    payload = json.loads(chunk["bytes"])
+    if payload.get("type") != "content_block_delta":
+        return None
+    return payload["delta"].get("text")
+
+
+def _cached_request(model_id: str, body: str, stream: bool = False) -> Dict[str, Any]:
+    return {"modelId": model_id, "body": body, "stream": stream}
+
+
+def completion_bedrock(model_id, system_prompt, messages, max_tokens=1000, region_name=None):
+    """
+    High-level API call to generate a message with Anthropic Claude.
+    """
+    body = _anthropic_body(system_prompt, messages, max_tokens)
+
+    def invoke():
+        bedrock_runtime = get_bedrock_client_manager().client(region_name)
+        response = bedrock_runtime.invoke_model(body=body, modelId=model_id)
+        return json.loads(response.get("body").read())
+
+    cache = get_llm_cache()
+    if cache is None:
+        return invoke()
+    return cache.call("bedrock", _cached_request(model_id, body), invoke)
+
+
+async def acompletion_bedrock(
+    model_id, system_prompt, messages, max_tokens=1000, region_name=None
+):
+    """
+    High-level API call to generate a message with Anthropic Claude, refactored for async.
+    """
+    body = _anthropic_body(system_prompt, messages, max_tokens)
+
+    async def invoke():
+        bedrock_runtime = await get_bedrock_client_manager().aclient(region_name)
+        response = await bedrock_runtime.invoke_model(body=body, modelId=model_id)
+        # Correctly handle the streaming body
+        response_body_bytes = await response["body"].read()
+        return json.loads(response_body_bytes.decode("utf-8"))
+
+    cache = get_llm_cache()
+    if cache is None:
+        return await invoke()
+    return await cache.acall("bedrock", _cached_request(model_id, body), invoke)
+
+
+def stream_completion_bedrock(
+    model_id,
+    system_prompt,
+    messages,
+    max_tokens=1000,
+    region_name=None,
+    stop: Optional[Union[str, List[str]]] = None,
+) -> Iterator[str]:
+    """
+    Streams a message from Anthropic Claude, yielding text deltas as Bedrock emits them.
+    """
+    body = _anthropic_body(system_prompt, messages, max_tokens, stop)
+
+    def invoke():
+        bedrock_runtime = get_bedrock_client_manager().client(region_name)
+        response = bedrock_runtime.invoke_model_with_response_stream(
+            body=body, modelId=model_id
+        )
+        for event in response["body"]:
+            text = _stream_event_text(event)
+            if text:
+                yield text
+
+    cache = get_llm_cache()
+    if cache is None:
+        yield from invoke()
+    else:
+        yield from cache.stream("bedrock", _cached_request(model_id, body, True), invoke)
+
+
+async def astream_completion_bedrock(
+    model_id,
+    system_prompt,
+    messages,
+    max_tokens=1000,
+    region_name=None,
+    stop: Optional[Union[str, List[str]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Async variant of `stream_completion_bedrock`.
+    """
+    body = _anthropic_body(system_prompt, messages, max_tokens, stop)
+
+    async def invoke():
+        bedrock_runtime = await get_bedrock_client_manager().aclient(region_name)
+        response = await bedrock_runtime.invoke_model_with_response_stream(
+            body=body, modelId=model_id
+        )
+        async for event in response["body"]:
+            text = _stream_event_text(event)
+            if text:
+                yield text
+
+    cache = get_llm_cache()
+    stream = (
+        invoke()
+        if cache is None
+        else cache.astream("bedrock", _cached_request(model_id, body, True), invoke)
+    )
+    async for text in stream:
+        yield text
@@ -2,18 +2,19 @@ from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain_community.chat_models import ChatLiteLLM
 
-from salesgpt.logger import time_logger
+from salesgpt.metrics import ROLE_STAGE_ANALYZER
 from salesgpt.prompts import (
     SALES_AGENT_INCEPTION_PROMPT,
     STAGE_ANALYZER_INCEPTION_PROMPT,
 )
+from salesgpt.tracing import traced
 
 
 class StageAnalyzerChain(LLMChain):
     """Chain to analyze which conversation stage should the conversation move into."""
 
     @classmethod
-    @time_logger
+    @traced("chain.stage_analyzer.from_llm")
     def from_llm(cls, llm: ChatLiteLLM, verbose: bool = True) -> LLMChain:
         """Get the response parser."""
         stage_analyzer_inception_prompt_template = STAGE_ANALYZER_INCEPTION_PROMPT
@@ -26,14 +27,15 @@ class StageAnalyzerChain(LLMChain):
             ],
         )
         print(f"STAGE ANALYZER PROMPT {prompt}")
-        return cls(prompt=prompt, llm=llm, verbose=verbose)
+        # The tag lets usage accounting and metrics tell stage analysis from replies.
+        return cls(prompt=prompt, llm=llm, verbose=verbose, tags=[ROLE_STAGE_ANALYZER])
 
 
 class SalesConversationChain(LLMChain):
     """Chain to generate the next utterance for the conversation."""
 
     @classmethod
-    @time_logger
+    @traced("chain.sales_conversation.from_llm")
     def from_llm(
         cls,
         llm: ChatLiteLLM,
@@ -0,0 +1,19 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Session the current agent turn belongs to. Set by SalesGPTAPI around each turn and
+# read by per-session components (tool memoization, tracing, accounting).
+current_session_id: ContextVar[Optional[str]] = ContextVar(
+    "salesgpt_session_id", default=None
+)
+
+
+@contextmanager
+def session_scope(session_id: Optional[str]) -> Iterator[None]:
+    """Binds `session_id` to the current context for the duration of the block."""
+    token = current_session_id.set(session_id)
+    try:
+        yield
+    finally:
+        current_session_id.reset(token)
@@ -10,8 +10,17 @@ from langchain_core.load.dump import dumpd
 from langchain_core.outputs import RunInfo
 from langchain_core.runnables import RunnableConfig, ensure_config
 
+from salesgpt.deadlines import remaining
+
 
 class CustomAgentExecutor(AgentExecutor):
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        # Plan no further tool calls once the request's deadline has passed.
+        left = remaining()
+        if left is not None and left <= 0:
+            return False
+        return super()._should_continue(iterations, time_elapsed)
+
     def invoke(
         self,
         input: Dict[str, Any],
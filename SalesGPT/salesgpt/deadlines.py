@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional, TypeVar
+
+# Stdlib only, like salesgpt.sessions, so the standalone app/ server can use it too.
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Absolute time.monotonic() by which the current request must be answered. Context
+# variables follow the request into tasks and run_in_executor worker threads.
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline passes before its work is done."""
+
+    status_code = 504
+
+    def __init__(self, what: str = "request"):
+        super().__init__(f"Deadline exceeded before {what} could finish")
+        self.what = what
+
+
+class ClientDisconnected(Exception):
+    """Raised in place of a response once the client has gone away."""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current deadline, or None when no deadline is set."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(what: str = "request") -> None:
+    """Raises `DeadlineExceeded` if the current deadline has already passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(what)
+
+
+def bounded_timeout(timeout: Optional[float] = None, what: str = "request") -> Optional[float]:
+    """
+    A per-call timeout that does not outlive the current deadline.
+
+    Args:
+        timeout (float, optional): The call's own timeout, if it has one.
+        what (str): Names the call in the `DeadlineExceeded` message.
+
+    Returns:
+        float: The smaller of `timeout` and the time left; None if neither is set.
+
+    Raises:
+        DeadlineExceeded: If no time is left to start the call.
+    """
+    check_deadline(what)
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+@contextmanager
+def deadline_scope(timeout: Optional[float]) -> Iterator[None]:
+    """
+    Sets a deadline `timeout` seconds from now for the block.
+
+    A nested scope can only tighten an enclosing deadline, never extend it. A None
+    timeout leaves the current deadline as it is.
+    """
+    if timeout is None:
+        yield
+        return
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def stop_at_deadline(retry_state: Any) -> bool:
+    """
+    Tenacity stop condition: no further attempt once the backoff would outlast the deadline.
+
+    Combine with the attempt limit, e.g. `stop_after_attempt(n) | stop_at_deadline`.
+    """
+    left = remaining()
+    return left is not None and left <= (getattr(retry_state, "upcoming_sleep", 0.0) or 0.0)
+
+
+async def run_within_deadline(awaitable: Awaitable[T], what: str = "request") -> T:
+    """
+    Awaits `awaitable`, cancelling it when the current deadline passes.
+
+    Raises:
+        DeadlineExceeded: If the deadline passed first.
+    """
+    try:
+        timeout = bounded_timeout(what=what)
+    except DeadlineExceeded:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(what) from None
+
+
+async def cancel_on_disconnect(
+    request: Any, awaitable: Awaitable[T], poll_interval: float = 0.25, metrics: Any = None
+) -> T:
+    """
+    Awaits `awaitable` while watching the client, cancelling the work if it leaves.
+
+    Work for a closed browser tab or a proxy that already timed out would otherwise
+    run to completion, spending provider quota on a reply nobody reads.
+
+    Args:
+        request (Request): The request whose client is watched.
+        awaitable (Awaitable): The work producing the response.
+        poll_interval (float): Seconds between disconnect checks.
+        metrics (AppMetrics, optional): Counts abandoned requests.
+
+    Raises:
+        ClientDisconnected: If the client went away before the work finished.
+    """
+    work = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({work}, timeout=poll_interval)
+            if done:
+                return work.result()
+            if await request.is_disconnected():
+                logger.info("Client left %s, cancelling its work", request.url.path)
+                if metrics is not None:
+                    metrics.requests_abandoned.inc(reason="disconnect")
+                raise ClientDisconnected()
+    finally:
+        if not work.done():
+            work.cancel()
+
+
+def request_timeout(value: Optional[str], default: float, maximum: float) -> float:
+    """
+    The deadline, in seconds, a request asked for in its X-Request-Timeout header.
+
+    Missing or unparseable values fall back to `default`; larger ones are capped at
+    `maximum` so a client cannot hold server capacity indefinitely.
+    """
+    try:
+        timeout = float(value) if value else default
+    except ValueError:
+        timeout = default
+    if timeout <= 0:
+        timeout = default
+    return min(timeout, maximum)
+
+
+def deadline_settings() -> Dict[str, float]:
+    """`install_deadlines` keyword arguments from REQUEST_TIMEOUT and REQUEST_TIMEOUT_MAX."""
+    return {
+        "default": float(os.getenv("REQUEST_TIMEOUT", "60")),
+        "maximum": float(os.getenv("REQUEST_TIMEOUT_MAX", "300")),
+    }
+
+
+def install_deadlines(
+    app: Any, metrics: Any = None, default: float = 60.0, maximum: float = 300.0
+) -> None:
+    """
+    Gives every request a deadline and answers expired or abandoned ones.
+
+    The deadline comes from the X-Request-Timeout header (seconds) or `default`.
+    `DeadlineExceeded` becomes a 504 and `ClientDisconnected` a bodyless 499, the
+    status proxies log for requests the client closed.
+
+    Args:
+        app (FastAPI): The app to install into.
+        metrics (AppMetrics, optional): Counts requests cut short by their deadline.
+        default (float): Seconds allowed when the request sets no deadline.
+        maximum (float): Upper bound on a requested deadline.
+    """
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, Response
+
+    @app.middleware("http")
+    async def bind_request_deadline(request: Request, call_next):
+        timeout = request_timeout(request.headers.get(DEADLINE_HEADER), default, maximum)
+        with deadline_scope(timeout):
+            return await call_next(request)
+
+    async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+        if metrics is not None:
+            metrics.requests_abandoned.inc(reason="deadline")
+        return JSONResponse({"detail": str(exc)}, status_code=exc.status_code)
+
+    async def client_disconnected(request: Request, exc: ClientDisconnected):
+        return Response(status_code=499)
+
+    app.add_exception_handler(DeadlineExceeded, deadline_exceeded)
+    app.add_exception_handler(ClientDisconnected, client_disconnected)
@@ -0,0 +1,316 @@
+import asyncio
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+
+from salesgpt.deadlines import DeadlineExceeded, bounded_timeout
+
+
+class ToolUnavailableError(Exception):
+    """Raised when a tool dependency is unhealthy and its circuit is open."""
+
+    def __init__(self, tool_name: str, retry_after: float = 0.0):
+        self.tool_name = tool_name
+        self.retry_after = retry_after
+        super().__init__(f"{tool_name} is temporarily unavailable")
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    """
+    Timeout, retry and circuit breaker settings for a single tool.
+
+    Attributes:
+        timeout (float): Total seconds allowed for a single HTTP attempt.
+        retries (int): Number of additional attempts after the first one fails.
+        backoff (float): Base delay in seconds for exponential backoff between attempts.
+        failure_threshold (int): Consecutive failures that open the circuit.
+        recovery_time (float): Seconds the circuit stays open before a trial request is let through.
+    """
+
+    timeout: float = 10.0
+    retries: int = 1
+    backoff: float = 0.25
+    failure_threshold: int = 5
+    recovery_time: float = 30.0
+
+
+DEFAULT_POLICY = ToolPolicy()
+
+DEFAULT_TOOL_POLICIES: Dict[str, ToolPolicy] = {
+    "GeneratePaymentLink": ToolPolicy(timeout=15.0, retries=1),
+    "SendCalendlyInvitation": ToolPolicy(timeout=8.0, retries=2),
+}
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker guarding a single downstream dependency.
+
+    The breaker is closed while the dependency is healthy. After `failure_threshold`
+    consecutive failures it opens and rejects calls for `recovery_time` seconds, then
+    lets a single trial call through (half-open). A successful trial closes it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = self.CLOSED
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_time
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def retry_after(self) -> float:
+        """Returns the number of seconds until the breaker lets a trial call through."""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self.recovery_time - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Returns True if a call may proceed, moving an expired open breaker to half-open."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_time:
+                    return False
+                self._state = self.HALF_OPEN
+                return True
+            # Half-open: only the single trial call that moved us here is allowed.
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def release(self) -> None:
+        """
+        Gives back a half-open trial that ended without saying anything about the
+        dependency (cancelled, or out of request time), so the next call may try again.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic() - self.recovery_time
+
+    def record_outcome_of(self, error: BaseException) -> None:
+        """Records a call that raised `error` instead of returning a response."""
+        if isinstance(error, (asyncio.CancelledError, DeadlineExceeded)):
+            self.release()
+        else:
+            self.record_failure()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def _is_retryable_response(response: httpx.Response) -> bool:
+    return response.status_code >= 500 or response.status_code == 429
+
+
+class ToolHttpClient:
+    """
+    Pooled HTTP client shared by the sales agent tools.
+
+    A single keep-alive `httpx.Client` serves the sync tool variants and one
+    `httpx.AsyncClient` per event loop serves the async ones. Every request is
+    made on behalf of a named tool, whose `ToolPolicy` decides the timeout and
+    retry budget and whose `CircuitBreaker` short-circuits calls while the
+    dependency is unhealthy. No attempt outlives the current request's deadline.
+
+    Example:
+
+        .. code-block:: python
+
+            client = get_http_client()
+            response = client.request("GeneratePaymentLink", "POST", url, json=payload)
+            response = await client.arequest("GeneratePaymentLink", "POST", url, json=payload)
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, ToolPolicy]] = None,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        transport: Optional[Any] = None,
+        async_transport: Optional[Any] = None,
+    ):
+        self.policies = dict(DEFAULT_TOOL_POLICIES)
+        if policies:
+            self.policies.update(policies)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+        )
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client: Optional[httpx.Client] = None
+        self._async_clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def policy(self, tool_name: str) -> ToolPolicy:
+        return self.policies.get(tool_name, DEFAULT_POLICY)
+
+    def breaker(self, tool_name: str) -> CircuitBreaker:
+        with self._lock:
+            if tool_name not in self._breakers:
+                policy = self.policy(tool_name)
+                self._breakers[tool_name] = CircuitBreaker(
+                    failure_threshold=policy.failure_threshold,
+                    recovery_time=policy.recovery_time,
+                )
+            return self._breakers[tool_name]
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(limits=self.limits, transport=self._transport)
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    limits=self.limits, transport=self._async_transport
+                )
+                self._async_clients[loop] = client
+            return client
+
+    @staticmethod
+    def _backoff_delay(policy: ToolPolicy, attempt: int) -> float:
+        return policy.backoff * (2**attempt) * (0.5 + random.random() / 2)
+
+    def request(self, tool_name: str, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a request on behalf of `tool_name`, honouring its timeout, retries and circuit breaker.
+
+        Raises:
+            ToolUnavailableError: If the tool's circuit is open.
+            httpx.HTTPError: If every attempt failed with a transport error, or the
+                request failed otherwise (e.g. too many redirects); counted as a failure.
+        """
+        policy = self.policy(tool_name)
+        breaker = self.breaker(tool_name)
+        if not breaker.allow():
+            raise ToolUnavailableError(tool_name, breaker.retry_after())
+
+        client = self._sync_client()
+        try:
+            for attempt in range(policy.retries + 1):
+                last_attempt = attempt == policy.retries
+                try:
+                    response = client.request(
+                        method, url, timeout=bounded_timeout(policy.timeout, tool_name), **kwargs
+                    )
+                except httpx.TransportError:
+                    if last_attempt:
+                        raise
+                else:
+                    if not _is_retryable_response(response):
+                        breaker.record_success()
+                        return response
+                    if last_attempt:
+                        breaker.record_failure()
+                        return response
+                time.sleep(self._backoff_delay(policy, attempt))
+        except BaseException as e:
+            # Every outcome must be recorded, or a half-open breaker never closes again.
+            breaker.record_outcome_of(e)
+            raise
+
+    async def arequest(
+        self, tool_name: str, method: str, url: str, **kwargs: Any
+    ) -> httpx.Response:
+        """Async counterpart of `request` backed by a pooled `httpx.AsyncClient`."""
+        policy = self.policy(tool_name)
+        breaker = self.breaker(tool_name)
+        if not breaker.allow():
+            raise ToolUnavailableError(tool_name, breaker.retry_after())
+
+        client = self._async_client()
+        try:
+            for attempt in range(policy.retries + 1):
+                last_attempt = attempt == policy.retries
+                try:
+                    response = await client.request(
+                        method, url, timeout=bounded_timeout(policy.timeout, tool_name), **kwargs
+                    )
+                except httpx.TransportError:
+                    if last_attempt:
+                        raise
+                else:
+                    if not _is_retryable_response(response):
+                        breaker.record_success()
+                        return response
+                    if last_attempt:
+                        breaker.record_failure()
+                        return response
+                await asyncio.sleep(self._backoff_delay(policy, attempt))
+        except BaseException as e:
+            breaker.record_outcome_of(e)
+            raise
+
+    def close(self) -> None:
+        """Closes the sync client. Async clients are closed with `aclose`."""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Closes the sync client and every async client owned by this instance."""
+        self.close()
+        with self._lock:
+            clients, self._async_clients = list(self._async_clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+
+_http_client: Optional[ToolHttpClient] = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client() -> ToolHttpClient:
+    """Returns the process-wide `ToolHttpClient`, creating it on first use."""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = ToolHttpClient()
+        return _http_client
+
+
+def set_http_client(client: Optional[ToolHttpClient]) -> None:
+    """Replaces the process-wide client, e.g. to change policies or inject a test transport."""
+    global _http_client
+    with _http_client_lock:
+        _http_client = client
@@ -0,0 +1,366 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import litellm
+from litellm.utils import (
+    Choices,
+    Delta,
+    Message,
+    ModelResponse,
+    StreamingChoices,
+    Usage,
+)
+
+from salesgpt.deadlines import bounded_timeout
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+AUTO = "auto"
+MODES = (OFF, RECORD, REPLAY, AUTO)
+
+# Call arguments that do not change what the model answers and must not affect the key.
+VOLATILE_REQUEST_KEYS = frozenset(
+    {
+        "api_key",
+        "api_base",
+        "base_url",
+        "headers",
+        "timeout",
+        "request_timeout",
+        "force_timeout",
+        "max_retries",
+        "num_retries",
+        "metadata",
+        "logger_fn",
+        "litellm_call_id",
+        "litellm_logging_obj",
+        "organization",
+    }
+)
+
+
+class LLMCacheMiss(LookupError):
+    """Raised in replay mode when no recording exists for a request."""
+
+    def __init__(self, provider: str, key: str):
+        super().__init__(
+            f"No recorded {provider} response for request {key}. "
+            f"Run once with LLM_CACHE_MODE=record or auto to capture it."
+        )
+        self.provider = provider
+        self.key = key
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def request_key(provider: str, request: Dict[str, Any]) -> str:
+    """Stable hash of a request, ignoring VOLATILE_REQUEST_KEYS."""
+    stable = {k: v for k, v in request.items() if k not in VOLATILE_REQUEST_KEYS}
+    canonical = json.dumps(
+        {"provider": provider, "request": stable}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Record/replay store for LLM calls, one JSON file per request hash.
+
+    Modes:
+        record: always call the model and (over)write the recording.
+        replay: serve recordings only; a missing one raises `LLMCacheMiss`.
+        auto: serve recordings when present, record the rest.
+
+    Streamed calls are stored as their list of chunks and replayed chunk by chunk.
+
+    Args:
+        path (str): Directory holding the recordings.
+        mode (str): One of `record`, `replay` or `auto`.
+        replay_latency (float): Seconds to wait before a replayed response or first chunk.
+        chunk_interval (float): Seconds to wait between replayed stream chunks.
+    """
+
+    def __init__(
+        self,
+        path: str = "llm_cache",
+        mode: str = AUTO,
+        replay_latency: float = 0.0,
+        chunk_interval: float = 0.0,
+    ):
+        if mode not in (RECORD, REPLAY, AUTO):
+            raise ValueError(f"Unsupported LLM cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.chunk_interval = chunk_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _lookup(self, provider: str, key: str) -> Optional[Dict[str, Any]]:
+        if self.mode != RECORD and os.path.exists(self._file(key)):
+            with open(self._file(key), "r") as f:
+                entry = json.load(f)
+            with self._lock:
+                self.hits += 1
+            return entry
+        if self.mode == REPLAY:
+            raise LLMCacheMiss(provider, key)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _save(self, provider: str, key: str, request: Dict[str, Any], **recorded) -> None:
+        entry = {
+            "provider": provider,
+            "request": {k: v for k, v in request.items() if k not in VOLATILE_REQUEST_KEYS},
+            "recorded_at": time.time(),
+            **recorded,
+        }
+        tmp_file = f"{self._file(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(entry, f, indent=2, default=str)
+        os.replace(tmp_file, self._file(key))
+
+    def call(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        invoke: Callable[[], Any],
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> Any:
+        """Returns the recorded response for `request`, or calls `invoke` and records it."""
+        key = request_key(provider, request)
+        entry = self._lookup(provider, key)
+        if entry is not None:
+            time.sleep(self.replay_latency)
+            return decode(entry["response"])
+        response = invoke()
+        self._save(provider, key, request, response=encode(response))
+        return response
+
+    async def acall(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        invoke: Callable[[], Any],
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> Any:
+        """Async variant of `call`; `invoke` returns an awaitable."""
+        key = request_key(provider, request)
+        entry = self._lookup(provider, key)
+        if entry is not None:
+            await asyncio.sleep(self.replay_latency)
+            return decode(entry["response"])
+        response = await invoke()
+        self._save(provider, key, request, response=encode(response))
+        return response
+
+    def stream(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        invoke: Callable[[], Iterator[Any]],
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> Iterator[Any]:
+        """
+        Replays recorded chunks for `request`, or streams from `invoke` and records the
+        chunks once the stream has been fully consumed.
+        """
+        key = request_key(provider, request)
+        entry = self._lookup(provider, key)
+        if entry is not None:
+            time.sleep(self.replay_latency)
+            for index, chunk in enumerate(entry["chunks"]):
+                if index:
+                    time.sleep(self.chunk_interval)
+                yield decode(chunk)
+            return
+        chunks: List[Any] = []
+        for chunk in invoke():
+            chunks.append(encode(chunk))
+            yield chunk
+        self._save(provider, key, request, chunks=chunks)
+
+    async def astream(
+        self,
+        provider: str,
+        request: Dict[str, Any],
+        invoke: Callable[[], Any],
+        encode: Callable[[Any], Any] = _identity,
+        decode: Callable[[Any], Any] = _identity,
+    ) -> AsyncIterator[Any]:
+        """Async variant of `stream`; `invoke` returns an async iterable, or an awaitable of one."""
+        key = request_key(provider, request)
+        entry = self._lookup(provider, key)
+        if entry is not None:
+            await asyncio.sleep(self.replay_latency)
+            for index, chunk in enumerate(entry["chunks"]):
+                if index:
+                    await asyncio.sleep(self.chunk_interval)
+                yield decode(chunk)
+            return
+        chunks: List[Any] = []
+        stream = invoke()
+        if asyncio.iscoroutine(stream):
+            stream = await stream
+        async for chunk in stream:
+            chunks.append(encode(chunk))
+            yield chunk
+        self._save(provider, key, request, chunks=chunks)
+
+
+def encode_litellm_response(response: ModelResponse) -> Dict[str, Any]:
+    return response.model_dump()
+
+
+def decode_litellm_response(data: Dict[str, Any]) -> ModelResponse:
+    """Rebuilds a `ModelResponse`; its constructor ignores `choices` passed as dicts."""
+    stream = data.get("object") == "chat.completion.chunk"
+    response = ModelResponse(
+        id=data.get("id"),
+        created=data.get("created"),
+        model=data.get("model"),
+        usage=Usage(**data["usage"]) if data.get("usage") else None,
+        stream=stream,
+    )
+    if stream:
+        response.choices = [
+            StreamingChoices(
+                finish_reason=choice.get("finish_reason"),
+                index=choice.get("index", 0),
+                delta=Delta(**(choice.get("delta") or {})),
+            )
+            for choice in data.get("choices", [])
+        ]
+    else:
+        response.choices = [
+            Choices(
+                finish_reason=choice.get("finish_reason"),
+                index=choice.get("index", 0),
+                message=Message(**choice["message"]),
+            )
+            for choice in data.get("choices", [])
+        ]
+    return response
+
+
+_cache: Optional[LLMCache] = None
+_originals: Dict[str, Callable[..., Any]] = {}
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Returns the installed cache, or None when LLM calls go straight to the providers."""
+    return _cache
+
+
+def _original(name: str) -> Callable[..., Any]:
+    return _originals.get(name) or getattr(litellm, name)
+
+
+def _bound_to_deadline(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    timeout = bounded_timeout(kwargs.get("timeout"), "LLM call")
+    return kwargs if timeout is None else dict(kwargs, timeout=timeout)
+
+
+def completion(**kwargs: Any) -> Any:
+    """`litellm.completion` routed through the installed cache."""
+    kwargs = _bound_to_deadline(kwargs)
+    cache = get_llm_cache()
+    invoke = partial(_original("completion"), **kwargs)
+    if cache is None:
+        return invoke()
+    method = cache.stream if kwargs.get("stream") else cache.call
+    return method(
+        "litellm",
+        kwargs,
+        invoke,
+        encode=encode_litellm_response,
+        decode=decode_litellm_response,
+    )
+
+
+async def acompletion(**kwargs: Any) -> Any:
+    """`litellm.acompletion` routed through the installed cache."""
+    kwargs = _bound_to_deadline(kwargs)
+    cache = get_llm_cache()
+    invoke = partial(_original("acompletion"), **kwargs)
+    if cache is None:
+        return await invoke()
+    if kwargs.get("stream"):
+        return cache.astream(
+            "litellm",
+            kwargs,
+            invoke,
+            encode=encode_litellm_response,
+            decode=decode_litellm_response,
+        )
+    return await cache.acall(
+        "litellm",
+        kwargs,
+        invoke,
+        encode=encode_litellm_response,
+        decode=decode_litellm_response,
+    )
+
+
+def install_llm_cache(cache: Optional[LLMCache]) -> None:
+    """
+    Routes every LLM call in the process through `cache`, or restores direct calls
+    when `cache` is None.
+
+    Bedrock helpers and the SalesGPT call sites consult the cache directly.
+    `litellm.completion`/`acompletion` are swapped as well so that `ChatLiteLLM`,
+    which calls through the litellm module, is covered too.
+    """
+    global _cache
+    _cache = cache
+    if cache is not None and not _originals:
+        _originals["completion"] = litellm.completion
+        _originals["acompletion"] = litellm.acompletion
+        litellm.completion = completion
+        litellm.acompletion = acompletion
+    elif cache is None and _originals:
+        litellm.completion = _originals.pop("completion")
+        litellm.acompletion = _originals.pop("acompletion")
+
+
+def configure_llm_cache_from_env() -> Optional[LLMCache]:
+    """
+    Installs a cache configured by LLM_CACHE_MODE (off, record, replay, auto),
+    LLM_CACHE_PATH, LLM_CACHE_REPLAY_LATENCY and LLM_CACHE_CHUNK_INTERVAL.
+    """
+    mode = os.getenv("LLM_CACHE_MODE", OFF).lower()
+    if mode not in MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(MODES)}, got {mode}")
+    if mode == OFF:
+        install_llm_cache(None)
+        return None
+    cache = LLMCache(
+        path=os.getenv("LLM_CACHE_PATH", "llm_cache"),
+        mode=mode,
+        replay_latency=float(os.getenv("LLM_CACHE_REPLAY_LATENCY", "0")),
+        chunk_interval=float(os.getenv("LLM_CACHE_CHUNK_INTERVAL", "0")),
+    )
+    install_llm_cache(cache)
+    logger.info(f"LLM calls go through the {mode} cache at {cache.path}")
+    return cache
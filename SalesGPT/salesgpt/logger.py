@@ -1,37 +1,236 @@
+import atexit
+import json
 import logging
-import time
-from functools import wraps
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Dict, List, Optional
+
+from salesgpt.context import current_session_id
+from salesgpt.tracing import current_span, traced
 
 logger = logging.getLogger(__name__)
 
-stream_handler = logging.StreamHandler()
-log_filename = "output.log"
-file_handler = logging.FileHandler(filename=log_filename)
-handlers = [stream_handler, file_handler]
+TEXT_FORMAT = "%(name)s %(asctime)s - %(levelname)s - %(session_id)s - %(message)s"
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamps records with the session, trace and span ids of the code that logged them.
+    Runs in the thread that logs, before the record is queued, so the ids are correct.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.session_id = current_session_id.get() or "-"
+        active = current_span()
+        record.trace_id = active.trace_id if active else None
+        record.span_id = active.span_id if active else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the records below WARNING from chosen loggers.
+
+    Rates apply to a logger and its children; the longest matching name wins.
+    Sampling is deterministic: a rate of 0.25 keeps every fourth record.
+
+    Args:
+        rates (Dict[str, float]): Logger name to the fraction of records kept.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._credit: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, name: str) -> Optional[float]:
+        best = None
+        for prefix in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                if best is None or len(prefix) > len(best):
+                    best = prefix
+        return self.rates[best] if best is not None else None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate is None or rate >= 1:
+            return True
+        with self._lock:
+            credit = self._credit.get(record.name, 0.0) + rate
+            keep = credit >= 1
+            self._credit[record.name] = credit - 1 if keep else credit
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with the context stamped by ContextFilter."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "session_id": getattr(record, "session_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+            "span_id": getattr(record, "span_id", None),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
 
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller on a full queue, except to keep warnings and errors."""
 
-class TimeFilter(logging.Filter):
-    def filter(self, record):
-        return "Running" in record.getMessage()
+    dropped = 0
 
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+            else:
+                self.dropped += 1
 
-logger.addFilter(TimeFilter())
 
-# Configure the logging module
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(name)s %(asctime)s - %(levelname)s - %(message)s",
-    handlers=handlers,
-)
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parses "salesgpt.agents=0.1,salesgpt.tracing=0.01" into a rate per logger."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_setup_lock = threading.Lock()
+
+
+def _file_handler(
+    log_file: str, max_bytes: int, backup_count: int, rotate_when: Optional[str]
+) -> logging.Handler:
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            log_file, when=rotate_when, backupCount=backup_count, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+
+
+def setup_logging(
+    level: Optional[str] = None,
+    log_file: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    backup_count: Optional[int] = None,
+    rotate_when: Optional[str] = None,
+    sampling: Optional[Dict[str, float]] = None,
+    json_format: Optional[bool] = None,
+    queue_size: Optional[int] = None,
+) -> logging.handlers.QueueListener:
+    """
+    Routes all logging through a queue to a background writer thread, so logging on
+    the event loop never blocks on console or file I/O.
+
+    Arguments left as None are read from LOG_LEVEL, LOG_FILE, LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT, LOG_ROTATE_WHEN, LOG_SAMPLING, LOG_FORMAT and LOG_QUEUE_SIZE.
+    Calling it again replaces the previous setup.
+
+    Args:
+        level (str): Root log level. Defaults to INFO.
+        log_file (str): File to also log to; empty logs to stderr only.
+        max_bytes (int): Size at which the file is rotated.
+        backup_count (int): Rotated files kept.
+        rotate_when (str): TimedRotatingFileHandler interval such as "midnight";
+            rotates by time instead of size when set.
+        sampling (Dict[str, float]): Fraction of sub-WARNING records kept per logger.
+        json_format (bool): Emit one JSON object per line instead of text.
+        queue_size (int): Records buffered for the writer; when full, new sub-WARNING
+            records are dropped rather than blocking the caller.
+
+    Returns:
+        logging.handlers.QueueListener: The running background writer.
+    """
+    global _listener, _queue_handler
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if log_file is None:
+        log_file = os.getenv("LOG_FILE", "output.log")
+    if max_bytes is None:
+        max_bytes = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    if backup_count is None:
+        backup_count = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+    if rotate_when is None:
+        rotate_when = os.getenv("LOG_ROTATE_WHEN") or None
+    if sampling is None:
+        sampling = parse_sampling(os.getenv("LOG_SAMPLING", ""))
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    if queue_size is None:
+        queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(_file_handler(log_file, max_bytes, backup_count, rotate_when))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    queue_handler = _DroppingQueueHandler(queue.Queue(queue_size))
+    queue_handler.addFilter(ContextFilter())
+    if sampling:
+        queue_handler.addFilter(SamplingFilter(sampling))
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, *handlers, respect_handler_level=True
+    )
+
+    with _setup_lock:
+        root = logging.getLogger()
+        if _queue_handler is not None:
+            root.removeHandler(_queue_handler)
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        else:
+            atexit.register(shutdown_logging)
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+        listener.start()
+        _listener, _queue_handler = listener, queue_handler
+    return listener
+
+
+def shutdown_logging() -> None:
+    """Writes the records still queued and stops the background writer."""
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _queue_handler is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+        if _listener is not None:
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _listener, _queue_handler = None, None
 
 
 def time_logger(func):
     """
     Decorator function to log the time taken by any function.
 
-    This decorator logs the execution time of the decorated function. It logs the start time before the function
-    execution, the end time after the function execution, and calculates the execution time. The function name and
-    execution time are then logged at the INFO level.
+    Kept for backwards compatibility: the function now runs in a span named after it,
+    see `salesgpt.tracing.traced`, which also times coroutines and generators correctly.
 
     Args:
         func (Callable): The function to be decorated.
@@ -39,14 +238,4 @@ def time_logger(func):
     Returns:
         Callable: The decorated function.
     """
-
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.time()  # Start time before function execution
-        result = func(*args, **kwargs)  # Function execution
-        end_time = time.time()  # End time after function execution
-        execution_time = end_time - start_time  # Calculate execution time
-        logger.info(f"Running {func.__name__}: --- {execution_time} seconds ---")
-        return result
-
-    return wrapper
+    return traced(func.__name__)(func)
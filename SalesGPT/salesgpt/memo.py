@@ -0,0 +1,167 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.tools import Tool
+
+from salesgpt.context import current_session_id
+
+# Seconds a tool result stays valid within a session. 0 disables memoization.
+DEFAULT_TOOL_TTLS: Dict[str, float] = {
+    "ProductSearch": 600.0,
+    "GeneratePaymentLink": 300.0,
+}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_tool_input(tool_input: Any) -> str:
+    """Case- and whitespace-insensitive form of a tool input used as the cache key."""
+    text = tool_input if isinstance(tool_input, str) else repr(tool_input)
+    return _WHITESPACE.sub(" ", text).strip().strip(".?!").lower()
+
+
+def _with_entry_points(tool: Tool, func: Callable, coroutine: Optional[Callable]) -> Tool:
+    return Tool(
+        name=tool.name,
+        description=tool.description,
+        func=func,
+        coroutine=coroutine,
+        args_schema=tool.args_schema,
+        return_direct=tool.return_direct,
+        metadata=tool.metadata,
+        tags=tool.tags,
+    )
+
+
+class ToolResultCache:
+    """
+    Per-session memoization of tool results with per-tool TTLs.
+
+    Results are keyed by (session id, tool name, normalized input). The session id
+    comes from `salesgpt.context.current_session_id`, so one cache can safely back
+    tools that are shared between sessions. Tools with side effects opt out by
+    setting ``metadata={"memoize": False}``; calls to them are counted as bypassed.
+
+    Args:
+        ttls (Dict[str, float]): Per-tool TTL overrides in seconds, merged into DEFAULT_TOOL_TTLS.
+        default_ttl (float): TTL for tools without an entry in `ttls`.
+        max_entries (int): Upper bound on cached results across all sessions (LRU evicted).
+        is_cacheable (Callable): Decides whether a result may be stored, e.g. to skip error observations.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 300.0,
+        max_entries: int = 2048,
+        is_cacheable: Callable[[Any], bool] = lambda result: True,
+    ):
+        self.ttls = dict(DEFAULT_TOOL_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.is_cacheable = is_cacheable
+        self._entries: "OrderedDict[Tuple[Optional[str], str, str], Tuple[float, Any]]" = OrderedDict()
+        self._stats: Dict[Optional[str], Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def ttl(self, tool_name: str) -> float:
+        return self.ttls.get(tool_name, self.default_ttl)
+
+    def _count(self, session_id: Optional[str], outcome: str) -> None:
+        stats = self._stats.setdefault(
+            session_id, {"hits": 0, "misses": 0, "bypassed": 0}
+        )
+        stats[outcome] += 1
+
+    def get(self, tool_name: str, tool_input: Any) -> Tuple[bool, Any]:
+        """Returns (True, result) on a fresh hit for the current session, else (False, None)."""
+        session_id = current_session_id.get()
+        key = (session_id, tool_name, normalize_tool_input(tool_input))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._count(session_id, "hits")
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._count(session_id, "misses")
+            return False, None
+
+    def put(self, tool_name: str, tool_input: Any, result: Any) -> None:
+        ttl = self.ttl(tool_name)
+        if ttl <= 0 or not self.is_cacheable(result):
+            return
+        key = (current_session_id.get(), tool_name, normalize_tool_input(tool_input))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self._count(current_session_id.get(), "bypassed")
+
+    def stats(self, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Hit/miss counters for a session, including the hit rate over memoizable calls."""
+        with self._lock:
+            stats = dict(
+                self._stats.get(session_id, {"hits": 0, "misses": 0, "bypassed": 0})
+            )
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def clear_session(self, session_id: Optional[str]) -> None:
+        """Drops every cached result and counter of a finished session."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                del self._entries[key]
+            self._stats.pop(session_id, None)
+
+    def _is_memoizable(self, tool: Tool) -> bool:
+        metadata = tool.metadata or {}
+        return metadata.get("memoize", True) and self.ttl(tool.name) > 0
+
+    def wrap(self, tool: Tool) -> Tool:
+        """Returns a copy of `tool` whose sync and async entry points consult the cache."""
+        func, coroutine, name = tool.func, tool.coroutine, tool.name
+
+        if not self._is_memoizable(tool):
+
+            def bypass(tool_input: str) -> Any:
+                self.record_bypass()
+                return func(tool_input)
+
+            async def abypass(tool_input: str) -> Any:
+                self.record_bypass()
+                return await coroutine(tool_input)
+
+            return _with_entry_points(tool, bypass, abypass if coroutine else None)
+
+        def memoized(tool_input: str) -> Any:
+            hit, result = self.get(name, tool_input)
+            if hit:
+                return result
+            result = func(tool_input)
+            self.put(name, tool_input, result)
+            return result
+
+        async def amemoized(tool_input: str) -> Any:
+            hit, result = self.get(name, tool_input)
+            if hit:
+                return result
+            result = await coroutine(tool_input)
+            self.put(name, tool_input, result)
+            return result
+
+        return _with_entry_points(tool, memoized, amemoized if coroutine else None)
+
+    def wrap_all(self, tools: List[Tool]) -> List[Tool]:
+        return [self.wrap(tool) for tool in tools]
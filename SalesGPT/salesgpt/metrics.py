@@ -0,0 +1,412 @@
+import asyncio
+import bisect
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Kept free of third-party imports so both FastAPI apps, including the standalone
+# app/ server, can expose the same metrics.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6)
+
+# LLM call roles; `llm_role` maps accounting sources onto them.
+ROLE_UTTERANCE = "utterance"
+ROLE_STAGE_ANALYZER = "stage_analyzer"
+ROLE_TOOL_HELPER = "tool_helper"
+# Tags the run of a model that only dispatches to backends, whose own runs are counted.
+ROUTER_RUN_TAG = "llm_router"
+
+
+def llm_role(source: str) -> str:
+    """Tool helpers account their calls under their own name; they share one role."""
+    if source in (ROLE_UTTERANCE, ROLE_STAGE_ANALYZER):
+        return source
+    return ROLE_TOOL_HELPER
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; either set directly or read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        self._function = function
+
+    def value(self, **labels: Any) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self.value())}"]
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: count per bucket (the last one is +Inf), then sum.
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total[0])) for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Metric {metric.name} is already registered as a {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class AppMetrics:
+    """
+    The SalesGPT service metrics: HTTP, LLM, TTS and tool latencies, tool errors,
+    session occupancy and evictions, and event-loop lag.
+
+    Args:
+        registry (MetricsRegistry): Registry the metrics are created in.
+    """
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None):
+        self.registry = registry or MetricsRegistry()
+        r = self.registry
+        self.http_latency = r.histogram(
+            "salesgpt_http_request_duration_seconds",
+            "Time to the response headers, per route.",
+            ("method", "route", "status"),
+        )
+        self.llm_latency = r.histogram(
+            "salesgpt_llm_call_duration_seconds", "LLM call latency.", ("role", "model")
+        )
+        self.llm_ttft = r.histogram(
+            "salesgpt_llm_time_to_first_token_seconds",
+            "Time to the first streamed token of an LLM call.",
+            ("role", "model"),
+        )
+        self.tts_latency = r.histogram(
+            "salesgpt_tts_duration_seconds", "Speech synthesis latency.", ("provider",)
+        )
+        self.tts_bytes = r.histogram(
+            "salesgpt_tts_audio_bytes", "Size of synthesized audio.", ("provider",), BYTES_BUCKETS
+        )
+        self.tool_latency = r.histogram(
+            "salesgpt_tool_duration_seconds", "Agent tool latency.", ("tool",)
+        )
+        self.tool_errors = r.counter(
+            "salesgpt_tool_errors_total", "Agent tool calls that raised.", ("tool",)
+        )
+        self.active_sessions = r.gauge(
+            "salesgpt_active_sessions", "Conversation sessions held by the server."
+        )
+        self.spilled_sessions = r.gauge(
+            "salesgpt_spilled_sessions", "Evicted sessions waiting on the spill tier."
+        )
+        self.session_evictions = r.counter(
+            "salesgpt_session_evictions_total", "Sessions evicted from memory.", ("reason",)
+        )
+        self.session_rehydrations = r.counter(
+            "salesgpt_session_rehydrations_total", "Evicted sessions brought back into memory."
+        )
+        self.turns_coalesced = r.counter(
+            "salesgpt_turns_coalesced_total", "Duplicate requests answered by an in-flight turn."
+        )
+        self.turns_rejected = r.counter(
+            "salesgpt_turns_rejected_total", "Requests refused because their session queue was full."
+        )
+        self.admission_in_use = r.gauge(
+            "salesgpt_admission_slots_in_use", "Admission slots held by running provider work."
+        )
+        self.admission_queue_depth = r.gauge(
+            "salesgpt_admission_queue_depth", "Work waiting for an admission slot.", ("priority",)
+        )
+        self.admission_wait = r.histogram(
+            "salesgpt_admission_wait_seconds",
+            "Time spent waiting for an admission slot.",
+            ("priority",),
+            buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+        )
+        self.admission_rejected = r.counter(
+            "salesgpt_admission_rejected_total",
+            "Work refused by admission control.",
+            ("priority", "reason"),
+        )
+        self.requests_abandoned = r.counter(
+            "salesgpt_requests_abandoned_total",
+            "Requests whose remaining work was cancelled, by reason.",
+            ("reason",),
+        )
+        self.event_loop_lag = r.histogram(
+            "salesgpt_event_loop_lag_seconds",
+            "How late the event loop woke a periodic timer.",
+            buckets=LAG_BUCKETS,
+        )
+
+    def observe_llm_call(
+        self, source: str, model: str, latency: float, time_to_first_token: Optional[float] = None
+    ) -> None:
+        role = llm_role(source)
+        self.llm_latency.observe(latency, role=role, model=model)
+        if time_to_first_token is not None:
+            self.llm_ttft.observe(time_to_first_token, role=role, model=model)
+
+    def observe_tts(self, provider: str, latency: float, audio_bytes: int) -> None:
+        self.tts_latency.observe(latency, provider=provider)
+        self.tts_bytes.observe(audio_bytes, provider=provider)
+
+    def observe_span(self, span: Any) -> None:
+        """
+        Span listener for salesgpt.tracing: records tool latency and errors. Tools report
+        most failures as an observation for the agent rather than raising, which
+        `trace_tool` marks with `tool.failed`.
+        """
+        if span.name != "tool":
+            return
+        tool = span.attributes.get("tool.name", "")
+        self.tool_latency.observe(span.duration, tool=tool)
+        if span.error or span.attributes.get("tool.failed"):
+            self.tool_errors.inc(tool=tool)
+
+    def render(self) -> str:
+        return self.registry.render()
+
+
+_app_metrics: Optional[AppMetrics] = None
+_app_metrics_lock = threading.Lock()
+
+
+def get_app_metrics() -> AppMetrics:
+    global _app_metrics
+    with _app_metrics_lock:
+        if _app_metrics is None:
+            _app_metrics = AppMetrics()
+        return _app_metrics
+
+
+async def monitor_event_loop_lag(metrics: AppMetrics, interval: float = 0.5) -> None:
+    """Records how much later than `interval` the loop resumes a sleeping task, forever."""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        metrics.event_loop_lag.observe(max(0.0, time.monotonic() - started - interval))
+
+
+def instrument_app(
+    app: Any,
+    metrics: Optional[AppMetrics] = None,
+    active_sessions: Optional[Callable[[], float]] = None,
+    lag_interval: float = 0.5,
+) -> AppMetrics:
+    """
+    Adds per-route request latency, event-loop lag monitoring and a GET /metrics
+    endpoint to a FastAPI app.
+
+    Args:
+        app (FastAPI): The app to instrument.
+        metrics (AppMetrics, optional): Defaults to the process-wide metrics.
+        active_sessions (Callable, optional): Returns the number of live sessions at scrape time.
+        lag_interval (float): Seconds between event-loop lag probes.
+
+    Returns:
+        AppMetrics: The metrics the app reports into.
+    """
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    metrics = metrics or get_app_metrics()
+    if active_sessions is not None:
+        metrics.active_sessions.set_function(active_sessions)
+
+    @app.middleware("http")
+    async def record_request_latency(request: Request, call_next):
+        started = time.monotonic()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            metrics.http_latency.observe(
+                time.monotonic() - started,
+                method=request.method,
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return Response(metrics.render(), media_type=CONTENT_TYPE)
+
+    lag_task: Dict[str, asyncio.Task] = {}
+
+    async def start_lag_monitor():
+        lag_task["task"] = asyncio.create_task(monitor_event_loop_lag(metrics, lag_interval))
+
+    async def stop_lag_monitor():
+        task = lag_task.pop("task", None)
+        if task is not None:
+            task.cancel()
+
+    app.add_event_handler("startup", start_lag_monitor)
+    app.add_event_handler("shutdown", stop_lag_monitor)
+    return metrics
@@ -1,16 +1,41 @@
-from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import logging
+import random
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
 
 from langchain_core.callbacks import (
     AsyncCallbackManagerForLLMRun,
     CallbackManagerForLLMRun,
 )
 from langchain_core.language_models import BaseChatModel, SimpleChatModel
+from langchain_core.language_models.chat_models import (
+    agenerate_from_stream,
+    generate_from_stream,
+)
 from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
 from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
-from langchain_core.runnables import run_in_executor
+from langchain_core.language_models.base import LanguageModelInput
+from langchain_core.runnables import RunnableConfig, run_in_executor
+from langchain_core.runnables.config import get_config_list
 from langchain_openai import ChatOpenAI
+from litellm.utils import ModelResponse
+
+from salesgpt.bedrock import (
+    acompletion_bedrock,
+    astream_completion_bedrock,
+    completion_bedrock,
+    is_throttling_error,
+    stream_completion_bedrock,
+)
 
-from salesgpt.tools import completion_bedrock
+logger = logging.getLogger(__name__)
+
+
+def _litellm_chunk(text: str, model: str) -> ModelResponse:
+    """Wraps a text delta in the chunk shape litellm streams, so consumers need no Bedrock branch."""
+    chunk = ModelResponse(stream=True, model=model)
+    chunk.choices[0].delta.content = text
+    return chunk
 
 
 class BedrockCustomModel(ChatOpenAI):
@@ -34,12 +59,21 @@ class BedrockCustomModel(ChatOpenAI):
     model: str
     system_prompt: str
     """The number of characters from the last message of the prompt to be echoed."""
+    region_name: Optional[str] = None
+    """AWS region of the Bedrock runtime. Defaults to AWS_REGION_NAME."""
+    batch_concurrency: int = 8
+    """Maximum number of requests `abatch` keeps in flight."""
+    throttle_retries: int = 5
+    """Retries per request when Bedrock throttles a batch."""
+    throttle_backoff: float = 0.5
+    """Seconds before the first throttling retry; doubled on every attempt."""
 
     def _generate(
         self,
         messages: List[BaseMessage],
         stop: Optional[List[str]] = None,
         run_manager: Optional[CallbackManagerForLLMRun] = None,
+        stream: Optional[bool] = None,
         **kwargs: Any,
     ) -> ChatResult:
         """Override the _generate method to implement the chat model logic.
@@ -57,20 +91,30 @@ class BedrockCustomModel(ChatOpenAI):
                   downstream and understand why generation stopped.
             run_manager: A run manager with callbacks for the LLM.
         """
+        should_stream = stream if stream is not None else self.streaming
+        if should_stream:
+            return generate_from_stream(
+                self._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+
         last_message = messages[-1]
 
-        print(messages)
+        logger.debug("Bedrock request: %s", messages)
         response = completion_bedrock(
             model_id=self.model,
             system_prompt=self.system_prompt,
             messages=[{"content": last_message.content, "role": "user"}],
             max_tokens=1000,
+            region_name=self.region_name,
         )
-        print("output", response)
+        logger.debug("Bedrock response: %s", response)
         content = response["content"][0]["text"]
         message = AIMessage(content=content)
         generation = ChatGeneration(message=message)
-        return ChatResult(generations=[generation])
+        return ChatResult(
+            generations=[generation],
+            llm_output={"token_usage": response.get("usage"), "model": self.model},
+        )
     
     async def _agenerate(
         self,
@@ -82,61 +126,143 @@ class BedrockCustomModel(ChatOpenAI):
     ) -> ChatResult:
         should_stream = stream if stream is not None else self.streaming
         if should_stream:
-            raise NotImplementedError("Streaming not implemented")
-        
+            return await agenerate_from_stream(
+                self._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            )
+
         last_message = messages[-1]
 
-        print(messages)
+        logger.debug("Bedrock request: %s", messages)
         response = await acompletion_bedrock(
             model_id=self.model,
             system_prompt=self.system_prompt,
             messages=[{"content": last_message.content, "role": "user"}],
             max_tokens=1000,
+            region_name=self.region_name,
         )
-        print("output", response)
+        logger.debug("Bedrock response: %s", response)
         content = response["content"][0]["text"]
         message = AIMessage(content=content)
         generation = ChatGeneration(message=message)
-        return ChatResult(generations=[generation])
-
-        # message_dicts, params = self._create_message_dicts(messages, stop)
-        # params = {
-        #     **params,
-        #     **({"stream": stream} if stream is not None else {}),
-        #     **kwargs,
-        # }
-        # response = await self.async_client.create(messages=message_dicts, **params)
-        # return self._create_chat_result(response)
-
-import aioboto3
-import os
-import json
-
-async def acompletion_bedrock(model_id, system_prompt, messages, max_tokens=1000):
-    """
-    High-level API call to generate a message with Anthropic Claude, refactored for async.
-    """
-    session = aioboto3.Session()
-    async with session.client(service_name="bedrock-runtime", region_name=os.environ.get("AWS_REGION_NAME")) as bedrock_runtime:
-
-        body = json.dumps(
-            {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": max_tokens,
-                "system": system_prompt,
-                "messages": messages,
-            }
+        return ChatResult(
+            generations=[generation],
+            llm_output={"token_usage": response.get("usage"), "model": self.model},
         )
 
-        response = await bedrock_runtime.invoke_model(body=body, modelId=model_id)
+    def _stream_kwargs(self, messages: List[Any], stop: Optional[List[str]]) -> Dict[str, Any]:
+        # Same request shape as `_generate`: the last message is sent as the user turn.
+        last_message = messages[-1]
+        content = (
+            last_message["content"]
+            if isinstance(last_message, dict)
+            else last_message.content
+        )
+        return dict(
+            model_id=self.model,
+            system_prompt=self.system_prompt,
+            messages=[{"content": content, "role": "user"}],
+            max_tokens=1000,
+            region_name=self.region_name,
+            stop=stop,
+        )
 
-        # print('RESPONSE', response)
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        """Streams the reply through Bedrock's response-stream API, one chunk per text delta."""
+        for text in stream_completion_bedrock(**self._stream_kwargs(messages, stop)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
 
-        # Correctly handle the streaming body
-        response_body_bytes = await response['body'].read()
-        # print('RESPONSE BODY', response_body_bytes)
-        response_body = json.loads(response_body_bytes.decode("utf-8"))
-        # print('RESPONSE BODY', response_body)
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Async variant of `_stream`."""
+        async for text in astream_completion_bedrock(
+            **self._stream_kwargs(messages, stop)
+        ):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                await run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+    async def _ainvoke_with_backoff(
+        self, input: LanguageModelInput, config: RunnableConfig, **kwargs: Any
+    ) -> BaseMessage:
+        for attempt in range(self.throttle_retries + 1):
+            try:
+                return await self.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                if attempt == self.throttle_retries or not is_throttling_error(e):
+                    raise
+                delay = self.throttle_backoff * 2**attempt
+                logger.info(f"Bedrock throttled the request, retrying in up to {delay:.2f}s")
+                # Full jitter so throttled requests do not retry in lockstep.
+                await asyncio.sleep(random.uniform(0, delay))
 
-        return response_body
+    async def abatch(
+        self,
+        inputs: List[LanguageModelInput],
+        config: Optional[Union[RunnableConfig, List[RunnableConfig]]] = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> List[BaseMessage]:
+        """
+        Runs `inputs` concurrently with at most `batch_concurrency` requests in flight.
+
+        A `max_concurrency` set in `config` takes precedence over `batch_concurrency`.
+        Requests Bedrock throttles are retried with exponential backoff and full jitter;
+        other errors are raised, or returned in place when `return_exceptions` is True.
+        Results are returned in the order of `inputs`.
+        """
+        if not inputs:
+            return []
+        configs = get_config_list(config, len(inputs))
+        semaphore = asyncio.Semaphore(
+            configs[0].get("max_concurrency") or self.batch_concurrency
+        )
+
+        async def _invoke(input: LanguageModelInput, config: RunnableConfig):
+            async with semaphore:
+                try:
+                    return await self._ainvoke_with_backoff(input, config, **kwargs)
+                except Exception as e:
+                    if return_exceptions:
+                        return e
+                    raise
+
+        return await asyncio.gather(
+            *(_invoke(input, config) for input, config in zip(inputs, configs))
+        )
+
+    def completion_with_retry(
+        self, messages: List[Dict[str, str]], stop: Optional[str] = None, **kwargs: Any
+    ) -> Iterator[ModelResponse]:
+        """
+        Streams a completion as litellm-style chunks.
+
+        Mirrors `ChatLiteLLM.completion_with_retry(stream=True)` so the agent's
+        streaming generators work the same for Bedrock and litellm-backed models.
+        """
+        for text in stream_completion_bedrock(**self._stream_kwargs(messages, stop)):
+            yield _litellm_chunk(text, self.model)
 
+    async def acompletion_with_retry(
+        self, messages: List[Dict[str, str]], stop: Optional[str] = None, **kwargs: Any
+    ) -> AsyncIterator[ModelResponse]:
+        """Async variant of `completion_with_retry`."""
+        async for text in astream_completion_bedrock(
+            **self._stream_kwargs(messages, stop)
+        ):
+            yield _litellm_chunk(text, self.model)
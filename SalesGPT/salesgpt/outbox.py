@@ -0,0 +1,321 @@
+import atexit
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    claimed_by TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+# Columns added after the first release, for spools created before them.
+_ADDED_COLUMNS = {"claimed_by": "TEXT", "lease_until": "REAL"}
+
+
+def gmail_smtp_factory() -> smtplib.SMTP:
+    """Opens an authenticated Gmail SMTP connection using GMAIL_MAIL and GMAIL_APP_PASSWORD."""
+    server = smtplib.SMTP_SSL("smtp.gmail.com", 465)
+    server.login(os.getenv("GMAIL_MAIL"), os.getenv("GMAIL_APP_PASSWORD"))
+    return server
+
+
+def build_message(sender_email: str, recipient: str, subject: str, body: str) -> str:
+    msg = MIMEMultipart()
+    msg["From"] = sender_email
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    return msg.as_string()
+
+
+class EmailOutbox:
+    """
+    Durable email outbox backed by a local SQLite spool.
+
+    `enqueue` only writes a row and returns, so the agent turn never waits on SMTP.
+    A background sender thread keeps one authenticated SMTP connection alive,
+    delivers due messages in batches, retries transient failures with exponential
+    backoff and records the delivery status of every message.
+
+    Args:
+        path (str): Location of the SQLite spool file.
+        smtp_factory (Callable): Returns a connected, logged-in SMTP object.
+        sender_email (str): Address used in the From header. Defaults to GMAIL_MAIL.
+        batch_size (int): Maximum messages delivered per batch.
+        max_attempts (int): Attempts before a message is marked as failed.
+        base_backoff (float): Seconds before the first retry; doubled on every attempt.
+        poll_interval (float): Seconds the sender sleeps when nothing is due.
+        idle_timeout (float): Seconds without traffic after which the SMTP connection is closed.
+        lease_time (float): Seconds a sender owns the messages it claimed; messages of a
+            sender that died mid-batch are delivered by another one after this.
+    """
+
+    def __init__(
+        self,
+        path: str = "email_outbox.sqlite3",
+        smtp_factory: Callable[[], Any] = gmail_smtp_factory,
+        sender_email: Optional[str] = None,
+        batch_size: int = 20,
+        max_attempts: int = 5,
+        base_backoff: float = 2.0,
+        poll_interval: float = 1.0,
+        idle_timeout: float = 60.0,
+        lease_time: float = 300.0,
+    ):
+        self.path = path
+        self.smtp_factory = smtp_factory
+        self.sender_email = sender_email
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.lease_time = lease_time
+        self._smtp = None
+        self._last_used = 0.0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(outbox)")}
+            for column, kind in _ADDED_COLUMNS.items():
+                if column not in columns:
+                    db.execute(f"ALTER TABLE outbox ADD COLUMN {column} {kind}")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def enqueue(self, recipient: str, subject: str, body: str) -> int:
+        """Spools a message for delivery and returns its outbox id."""
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO outbox (recipient, subject, body, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (recipient, subject, body, now, now),
+            )
+            message_id = cursor.lastrowid
+        self.start()
+        self._wakeup.set()
+        return message_id
+
+    def status(self, message_id: int) -> Optional[Dict[str, Any]]:
+        """Returns the delivery record for `message_id`, or None if it is unknown."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id, recipient, subject, status, attempts, last_error, created_at, sent_at "
+                "FROM outbox WHERE id = ?",
+                (message_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def pending_count(self) -> int:
+        with self._connect() as db:
+            return db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?)", (PENDING, SENDING)
+            ).fetchone()[0]
+
+    def _claim_batch(self) -> List[sqlite3.Row]:
+        """
+        Claims up to `batch_size` due messages for this sender and returns them.
+
+        Several processes may share one spool, so messages are claimed with a single
+        UPDATE before they are sent: a message is only ever in one sender's batch.
+        Claims whose lease expired (the sender died) are returned to pending first.
+        """
+        now = time.time()
+        claim = uuid.uuid4().hex
+        with self._connect() as db:
+            db.execute(
+                "UPDATE outbox SET status = ?, claimed_by = NULL, lease_until = NULL "
+                "WHERE status = ? AND lease_until < ?",
+                (PENDING, SENDING, now),
+            )
+            db.execute(
+                "UPDATE outbox SET status = ?, claimed_by = ?, lease_until = ? "
+                "WHERE status = ? AND id IN ("
+                "SELECT id FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY id LIMIT ?)",
+                (SENDING, claim, now + self.lease_time, PENDING, PENDING, now, self.batch_size),
+            )
+            return db.execute(
+                "SELECT id, recipient, subject, body, attempts FROM outbox "
+                "WHERE claimed_by = ? AND status = ? ORDER BY id",
+                (claim, SENDING),
+            ).fetchall()
+
+    def _smtp_connection(self):
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close_smtp()
+        self._smtp = self.smtp_factory()
+        return self._smtp
+
+    def _close_smtp(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            pass
+
+    def _mark_sent(self, message_id: int) -> None:
+        with self._connect() as db:
+            db.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, sent_at = ?, last_error = NULL, "
+                "claimed_by = NULL, lease_until = NULL WHERE id = ?",
+                (SENT, time.time(), message_id),
+            )
+
+    def _mark_failed_attempt(self, message_id: int, attempts: int, error: Exception) -> None:
+        attempts += 1
+        status = FAILED if attempts >= self.max_attempts else PENDING
+        next_attempt_at = time.time() + self.base_backoff * (2 ** (attempts - 1))
+        with self._connect() as db:
+            db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, "
+                "claimed_by = NULL, lease_until = NULL WHERE id = ?",
+                (status, attempts, next_attempt_at, str(error), message_id),
+            )
+        if status == FAILED:
+            logger.error(f"Giving up on outbox email {message_id} after {attempts} attempts: {error}")
+
+    def process_batch(self) -> int:
+        """
+        Delivers one batch of due messages over the shared SMTP connection.
+
+        Returns:
+            int: The number of messages that were attempted.
+        """
+        batch = self._claim_batch()
+        if not batch:
+            return 0
+
+        sender_email = self.sender_email or os.getenv("GMAIL_MAIL")
+        smtp = None
+        for index, row in enumerate(batch):
+            if smtp is None:
+                try:
+                    # Health-checked once per batch; reconnects only after a failure.
+                    smtp = self._smtp_connection()
+                except Exception as e:
+                    # Cannot reach the server at all: back off the rest of the batch.
+                    for pending in batch[index:]:
+                        self._mark_failed_attempt(pending["id"], pending["attempts"], e)
+                    break
+            try:
+                smtp.sendmail(
+                    sender_email,
+                    row["recipient"],
+                    build_message(sender_email, row["recipient"], row["subject"], row["body"]),
+                )
+            except smtplib.SMTPRecipientsRefused as e:
+                # Permanent for this message, the connection itself is still fine.
+                self._mark_failed_attempt(row["id"], self.max_attempts - 1, e)
+            except Exception as e:
+                self._close_smtp()
+                smtp = None
+                self._mark_failed_attempt(row["id"], row["attempts"], e)
+            else:
+                self._mark_sent(row["id"])
+        self._last_used = time.monotonic()
+        return len(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                attempted = self.process_batch()
+            except Exception as e:
+                logger.exception(f"Email outbox sender failed: {e}")
+                attempted = 0
+            if attempted:
+                continue
+            if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+                self._close_smtp()
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+        self._close_smtp()
+
+    def start(self) -> None:
+        """Starts the background sender thread if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="salesgpt-email-outbox", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stops the sender thread and closes the SMTP connection. Pending mail stays spooled."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        thread.join(timeout)
+
+
+_outbox: Optional[EmailOutbox] = None
+_outbox_lock = threading.Lock()
+
+
+def get_email_outbox() -> EmailOutbox:
+    """Returns the process-wide outbox spooling to EMAIL_OUTBOX_PATH."""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = EmailOutbox(
+                path=os.getenv("EMAIL_OUTBOX_PATH", "email_outbox.sqlite3")
+            )
+            atexit.register(_outbox.stop)
+            if _outbox.pending_count():
+                # Deliver mail spooled before the last restart.
+                _outbox.start()
+        return _outbox
@@ -0,0 +1,443 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from importlib import metadata
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional
+
+# Stdlib only, like salesgpt.startup: app/ loads the artifact before its heavy imports.
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes; artifacts of another format are ignored entirely.
+ARTIFACT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+KNOWLEDGE_BASE = "knowledge_base"
+TOKENIZERS = "tokenizers"
+VOICES = "voices"
+
+# Matches the collection and embeddings setup_knowledge_base builds live.
+KNOWLEDGE_BASE_COLLECTION = "product-knowledge-base"
+KNOWLEDGE_BASE_EMBEDDINGS_MODEL = "text-embedding-ada-002"
+ELEVENLABS_VOICES_URL = "https://api.elevenlabs.io/v1/voices"
+
+# Builds one section into the directory it is given; returns {"inputs": ..., "data": ...}.
+SectionBuilder = Callable[[str], Dict[str, Any]]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _checksums(root: str) -> Dict[str, str]:
+    checksums = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            checksums[os.path.relpath(path, root).replace(os.sep, "/")] = file_sha256(path)
+    return dict(sorted(checksums.items()))
+
+
+def knowledge_base_inputs(product_catalog: str) -> Dict[str, Any]:
+    """What a knowledge base index depends on; a change to any of it makes the index stale."""
+    return {
+        "catalog_sha256": file_sha256(product_catalog),
+        "collection": KNOWLEDGE_BASE_COLLECTION,
+        "embeddings_model": KNOWLEDGE_BASE_EMBEDDINGS_MODEL,
+        "langchain_community": _package_version("langchain-community"),
+        "langchain_openai": _package_version("langchain-openai"),
+        "chromadb": _package_version("chromadb"),
+    }
+
+
+def tokenizer_inputs() -> Dict[str, Any]:
+    return {"tiktoken": _package_version("tiktoken")}
+
+
+def voice_inputs(api_key: Optional[str]) -> Dict[str, Any]:
+    # A hash, so the artifact never contains the key but voices resolved with another
+    # account are not used.
+    return {"api_key_sha256": text_sha256(api_key or "")}
+
+
+def match_voice_id(voices: List[Dict[str, Any]], voice_name: str) -> Optional[str]:
+    """
+    Picks `voice_name` from an ElevenLabs /v1/voices listing.
+
+    An exact (case-insensitive) name wins, then a name containing `voice_name`, then
+    the first voice, the same order `elevenlabs_helper.get_voice_id` uses.
+    """
+    wanted = voice_name.lower()
+    for voice in voices:
+        if voice.get("name", "").lower() == wanted:
+            return voice.get("voice_id")
+    for voice in voices:
+        if wanted in voice.get("name", "").lower():
+            return voice.get("voice_id")
+    return voices[0].get("voice_id") if voices else None
+
+
+def knowledge_base_section(product_catalog: str) -> SectionBuilder:
+    """Embeds `product_catalog` into a persisted Chroma index (needs OPENAI_API_KEY)."""
+
+    def build(directory: str) -> Dict[str, Any]:
+        from salesgpt.tools import build_knowledge_base_index
+
+        build_knowledge_base_index(product_catalog, persist_directory=directory)
+        return {"inputs": knowledge_base_inputs(product_catalog)}
+
+    return build
+
+
+def tokenizer_section(encodings: Optional[Iterable[str]] = None) -> SectionBuilder:
+    """Downloads the tiktoken encodings (all of them by default) into the artifact."""
+
+    def build(directory: str) -> Dict[str, Any]:
+        from tiktoken_ext import openai_public
+
+        # read_file_cached consults this on every call, so the files land in `directory`.
+        previous = os.environ.get("TIKTOKEN_CACHE_DIR")
+        os.environ["TIKTOKEN_CACHE_DIR"] = directory
+        try:
+            names = list(encodings or openai_public.ENCODING_CONSTRUCTORS)
+            for name in names:
+                openai_public.ENCODING_CONSTRUCTORS[name]()
+        finally:
+            if previous is None:
+                os.environ.pop("TIKTOKEN_CACHE_DIR", None)
+            else:
+                os.environ["TIKTOKEN_CACHE_DIR"] = previous
+        return {"inputs": tokenizer_inputs(), "data": {"encodings": names}}
+
+    return build
+
+
+def voice_section(
+    api_key: Optional[str],
+    voice_names: Iterable[str],
+    fetch_voices: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+) -> SectionBuilder:
+    """
+    Resolves ElevenLabs voice names to ids once, at build time.
+
+    Args:
+        api_key (str): ElevenLabs API key; the section fails without one.
+        voice_names (Iterable[str]): Voices the app synthesizes with.
+        fetch_voices (Callable, optional): Returns the /v1/voices listing for a key.
+    """
+
+    def fetch(key: str) -> List[Dict[str, Any]]:
+        from salesgpt.http_client import get_http_client
+
+        response = get_http_client().request(
+            "ElevenLabsVoices",
+            "GET",
+            ELEVENLABS_VOICES_URL,
+            headers={"Accept": "application/json", "xi-api-key": key},
+        )
+        response.raise_for_status()
+        return response.json().get("voices", [])
+
+    def build(directory: str) -> Dict[str, Any]:
+        if not api_key:
+            raise ValueError("ELEVENLABS_API_KEY is not set")
+        voices = (fetch_voices or fetch)(api_key)
+        ids = {name: match_voice_id(voices, name) for name in voice_names}
+        return {"inputs": voice_inputs(api_key), "data": {"ids": ids}}
+
+    return build
+
+
+def build_artifact(output: str, sections: Mapping[str, SectionBuilder]) -> Dict[str, Any]:
+    """
+    Builds a prewarm artifact at `output`, replacing any previous one.
+
+    Every section is built into its own subdirectory and checksummed. A section that
+    fails (a missing API key, no network) is left out with a warning, so the server
+    builds that part live instead. The artifact is assembled next to `output` and
+    moved into place only once its manifest is written.
+
+    Args:
+        output (str): Directory the artifact is written to.
+        sections (Mapping[str, SectionBuilder]): Section name to builder.
+
+    Returns:
+        dict: The written manifest.
+    """
+    parent = os.path.dirname(os.path.abspath(output))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".prewarm-", dir=parent)
+    manifest: Dict[str, Any] = {
+        "format": ARTIFACT_FORMAT,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": "%d.%d" % sys.version_info[:2],
+        "sections": {},
+    }
+    try:
+        for name, builder in sections.items():
+            directory = os.path.join(staging, name)
+            os.makedirs(directory)
+            started = time.monotonic()
+            try:
+                section = builder(directory)
+            except Exception as e:
+                logger.warning("Skipping prewarm section %s: %s", name, e)
+                shutil.rmtree(directory, ignore_errors=True)
+                continue
+            manifest["sections"][name] = {
+                "inputs": section.get("inputs", {}),
+                "data": section.get("data", {}),
+                "files": _checksums(directory),
+            }
+            logger.info("Built prewarm section %s in %.1fs", name, time.monotonic() - started)
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        if os.path.exists(output):
+            shutil.rmtree(output)
+        os.replace(staging, output)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return manifest
+
+
+class PrewarmArtifact:
+    """
+    A prewarm artifact on disk: work done at image build time instead of at startup.
+
+    Each section is used only if its files match the manifest checksums and the
+    inputs it was built from (catalog contents, library versions, API key hash) match
+    the running server's; otherwise the caller builds that part live, as without an
+    artifact. Verification runs once per section.
+
+    Args:
+        root (str): The artifact directory.
+        manifest (dict): Its parsed manifest.
+    """
+
+    def __init__(self, root: str, manifest: Dict[str, Any]):
+        self.root = root
+        self.manifest = manifest
+        self._verified: Dict[str, bool] = {}
+        self._working_copies: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, root: str) -> Optional["PrewarmArtifact"]:
+        """The artifact at `root`, or None if there is none or it has another format."""
+        path = os.path.join(root, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable prewarm manifest %s: %s", path, e)
+            return None
+        if manifest.get("format") != ARTIFACT_FORMAT:
+            logger.warning(
+                "Ignoring prewarm artifact %s of format %s (expected %s)",
+                root,
+                manifest.get("format"),
+                ARTIFACT_FORMAT,
+            )
+            return None
+        return cls(root, manifest)
+
+    def _files_intact(self, name: str, files: Dict[str, str]) -> bool:
+        directory = os.path.join(self.root, name)
+        for relpath, expected in files.items():
+            try:
+                actual = file_sha256(os.path.join(directory, relpath))
+            except OSError:
+                actual = None
+            if actual != expected:
+                logger.warning("Prewarm section %s is corrupt: %s does not match", name, relpath)
+                return False
+        return True
+
+    def section(self, name: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The manifest entry of section `name` if it is intact and built from `inputs`.
+
+        Args:
+            name (str): Section name.
+            inputs (dict): What the section must have been built from to be current.
+
+        Returns:
+            dict, optional: The section, or None when the caller should build live.
+        """
+        section = self.manifest.get("sections", {}).get(name)
+        if section is None:
+            return None
+        if section.get("inputs") != inputs:
+            logger.info("Prewarm section %s is stale, building it live", name)
+            return None
+        with self._lock:
+            if name not in self._verified:
+                self._verified[name] = self._files_intact(name, section.get("files", {}))
+            return section if self._verified[name] else None
+
+    def knowledge_base_dir(self, product_catalog: str) -> Optional[str]:
+        """
+        A working copy of the prebuilt index for `product_catalog`, if one is current.
+
+        Chroma writes to the directory it opens, so the index is copied once per
+        process and the baked files stay intact for the next start.
+        """
+        try:
+            inputs = knowledge_base_inputs(product_catalog)
+        except OSError:
+            return None
+        if self.section(KNOWLEDGE_BASE, inputs) is None:
+            return None
+        with self._lock:
+            copy = self._working_copies.get(inputs["catalog_sha256"])
+            if copy is None:
+                copy = os.path.join(tempfile.mkdtemp(prefix="salesgpt-kb-"), KNOWLEDGE_BASE)
+                shutil.copytree(os.path.join(self.root, KNOWLEDGE_BASE), copy)
+                self._working_copies[inputs["catalog_sha256"]] = copy
+            return copy
+
+    def corrupt_sections(self) -> List[str]:
+        """Checks every section's files against the manifest; returns those that differ."""
+        return [
+            name
+            for name, section in self.manifest.get("sections", {}).items()
+            if not self._files_intact(name, section.get("files", {}))
+        ]
+
+    def tokenizer_dir(self) -> Optional[str]:
+        if self.section(TOKENIZERS, tokenizer_inputs()) is None:
+            return None
+        return os.path.join(self.root, TOKENIZERS)
+
+    def activate_tokenizers(self) -> bool:
+        """
+        Points tiktoken at the prebuilt encodings, unless a cache dir is already set.
+
+        Must run before litellm is imported: it loads its encoding at import time.
+        """
+        if "TIKTOKEN_CACHE_DIR" in os.environ:
+            return False
+        directory = self.tokenizer_dir()
+        if directory is None:
+            return False
+        os.environ["TIKTOKEN_CACHE_DIR"] = directory
+        return True
+
+    def voice_ids(self, api_key: Optional[str]) -> Dict[str, str]:
+        """Voice name to id, as resolved at build time with the same API key."""
+        if not api_key:
+            return {}
+        section = self.section(VOICES, voice_inputs(api_key))
+        if section is None:
+            return {}
+        return {name: id for name, id in section["data"].get("ids", {}).items() if id}
+
+    def status(self) -> Dict[str, Any]:
+        """When the artifact was built and which sections are present."""
+        return {
+            "root": self.root,
+            "built_at": self.manifest.get("built_at"),
+            "sections": sorted(self.manifest.get("sections", {})),
+        }
+
+
+_prewarm_artifact: Optional[PrewarmArtifact] = None
+_prewarm_artifact_loaded = False
+_prewarm_artifact_lock = threading.Lock()
+
+
+def get_prewarm_artifact() -> Optional[PrewarmArtifact]:
+    """The process-wide prewarm artifact from PREWARM_DIR (default: ./prewarm), if any."""
+    global _prewarm_artifact, _prewarm_artifact_loaded
+    with _prewarm_artifact_lock:
+        if not _prewarm_artifact_loaded:
+            root = os.getenv("PREWARM_DIR", "prewarm")
+            _prewarm_artifact = PrewarmArtifact.load(root) if root else None
+            _prewarm_artifact_loaded = True
+            if _prewarm_artifact is not None:
+                logger.info("Using prewarm artifact %s", _prewarm_artifact.status())
+        return _prewarm_artifact
+
+
+def activate_prewarm_artifact() -> Optional[PrewarmArtifact]:
+    """Loads the prewarm artifact and applies what must precede the heavy imports."""
+    artifact = get_prewarm_artifact()
+    if artifact is not None:
+        artifact.activate_tokenizers()
+    return artifact
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """`python -m salesgpt.prewarm build|verify`: build or check the artifact at --output."""
+    parser = argparse.ArgumentParser(prog="python -m salesgpt.prewarm")
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--output", default=os.getenv("PREWARM_DIR", "prewarm"))
+    parser.add_argument(
+        "--product-catalog",
+        default=os.getenv("PRODUCT_CATALOG", "examples/sample_product_catalog.txt"),
+    )
+    parser.add_argument(
+        "--voices",
+        default=os.getenv("ELEVENLABS_VOICES", "Matthew"),
+        help="Comma separated ElevenLabs voice names to resolve",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.command == "build":
+        try:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+        except ImportError:
+            pass
+        manifest = build_artifact(
+            args.output,
+            {
+                KNOWLEDGE_BASE: knowledge_base_section(args.product_catalog),
+                TOKENIZERS: tokenizer_section(),
+                VOICES: voice_section(
+                    os.getenv("ELEVENLABS_API_KEY"),
+                    [name.strip() for name in args.voices.split(",") if name.strip()],
+                ),
+            },
+        )
+        print(f"Built {args.output}: {', '.join(manifest['sections']) or 'no sections'}")
+        return 0
+
+    artifact = PrewarmArtifact.load(args.output)
+    if artifact is None:
+        print(f"No usable prewarm artifact at {args.output}")
+        return 1
+    corrupt = artifact.corrupt_sections()
+    print(json.dumps(dict(artifact.status(), corrupt=corrupt), indent=2))
+    return 1 if corrupt else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManager,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_core.pydantic_v1 import Field, validator
+
+from salesgpt.metrics import ROUTER_RUN_TAG
+from salesgpt.models import BedrockCustomModel
+
+logger = logging.getLogger(__name__)
+
+
+def backend_key(llm: BaseChatModel) -> str:
+    """Identifies a backend as `provider/model`, e.g. `bedrock/anthropic.claude-3-haiku`."""
+    if isinstance(llm, BedrockCustomModel):
+        provider = "bedrock"
+    else:
+        provider = getattr(llm, "_llm_type", type(llm).__name__)
+    model = getattr(llm, "model", None) or getattr(llm, "model_name", None)
+    return f"{provider}/{model}"
+
+
+class LatencyTracker:
+    """
+    Rolling window of call latencies per backend key.
+
+    Args:
+        window_size (int): Number of most recent samples kept per key.
+    """
+
+    def __init__(self, window_size: int = 200):
+        self.window_size = window_size
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window_size)).append(seconds)
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._samples.get(key, ()))
+
+    def quantile(self, key: str, q: float) -> Optional[float]:
+        """Nearest-rank quantile of the window for `key`, or None without samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples:
+            return None
+        return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-key sample count, p50 and p95 in seconds."""
+        with self._lock:
+            keys = list(self._samples)
+        return {
+            key: {
+                "count": self.count(key),
+                "p50": self.quantile(key, 0.5),
+                "p95": self.quantile(key, 0.95),
+            }
+            for key in keys
+        }
+
+
+_latency_tracker: Optional[LatencyTracker] = None
+_latency_tracker_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Returns the process-wide tracker, so latencies are shared across sessions."""
+    global _latency_tracker
+    with _latency_tracker_lock:
+        if _latency_tracker is None:
+            _latency_tracker = LatencyTracker()
+        return _latency_tracker
+
+
+class HedgedRouterChatModel(BaseChatModel):
+    """
+    Chat model that routes each call across several backends and hedges slow ones.
+
+    The call goes to the primary backend first. If it has not answered within the
+    primary's rolling p95 latency, a duplicate request goes to the secondary backend;
+    whichever answers first wins and the other one is cancelled. A primary that fails
+    outright fails over to the secondary immediately.
+
+    With `prefer_fastest`, backends that have enough samples are ordered by their
+    rolling median, so a provider having a slow spell is demoted to secondary.
+
+    Example:
+
+        .. code-block:: python
+
+            llm = HedgedRouterChatModel(
+                backends=[ChatLiteLLM(model="gpt-3.5-turbo"), BedrockCustomModel(...)]
+            )
+            sales_agent = SalesGPT.from_llm(llm)
+
+    Args:
+        backends (List[BaseChatModel]): Candidate models, in order of preference.
+        min_samples (int): Samples needed before a backend's p95 is trusted.
+        default_hedge_delay (float): Seconds to wait before hedging while p95 is unknown.
+        min_hedge_delay (float): Lower bound for the hedge delay.
+        prefer_fastest (bool): Reorder backends by rolling median latency.
+    """
+
+    backends: List[BaseChatModel]
+    min_samples: int = 20
+    default_hedge_delay: float = 2.0
+    min_hedge_delay: float = 0.05
+    prefer_fastest: bool = True
+    tracker: LatencyTracker = Field(default_factory=get_latency_tracker)
+    hedged: int = 0
+    """Number of calls for which a hedge request was sent."""
+    hedge_wins: int = 0
+    """Number of hedged calls the secondary backend won."""
+    tags: Optional[List[str]] = Field(default_factory=lambda: [ROUTER_RUN_TAG])
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @validator("backends")
+    def _require_backends(cls, backends):
+        if not backends:
+            raise ValueError("HedgedRouterChatModel needs at least one backend")
+        return backends
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-router"
+
+    @property
+    def model(self) -> str:
+        """Model name of the preferred backend; `SalesGPT.from_llm` reads it."""
+        primary = self.backends[0]
+        return getattr(primary, "model", None) or getattr(primary, "model_name", "")
+
+    @property
+    def max_retries(self) -> int:
+        return getattr(self.backends[0], "max_retries", 2)
+
+    @property
+    def streaming_backend(self) -> BaseChatModel:
+        """Backend used for streamed turns, which are not hedged."""
+        return self.ordered_backends()[0]
+
+    def ordered_backends(self) -> List[BaseChatModel]:
+        if not self.prefer_fastest:
+            return list(self.backends)
+
+        def rank(indexed: Tuple[int, BaseChatModel]) -> Tuple[float, int]:
+            index, llm = indexed
+            key = backend_key(llm)
+            if self.tracker.count(key) < self.min_samples:
+                return (math.inf, index)
+            return (self.tracker.quantile(key, 0.5), index)
+
+        ranked = sorted(enumerate(self.backends), key=rank)
+        if math.isinf(rank(ranked[0])[0]):
+            # Not enough data on any backend yet: keep the configured order.
+            return list(self.backends)
+        return [llm for _, llm in ranked]
+
+    def hedge_delay(self, llm: BaseChatModel) -> float:
+        """Seconds to wait on `llm` before sending the hedge request."""
+        key = backend_key(llm)
+        if self.tracker.count(key) < self.min_samples:
+            return self.default_hedge_delay
+        return max(self.min_hedge_delay, self.tracker.quantile(key, 0.95))
+
+    @staticmethod
+    def _backend_callbacks(run_manager) -> Optional[CallbackManager]:
+        """
+        Callbacks for the backend calls: children of the router's run that carry all of
+        its handlers, so usage and tracing see every backend call. The router's own run
+        is tagged `ROUTER_RUN_TAG` (not inherited) and is not counted again.
+        """
+        if run_manager is None:
+            return None
+        return CallbackManager(
+            handlers=list(run_manager.handlers),
+            inheritable_handlers=list(run_manager.inheritable_handlers),
+            parent_run_id=run_manager.run_id,
+            tags=list(run_manager.inheritable_tags),
+            inheritable_tags=list(run_manager.inheritable_tags),
+            metadata=dict(run_manager.inheritable_metadata),
+            inheritable_metadata=dict(run_manager.inheritable_metadata),
+        )
+
+    def _record_cancelled(self, llm: BaseChatModel, seconds: float) -> None:
+        # A cancelled call only says it was at least this slow. That is worth a sample
+        # when it is slower than usual, so a provider in a slow spell sees its median
+        # rise; a short one (a hedge loser, a client that left) would wrongly lower it.
+        key = backend_key(llm)
+        median = self.tracker.quantile(key, 0.5)
+        if median is not None and seconds >= median:
+            self.tracker.record(key, seconds)
+
+    def _timed_generate(self, llm, messages, stop, callbacks, **kwargs) -> ChatResult:
+        start = time.monotonic()
+        result = llm.generate([messages], stop=stop, callbacks=callbacks, **kwargs)
+        self.tracker.record(backend_key(llm), time.monotonic() - start)
+        return ChatResult(generations=result.generations[0], llm_output=result.llm_output)
+
+    async def _atimed_generate(self, llm, messages, stop, callbacks, **kwargs) -> ChatResult:
+        start = time.monotonic()
+        try:
+            result = await llm.agenerate([messages], stop=stop, callbacks=callbacks, **kwargs)
+        except asyncio.CancelledError:
+            self._record_cancelled(llm, time.monotonic() - start)
+            raise
+        self.tracker.record(backend_key(llm), time.monotonic() - start)
+        return ChatResult(generations=result.generations[0], llm_output=result.llm_output)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # Threads cannot be interrupted: a losing sync call runs to completion in the
+        # background and its result is discarded.
+        backends = self.ordered_backends()
+        callbacks = self._backend_callbacks(run_manager)
+        if len(backends) == 1:
+            return self._timed_generate(backends[0], messages, stop, callbacks, **kwargs)
+
+        primary, secondary = backends[0], backends[1]
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            # Each thread runs in a copy of this context, so the bound session is kept.
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._timed_generate, primary, messages, stop, callbacks, **kwargs
+                )
+            ]
+            done, _ = wait_futures(futures, timeout=self.hedge_delay(primary))
+            if done and futures[0].exception() is None:
+                return futures[0].result()
+
+            self.hedged += 1
+            futures.append(
+                executor.submit(
+                    contextvars.copy_context().run,
+                    self._timed_generate, secondary, messages, stop, callbacks, **kwargs
+                )
+            )
+            pending = set(futures)
+            error = None
+            while pending:
+                done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        for loser in pending:
+                            loser.cancel()
+                        if future is futures[1]:
+                            self.hedge_wins += 1
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            executor.shutdown(wait=False)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        backends = self.ordered_backends()
+        callbacks = self._backend_callbacks(run_manager)
+        if len(backends) == 1:
+            return await self._atimed_generate(
+                backends[0], messages, stop, callbacks, **kwargs
+            )
+
+        primary, secondary = backends[0], backends[1]
+        primary_task = asyncio.ensure_future(
+            self._atimed_generate(primary, messages, stop, callbacks, **kwargs)
+        )
+        done, _ = await asyncio.wait({primary_task}, timeout=self.hedge_delay(primary))
+        if done and primary_task.exception() is None:
+            return primary_task.result()
+
+        self.hedged += 1
+        logger.info(f"Hedging {backend_key(primary)} with {backend_key(secondary)}")
+        secondary_task = asyncio.ensure_future(
+            self._atimed_generate(secondary, messages, stop, callbacks, **kwargs)
+        )
+        pending = {primary_task, secondary_task}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary_task:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
@@ -1,12 +1,41 @@
 import asyncio
+import copy
+import hashlib
 import json
+import logging
 import re
+import uuid
 
 from langchain_community.chat_models import BedrockChat, ChatLiteLLM
 from langchain_openai import ChatOpenAI
 
+from salesgpt.accounting import UsageCallbackHandler, get_usage_accountant
+from salesgpt.admission import AdmissionRejected, get_admission_controller
+from salesgpt.agent_config import DEFAULT_SALESPERSON_NAME, get_agent_config_cache
 from salesgpt.agents import SalesGPT
+from salesgpt.context import session_scope
+from salesgpt.deadlines import DeadlineExceeded, run_within_deadline
 from salesgpt.models import BedrockCustomModel
+from salesgpt.router import HedgedRouterChatModel
+from salesgpt.session_backends import SessionState
+from salesgpt.tracing import TracingCallbackHandler, traced
+
+logger = logging.getLogger(__name__)
+
+
+def build_llm(model_name: str):
+    """Bedrock for Anthropic model ids, litellm for everything else."""
+    if "anthropic" in model_name:
+        return BedrockCustomModel(
+            type="bedrock-model",
+            model=model_name,
+            system_prompt="You are a helpful assistant.",
+        )
+    return ChatLiteLLM(temperature=0.2, model=model_name)
+
+
+def _turn_span_attributes(api: "SalesGPTAPI", *args, **kwargs):
+    return {"session.id": api.session_id, "llm.model": api.model_name}
 
 
 class SalesGPTAPI:
@@ -18,58 +47,166 @@ class SalesGPTAPI:
         model_name: str = "gpt-3.5-turbo",
         product_catalog: str = "examples/sample_product_catalog.txt",
         use_tools=True,
+        session_id: str = None,
+        secondary_model_name: str = None,
     ):
         self.config_path = config_path
+        self.session_id = session_id or str(uuid.uuid4())
         self.verbose = verbose
         self.max_num_turns = max_num_turns
         self.model_name = model_name
-        if "anthropic" in model_name:
-            self.llm = BedrockCustomModel(
-                type="bedrock-model",
-                model=model_name,
-                system_prompt="You are a helpful assistant.",
+        self.secondary_model_name = secondary_model_name
+        self.llm = build_llm(model_name)
+        if secondary_model_name:
+            self.llm = HedgedRouterChatModel(
+                backends=[self.llm, build_llm(secondary_model_name)]
             )
-        else:
-            self.llm = ChatLiteLLM(temperature=0.2, model=model_name)
+        self.llm.callbacks = [UsageCallbackHandler(), TracingCallbackHandler()]
         self.product_catalog = product_catalog
         self.conversation_history = []
         self.use_tools = use_tools
         self.sales_agent = self.initialize_agent()
         self.current_turn = 0
+        # Version of the shared SessionState this instance was last loaded from or saved as.
+        self.state_version = 0
 
     def initialize_agent(self):
         config = {"verbose": self.verbose}
         if self.config_path:
-            with open(self.config_path, "r") as f:
-                config.update(json.load(f))
+            config.update(get_agent_config_cache().load(self.config_path))
             if self.verbose:
-                print(f"Loaded agent config: {config}")
+                logger.debug("Loaded agent config: %s", config)
         else:
-            print("Default agent config in use")
+            logger.info("Default agent config in use")
 
         if self.use_tools:
-            print("USING TOOLS")
             config.update(
                 {
                     "use_tools": True,
                     "product_catalog": self.product_catalog,
-                    "salesperson_name": "Ted Lasso"
+                    "salesperson_name": DEFAULT_SALESPERSON_NAME
                     if not self.config_path
-                    else config.get("salesperson_name", "Ted Lasso"),
+                    else config.get("salesperson_name", DEFAULT_SALESPERSON_NAME),
                 }
             )
 
         sales_agent = SalesGPT.from_llm(self.llm, **config)
 
-        print(f"SalesGPT use_tools: {sales_agent.use_tools}")
+        logger.info("SalesGPT use_tools: %s", sales_agent.use_tools)
         sales_agent.seed_agent()
         return sales_agent
 
+    def export_state(self):
+        """The conversation history and stage, enough to resume the session later."""
+        return {
+            "conversation_history": list(self.sales_agent.conversation_history),
+            "conversation_stage_id": self.sales_agent.conversation_stage_id,
+            "current_conversation_stage": self.sales_agent.current_conversation_stage,
+            "current_turn": self.current_turn,
+        }
+
+    def restore_state(self, state):
+        """Resumes a session from `export_state` output on a freshly initialized agent."""
+        self.sales_agent.conversation_history = list(state.get("conversation_history", []))
+        self.sales_agent.conversation_stage_id = state.get(
+            "conversation_stage_id", self.sales_agent.conversation_stage_id
+        )
+        self.sales_agent.current_conversation_stage = state.get(
+            "current_conversation_stage",
+            self.sales_agent.retrieve_conversation_stage(self.sales_agent.conversation_stage_id),
+        )
+        self.current_turn = state.get("current_turn", 0)
+
+    @property
+    def config_key(self):
+        """Identifies the agent configuration, so any worker can rebuild the same agent."""
+        settings = [
+            self.config_path,
+            self.product_catalog,
+            self.model_name,
+            self.secondary_model_name,
+            bool(self.use_tools),
+            self.max_num_turns,
+        ]
+        return hashlib.sha256(json.dumps(settings).encode("utf-8")).hexdigest()[:16]
+
+    def clone(self, session_id):
+        """
+        A fresh session sharing this instance's LLM, chains, tools and knowledge base.
+
+        Building an agent loads the config and the product catalog index; cloning a
+        per-config template avoids paying that on every new or resumed session.
+
+        Args:
+            session_id (str): The session the clone serves.
+
+        Returns:
+            SalesGPTAPI: A seeded instance with its own conversation state.
+        """
+        session = copy.copy(self)
+        session.session_id = session_id
+        session.conversation_history = []
+        session.current_turn = 0
+        session.state_version = 0
+        # A shallow copy sharing the chains; the pydantic copy() would duplicate them
+        # and copy.copy would share the field dict, i.e. the conversation itself.
+        agent = self.sales_agent
+        session.sales_agent = type(agent).construct(
+            _fields_set=set(agent.__fields_set__), **agent.__dict__
+        )
+        session.sales_agent.conversation_stage_id = "1"
+        session.sales_agent.last_utterance_cached = False
+        session.sales_agent.seed_agent()
+        return session
+
+    def to_session_state(self):
+        """The compact state shared through a session backend."""
+        return SessionState(
+            session_id=self.session_id,
+            config_key=self.config_key,
+            conversation_history=list(self.sales_agent.conversation_history),
+            conversation_stage_id=self.sales_agent.conversation_stage_id,
+            current_turn=self.current_turn,
+            version=self.state_version,
+        )
+
+    def apply_session_state(self, state):
+        """Resumes from a `SessionState` loaded from a session backend."""
+        self.restore_state(
+            {
+                "conversation_history": state.conversation_history,
+                "conversation_stage_id": state.conversation_stage_id,
+                "current_turn": state.current_turn,
+            }
+        )
+        self.state_version = state.version
+
+    def tool_cache_stats(self):
+        """Cumulative tool memoization counters for this session, or None when tools are not cached."""
+        tool_cache = self.sales_agent.tool_cache
+        return tool_cache.stats(self.session_id) if tool_cache is not None else None
+
+    def usage_summary(self):
+        """Token, cost and latency totals for this session, with one rollup per turn."""
+        return get_usage_accountant().session_summary(self.session_id)
+
     async def do(self, human_input=None):
+        with session_scope(self.session_id):
+            state = self.export_state()
+            try:
+                return await self._do(human_input)
+            except (asyncio.CancelledError, DeadlineExceeded, AdmissionRejected):
+                # An abandoned or refused turn leaves no unanswered message in the history,
+                # so the client's retry does not add it twice.
+                self.restore_state(state)
+                raise
+
+    @traced("turn", _turn_span_attributes)
+    async def _do(self, human_input=None):
         self.current_turn += 1
         current_turns = self.current_turn
         if current_turns >= self.max_num_turns:
-            print("Maximum number of turns reached - ending the conversation.")
+            logger.info("Maximum number of turns reached - ending the conversation.")
             return [
                 "BOT",
                 "In case you'll have any questions - just text me one more time!",
@@ -78,18 +215,24 @@ class SalesGPTAPI:
         if human_input is not None:
             self.sales_agent.human_step(human_input)
 
-        ai_log = await self.sales_agent.astep(stream=False)
-        await self.sales_agent.adetermine_conversation_stage()
+        accountant = get_usage_accountant()
+        accountant.start_turn(self.session_id)
+        cache_stats_before = self.tool_cache_stats()
+        # One admission slot covers the whole turn, tool helper calls included.
+        async with get_admission_controller().slot():
+            ai_log = await self.sales_agent.astep(stream=False)
+            await run_within_deadline(
+                self.sales_agent.adetermine_conversation_stage(), "stage analysis"
+            )
         # TODO - handle end of conversation in the API - send a special token to the client?
         if self.verbose:
-            print("=" * 10)
-            print(f"AI LOG {ai_log}")
+            logger.debug("AI log: %s", ai_log)
             
         if (
             self.sales_agent.conversation_history
             and "<END_OF_CALL>" in self.sales_agent.conversation_history[-1]
         ):
-            print("Sales Agent determined it is time to end the conversation.")
+            logger.info("Sales Agent determined it is time to end the conversation.")
             # strip end of call for now
             self.sales_agent.conversation_history[
                 -1
@@ -110,7 +253,7 @@ class SalesGPTAPI:
             
             try:
                 res_str = ai_log["intermediate_steps"][0]
-                print("RES STR: ", res_str)
+                logger.debug("Intermediate step: %s", res_str)
                 agent_action = res_str[0]
                 tool, tool_input, log = (
                     agent_action.tool,
@@ -125,7 +268,7 @@ class SalesGPTAPI:
                     action_output = action_output.replace("<web_search>", "<a href='https://www.google.com/search?q=")
                     action_output = action_output.replace("</web_search>", "' target='_blank' rel='noopener noreferrer'>")
             except Exception as e:
-                print("ERROR: ", e)
+                logger.exception("Failed to parse the agent's tool action: %s", e)
                 tool, tool_input, action, action_input, action_output = (
                     "",
                     "",
@@ -136,7 +279,7 @@ class SalesGPTAPI:
         else:
             tool, tool_input, action, action_input, action_output = "", "", "", "", ""
 
-        print(reply)
+        logger.debug("Reply: %s", reply)
         payload = {
             "bot_name": reply.split(": ")[0],
             "response": ": ".join(reply.split(": ")[1:]).rstrip("<END_OF_TURN>"),
@@ -147,18 +290,114 @@ class SalesGPTAPI:
             "action_input": action_input,
             "model_name": self.model_name,
         }
+        cache_stats = self.tool_cache_stats()
+        if cache_stats is not None:
+            turn_stats = {
+                key: cache_stats[key] - cache_stats_before[key]
+                for key in ("hits", "misses", "bypassed")
+            }
+            turn_lookups = turn_stats["hits"] + turn_stats["misses"]
+            turn_stats["hit_rate"] = turn_stats["hits"] / turn_lookups if turn_lookups else 0.0
+            payload["tool_cache"] = {"turn": turn_stats, "session": cache_stats}
+        semantic_cache = self.sales_agent.semantic_cache
+        if semantic_cache is not None:
+            payload["semantic_cache"] = {
+                "hit": self.sales_agent.last_utterance_cached,
+                **semantic_cache.stats(),
+            }
+        session_usage = accountant.session_summary(self.session_id)
+        payload["usage"] = {
+            "turn": accountant.turn_summary(self.session_id),
+            "session": {key: value for key, value in session_usage.items() if key != "turns"},
+        }
         return payload
 
+    @traced("turn.stream", _turn_span_attributes)
+    async def astream_turn(self, human_input=None):
+        """
+        Runs one turn, yielding events as the reply is generated.
+
+        Unlike `do_stream`, the reply and the new conversation stage are kept on the
+        agent, so the session continues from this turn. Events are dicts with a "type"
+        of "delta" (a piece of reply text), "stage" (after the stage analyzer ran) and
+        finally "end" (the whole reply and whether the agent ended the call).
+
+        Args:
+            human_input (str, optional): The user's message; None for an agent-initiated turn.
+        """
+        with session_scope(self.session_id):
+            state = self.export_state()
+            completed = False
+            try:
+                self.current_turn += 1
+                if self.current_turn >= self.max_num_turns:
+                    logger.info("Maximum number of turns reached - ending the conversation.")
+                    text = "In case you'll have any questions - just text me one more time!"
+                    yield {"type": "delta", "text": text}
+                    yield {"type": "end", "response": text, "end_of_call": True}
+                    return
+
+                if human_input is not None:
+                    self.sales_agent.human_step(human_input)
+
+                get_usage_accountant().start_turn(self.session_id)
+                prefix = f"{self.sales_agent.salesperson_name}: "
+                # Held only while the provider works; the caller buffers events for slow clients.
+                async with get_admission_controller().slot():
+                    stream_gen = await self.sales_agent.astep(stream=True)
+                    parts = []
+                    pending = ""
+                    async for model_response in stream_gen:
+                        for choice in model_response.choices:
+                            message = choice["delta"]["content"]
+                            if not message:
+                                continue
+                            parts.append(message)
+                            if pending is not None:
+                                # Hold back text until it is clear whether the model echoed the name prefix.
+                                pending += message
+                                if len(pending) < len(prefix) and prefix.startswith(pending):
+                                    continue
+                                message = pending[len(prefix):] if pending.startswith(prefix) else pending
+                                pending = None
+                            message = message.replace("<END_OF_CALL>", "").replace("<END_OF_TURN>", "")
+                            if message:
+                                yield {"type": "delta", "text": message}
+
+                    reply = "".join(parts)
+                    end_of_call = "<END_OF_CALL>" in reply
+                    reply = reply.replace("<END_OF_CALL>", "").replace("<END_OF_TURN>", "").strip()
+                    if reply.startswith(prefix):
+                        reply = reply[len(prefix):]
+                    self.sales_agent.conversation_history.append(f"{prefix}{reply} <END_OF_TURN>")
+                    await run_within_deadline(
+                        self.sales_agent.adetermine_conversation_stage(), "stage analysis"
+                    )
+                completed = True
+
+                yield {
+                    "type": "stage",
+                    "stage_id": self.sales_agent.conversation_stage_id,
+                    "stage": self.sales_agent.current_conversation_stage,
+                }
+                yield {"type": "end", "response": reply, "end_of_call": end_of_call}
+            except (asyncio.CancelledError, GeneratorExit, DeadlineExceeded, AdmissionRejected):
+                # Dropped, refused or out of time mid-turn: leave no unanswered message behind.
+                if not completed:
+                    self.restore_state(state)
+                raise
+
+    @traced("turn.stream", _turn_span_attributes)
     async def do_stream(self, conversation_history: [str], human_input=None):
         # TODO
         current_turns = len(conversation_history) + 1
         if current_turns >= self.max_num_turns:
-            print("Maximum number of turns reached - ending the conversation.")
+            logger.info("Maximum number of turns reached - ending the conversation.")
             yield [
                 "BOT",
                 "In case you'll have any questions - just text me one more time!",
             ]
-            raise StopAsyncIteration
+            return
 
         self.sales_agent.seed_agent()
         self.sales_agent.conversation_history = conversation_history
@@ -166,19 +405,22 @@ class SalesGPTAPI:
         if human_input is not None:
             self.sales_agent.human_step(human_input)
 
-        stream_gen = self.sales_agent.astep(stream=True)
-        for model_response in stream_gen:
-            for choice in model_response.choices:
-                message = choice["delta"]["content"]
-                if message is not None:
-                    if "<END_OF_CALL>" in message:
-                        print(
-                            "Sales Agent determined it is time to end the conversation."
-                        )
-                        yield [
-                            "BOT",
-                            "In case you'll have any questions - just text me one more time!",
-                        ]
-                    yield message
-                else:
-                    continue
+        get_usage_accountant().start_turn(self.session_id)
+        async with get_admission_controller().slot():
+            with session_scope(self.session_id):
+                stream_gen = await self.sales_agent.astep(stream=True)
+            async for model_response in stream_gen:
+                for choice in model_response.choices:
+                    message = choice["delta"]["content"]
+                    if message is not None:
+                        if "<END_OF_CALL>" in message:
+                            logger.info(
+                                "Sales Agent determined it is time to end the conversation."
+                            )
+                            yield [
+                                "BOT",
+                                "In case you'll have any questions - just text me one more time!",
+                            ]
+                        yield message
+                    else:
+                        continue
@@ -0,0 +1,306 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from salesgpt.http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+CALENDLY_API_URL = "https://api.calendly.com"
+TOOL_NAME = "SendCalendlyInvitation"
+
+
+class CalendlyError(Exception):
+    """Raised when the Calendly API answers with an unexpected status."""
+
+
+class CalendlyClient:
+    """
+    Thin Calendly API client that caches the account's event type UUIDs.
+
+    Args:
+        api_key (str): Calendly personal access token. Defaults to CALENDLY_API_KEY.
+        event_type_uuid (str): Preferred event type. Defaults to CALENDLY_EVENT_UUID,
+            falling back to the first event type on the account.
+        event_types_ttl (float): Seconds the event type list is cached for.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        event_type_uuid: Optional[str] = None,
+        event_types_ttl: float = 3600.0,
+    ):
+        self.api_key = api_key or os.getenv("CALENDLY_API_KEY")
+        self.event_type_uuid = event_type_uuid or os.getenv("CALENDLY_EVENT_UUID")
+        self.event_types_ttl = event_types_ttl
+        self._event_types: List[str] = []
+        self._event_types_fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _cached_event_types(self, refresh: bool) -> Optional[List[str]]:
+        with self._lock:
+            fresh = time.monotonic() - self._event_types_fetched_at < self.event_types_ttl
+            if self._event_types and fresh and not refresh:
+                return list(self._event_types)
+        return None
+
+    def _store_event_types(self, response) -> List[str]:
+        if response.status_code != 200:
+            raise CalendlyError(
+                f"Failed to retrieve event types: {response.status_code} - {response.text}"
+            )
+        try:
+            uuids = [
+                event_type["uri"].split("/")[-1]
+                for event_type in response.json().get("collection", [])
+            ]
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            raise CalendlyError(f"Failed to read Calendly event types: {e!r}")
+        with self._lock:
+            self._event_types = uuids
+            self._event_types_fetched_at = time.monotonic()
+        return list(uuids)
+
+    def list_event_type_uuids(self, refresh: bool = False) -> List[str]:
+        """Returns the account's event type UUIDs, served from cache while fresh."""
+        cached = self._cached_event_types(refresh)
+        if cached is not None:
+            return cached
+        response = get_http_client().request(
+            TOOL_NAME, "GET", f"{CALENDLY_API_URL}/event_types", headers=self.headers
+        )
+        return self._store_event_types(response)
+
+    async def alist_event_type_uuids(self, refresh: bool = False) -> List[str]:
+        """Async variant of `list_event_type_uuids`."""
+        cached = self._cached_event_types(refresh)
+        if cached is not None:
+            return cached
+        response = await get_http_client().arequest(
+            TOOL_NAME, "GET", f"{CALENDLY_API_URL}/event_types", headers=self.headers
+        )
+        return self._store_event_types(response)
+
+    @staticmethod
+    def _first_event_type(uuids: List[str]) -> str:
+        if not uuids:
+            raise CalendlyError("No available event types found in your Calendly account.")
+        return uuids[0]
+
+    def default_event_type_uuid(self) -> str:
+        if self.event_type_uuid:
+            return self.event_type_uuid
+        return self._first_event_type(self.list_event_type_uuids())
+
+    async def adefault_event_type_uuid(self) -> str:
+        if self.event_type_uuid:
+            return self.event_type_uuid
+        return self._first_event_type(await self.alist_event_type_uuids())
+
+    def _scheduling_link_request(self, event_type_uuid: str) -> Tuple[str, dict]:
+        payload = {
+            "max_event_count": 1,
+            "owner": f"{CALENDLY_API_URL}/event_types/{event_type_uuid}",
+            "owner_type": "EventType",
+        }
+        return f"{CALENDLY_API_URL}/scheduling_links", payload
+
+    @staticmethod
+    def _booking_url(response) -> str:
+        if response.status_code != 201:
+            raise CalendlyError(
+                f"Failed to create Calendly link: {response.status_code} - {response.text}"
+            )
+        try:
+            return response.json()["resource"]["booking_url"]
+        except (ValueError, KeyError, TypeError) as e:
+            raise CalendlyError(f"Failed to read Calendly scheduling link: {e!r}")
+
+    def create_scheduling_link(self, event_type_uuid: Optional[str] = None) -> str:
+        """Creates a single-use booking link with a live API call."""
+        url, payload = self._scheduling_link_request(
+            event_type_uuid or self.default_event_type_uuid()
+        )
+        response = get_http_client().request(
+            TOOL_NAME, "POST", url, json=payload, headers=self.headers
+        )
+        return self._booking_url(response)
+
+    async def acreate_scheduling_link(self, event_type_uuid: Optional[str] = None) -> str:
+        """Async variant of `create_scheduling_link`."""
+        url, payload = self._scheduling_link_request(
+            event_type_uuid or await self.adefault_event_type_uuid()
+        )
+        response = await get_http_client().arequest(
+            TOOL_NAME, "POST", url, json=payload, headers=self.headers
+        )
+        return self._booking_url(response)
+
+
+class SchedulingLinkPool:
+    """
+    Keeps a small pool of pre-created single-use booking links per event type.
+
+    `take` pops a ready link without any network I/O and wakes the background
+    refiller, which tops every pool back up to `pool_size` using `create_link`.
+    Links older than `link_max_age` are discarded instead of handed out.
+
+    Args:
+        create_link (Callable): Creates one booking link for the given event type UUID.
+        pool_size (int): Number of links kept ready per event type.
+        link_max_age (float): Seconds a pooled link may be handed out for.
+        retry_interval (float): Seconds to wait before refilling again after a failure.
+    """
+
+    def __init__(
+        self,
+        create_link: Callable[[str], str],
+        pool_size: int = 3,
+        link_max_age: float = 24 * 3600.0,
+        retry_interval: float = 30.0,
+    ):
+        self.create_link = create_link
+        self.pool_size = pool_size
+        self.link_max_age = link_max_age
+        self.retry_interval = retry_interval
+        self._links: Dict[str, Deque[Tuple[float, str]]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.hits = 0
+        self.misses = 0
+
+    def track(self, event_type_uuid: str) -> None:
+        """Registers an event type so the refiller keeps links ready for it."""
+        with self._lock:
+            self._links.setdefault(event_type_uuid, deque())
+        self._wakeup.set()
+
+    def take(self, event_type_uuid: str) -> Optional[str]:
+        """Returns a pre-created link for the event type, or None when the pool is empty."""
+        now = time.monotonic()
+        link = None
+        with self._lock:
+            links = self._links.setdefault(event_type_uuid, deque())
+            while links:
+                created_at, candidate = links.popleft()
+                if now - created_at < self.link_max_age:
+                    link = candidate
+                    break
+            if link is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._wakeup.set()
+        return link
+
+    def size(self, event_type_uuid: str) -> int:
+        with self._lock:
+            return len(self._links.get(event_type_uuid, ()))
+
+    def _deficits(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                uuid: self.pool_size - len(links)
+                for uuid, links in self._links.items()
+                if len(links) < self.pool_size
+            }
+
+    def refill(self) -> int:
+        """Tops every tracked pool up to `pool_size`. Returns the number of links created."""
+        created = 0
+        for event_type_uuid, missing in self._deficits().items():
+            for _ in range(missing):
+                link = self.create_link(event_type_uuid)
+                with self._lock:
+                    self._links[event_type_uuid].append((time.monotonic(), link))
+                created += 1
+        return created
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            wait = None
+            try:
+                self.refill()
+            except Exception as e:
+                logger.warning(f"Scheduling link refill failed: {e}")
+                wait = self.retry_interval
+            self._wakeup.wait(wait)
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        """Starts the background refiller if it is not already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="salesgpt-calendly-pool", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        self._wakeup.set()
+        thread.join(timeout)
+
+
+_calendly_client: Optional[CalendlyClient] = None
+_link_pool: Optional[SchedulingLinkPool] = None
+_singleton_lock = threading.Lock()
+
+
+def get_calendly_client() -> CalendlyClient:
+    """Returns the process-wide Calendly client with its event type cache."""
+    global _calendly_client
+    with _singleton_lock:
+        if _calendly_client is None:
+            _calendly_client = CalendlyClient()
+        return _calendly_client
+
+
+def get_scheduling_link_pool() -> SchedulingLinkPool:
+    """Returns the process-wide booking link pool, sized by CALENDLY_LINK_POOL_SIZE."""
+    global _link_pool
+    client = get_calendly_client()
+    with _singleton_lock:
+        if _link_pool is None:
+            _link_pool = SchedulingLinkPool(
+                create_link=client.create_scheduling_link,
+                pool_size=int(os.getenv("CALENDLY_LINK_POOL_SIZE", "3")),
+            )
+        return _link_pool
+
+
+def warm_scheduling_link_pool() -> None:
+    """Resolves the default event type and starts pre-creating links for it in the background."""
+    client = get_calendly_client()
+    if not client.api_key:
+        return
+    pool = get_scheduling_link_pool()
+
+    def _warm():
+        try:
+            pool.track(client.default_event_type_uuid())
+        except Exception as e:
+            logger.warning(f"Could not resolve Calendly event type: {e}")
+            return
+        pool.start()
+
+    threading.Thread(target=_warm, name="salesgpt-calendly-warmup", daemon=True).start()
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# SalesGPT fields that shape the agent's answers; agents sharing them share cached answers.
+AGENT_CONFIG_FIELDS = (
+    "salesperson_name",
+    "salesperson_role",
+    "company_name",
+    "company_business",
+    "company_values",
+    "conversation_purpose",
+    "conversation_type",
+    "use_tools",
+    "model_name",
+)
+
+# Shorter messages ("yes", "ok", "sounds good") only make sense after what the agent said.
+MIN_QUESTION_WORDS = 4
+QUESTION_WORDS = frozenset(
+    {
+        "what", "which", "who", "whom", "whose", "when", "where", "why", "how",
+        "do", "does", "did", "is", "are", "was", "were", "can", "could", "will",
+        "would", "should", "have", "has", "may",
+    }
+)
+
+# Tools whose output depends only on the question, so answers built on them may be reused.
+SEMANTICALLY_CACHEABLE_TOOLS = frozenset({"ProductSearch"})
+
+
+def agent_config_hash(agent: Any) -> str:
+    """Hash of the agent configuration fields listed in AGENT_CONFIG_FIELDS."""
+    config = {name: getattr(agent, name, None) for name in AGENT_CONFIG_FIELDS}
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def is_cacheable_question(text: Optional[str]) -> bool:
+    """
+    Whether a prospect message is a standalone question worth answering from cache.
+
+    Short replies and statements ("yes", "tell me more") depend on the conversation
+    so far, and an answer to one must never be served to another prospect.
+    """
+    if not text:
+        return False
+    words = re.findall(r"[\w']+", text.lower())
+    if len(words) < MIN_QUESTION_WORDS:
+        return False
+    return text.rstrip().endswith("?") or words[0] in QUESTION_WORDS
+
+
+@dataclass
+class _Bucket:
+    questions: List[str] = field(default_factory=list)
+    answers: List[str] = field(default_factory=list)
+    created_at: List[float] = field(default_factory=list)
+    vectors: Optional[np.ndarray] = None
+
+
+class SemanticResponseCache:
+    """
+    Reuses agent answers for near-identical prospect questions.
+
+    Answers are bucketed by scope, the agent config hash, conversation stage and a
+    hash of the agent's preceding message, and matched on the cosine similarity of the embedded question. Only matches at
+    or above `threshold` that are younger than `ttl` are served.
+
+    Args:
+        embeddings (Embeddings): Embeds the questions. Defaults to OpenAIEmbeddings.
+        threshold (float): Minimum cosine similarity for a hit.
+        ttl (float): Seconds a cached answer may be served for.
+        max_entries_per_scope (int): Oldest answers are dropped beyond this size.
+    """
+
+    def __init__(
+        self,
+        embeddings: Optional[Embeddings] = None,
+        threshold: float = 0.95,
+        ttl: float = 24 * 3600.0,
+        max_entries_per_scope: int = 1000,
+    ):
+        if embeddings is None:
+            from langchain_openai import OpenAIEmbeddings
+
+            embeddings = OpenAIEmbeddings()
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_scope = max_entries_per_scope
+        self._buckets: Dict[Tuple[str, ...], _Bucket] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _expire(self, bucket: _Bucket, now: float) -> None:
+        keep = [i for i, created in enumerate(bucket.created_at) if now - created < self.ttl]
+        keep = keep[-self.max_entries_per_scope :]
+        if len(keep) == len(bucket.created_at):
+            return
+        bucket.questions = [bucket.questions[i] for i in keep]
+        bucket.answers = [bucket.answers[i] for i in keep]
+        bucket.created_at = [bucket.created_at[i] for i in keep]
+        bucket.vectors = bucket.vectors[keep] if keep else None
+
+    def _match(self, scope: Tuple[str, str], vector: np.ndarray) -> Optional[str]:
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            answer = None
+            if bucket is not None:
+                self._expire(bucket, time.time())
+                if bucket.vectors is not None:
+                    similarities = bucket.vectors @ vector
+                    best = int(np.argmax(similarities))
+                    if similarities[best] >= self.threshold:
+                        answer = bucket.answers[best]
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def lookup(self, scope: Tuple[str, str], question: str) -> Tuple[Optional[str], np.ndarray]:
+        """
+        Returns the cached answer for `question` in `scope` (None on a miss) and the
+        question's embedding, which `store` takes so a miss is embedded only once.
+        """
+        vector = self._normalize(self.embeddings.embed_query(question))
+        return self._match(scope, vector), vector
+
+    async def alookup(
+        self, scope: Tuple[str, str], question: str
+    ) -> Tuple[Optional[str], np.ndarray]:
+        """Async variant of `lookup`."""
+        vector = self._normalize(await self.embeddings.aembed_query(question))
+        return self._match(scope, vector), vector
+
+    def store(
+        self, scope: Tuple[str, str], question: str, answer: str, vector: np.ndarray
+    ) -> None:
+        with self._lock:
+            bucket = self._buckets.setdefault(scope, _Bucket())
+            bucket.questions.append(question)
+            bucket.answers.append(answer)
+            bucket.created_at.append(time.time())
+            row = vector.reshape(1, -1)
+            bucket.vectors = row if bucket.vectors is None else np.vstack([bucket.vectors, row])
+            self._expire(bucket, time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": sum(len(b.answers) for b in self._buckets.values()),
+            }
+
+
+def is_semantically_cacheable(ai_message: Dict[str, Any]) -> bool:
+    """True if the turn used no tools, or only tools in SEMANTICALLY_CACHEABLE_TOOLS."""
+    for action, _ in ai_message.get("intermediate_steps") or []:
+        if getattr(action, "tool", None) not in SEMANTICALLY_CACHEABLE_TOOLS:
+            return False
+    return True
+
+
+_semantic_cache: Optional[SemanticResponseCache] = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_response_cache() -> SemanticResponseCache:
+    """
+    Returns the process-wide cache, configured by SEMANTIC_CACHE_THRESHOLD and
+    SEMANTIC_CACHE_TTL, so every session of an agent config shares its answers.
+    """
+    global _semantic_cache
+    with _semantic_cache_lock:
+        if _semantic_cache is None:
+            _semantic_cache = SemanticResponseCache(
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+                ttl=float(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 3600))),
+            )
+        return _semantic_cache
@@ -0,0 +1,428 @@
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import unquote, urlparse
+
+# Stdlib only, like salesgpt.sessions: the Redis backend speaks RESP over a plain socket
+# so no client library is needed and tests can run it against a local stand-in server.
+
+logger = logging.getLogger(__name__)
+
+
+class SessionConflictError(Exception):
+    """Raised when a session was written by another worker since it was loaded."""
+
+    def __init__(self, session_id: str, expected_version: int):
+        super().__init__(
+            f"Session {session_id} changed since version {expected_version} was loaded"
+        )
+        self.session_id = session_id
+        self.expected_version = expected_version
+
+
+@dataclass
+class SessionState:
+    """
+    The compact, shareable state of one conversation.
+
+    Everything else an agent needs (chains, tools, knowledge base) is rebuilt from the
+    per-config template named by `config_key`.
+
+    Args:
+        session_id (str): The chat session id.
+        config_key (str): Identifies the agent configuration the session runs on.
+        conversation_history (List[str]): The conversation so far.
+        conversation_stage_id (str): The current stage id.
+        current_turn (int): Turns taken, checked against the turn limit.
+        version (int): Bumped on every save; 0 means never saved.
+    """
+
+    session_id: str
+    config_key: str
+    conversation_history: List[str] = field(default_factory=list)
+    conversation_stage_id: str = "1"
+    current_turn: int = 0
+    version: int = 0
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "SessionState":
+        return cls(**json.loads(data))
+
+
+class SessionBackend:
+    """
+    Shared session-state storage with optimistic concurrency.
+
+    `save` only succeeds if the stored version still equals `state.version`, so two
+    workers that loaded the same version cannot both write; the loser gets a
+    `SessionConflictError` and must reload.
+    """
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        raise NotImplementedError
+
+    def save(self, state: SessionState) -> SessionState:
+        """Stores `state` if nobody wrote since it was loaded; returns it with the new version."""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def prune(self) -> int:
+        """Deletes expired sessions the store does not expire by itself; returns how many."""
+        return 0
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionBackend(SessionBackend):
+    """Process-local backend, for a single worker and for tests."""
+
+    def __init__(self):
+        self._states: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        with self._lock:
+            data = self._states.get(session_id)
+        return SessionState.from_json(data) if data is not None else None
+
+    def save(self, state: SessionState) -> SessionState:
+        saved = replace(state, version=state.version + 1)
+        with self._lock:
+            data = self._states.get(state.session_id)
+            stored_version = SessionState.from_json(data).version if data is not None else 0
+            if stored_version != state.version:
+                raise SessionConflictError(state.session_id, state.version)
+            self._states[state.session_id] = saved.to_json()
+        return saved
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._states.pop(session_id, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS session_state (
+    session_id TEXT PRIMARY KEY,
+    config_key TEXT NOT NULL,
+    state TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_state_updated ON session_state (updated_at);
+"""
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Session state in a SQLite file, shared by every worker process on the host.
+
+    Args:
+        path (str): Location of the database file.
+        ttl (float, optional): Seconds after the last save a session expires; see `prune`.
+    """
+
+    def __init__(self, path: str = "sessions.sqlite3", ttl: Optional[float] = None):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.row_factory = sqlite3.Row
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT state, version, updated_at FROM session_state WHERE session_id = ?",
+                (session_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        if self.ttl is not None and time.time() - row["updated_at"] > self.ttl:
+            return None
+        return replace(SessionState.from_json(row["state"]), version=row["version"])
+
+    def save(self, state: SessionState) -> SessionState:
+        saved = replace(state, version=state.version + 1)
+        with self._connect() as db:
+            if state.version == 0:
+                now = time.time()
+                # An expired row loads as no session, so a fresh one may take its place.
+                cutoff = now - self.ttl if self.ttl is not None else float("-inf")
+                cursor = db.execute(
+                    "INSERT INTO session_state "
+                    "(session_id, config_key, state, version, updated_at) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (session_id) DO UPDATE SET config_key = excluded.config_key, "
+                    "state = excluded.state, version = excluded.version, "
+                    "updated_at = excluded.updated_at WHERE session_state.updated_at < ?",
+                    (saved.session_id, saved.config_key, saved.to_json(), saved.version, now, cutoff),
+                )
+            else:
+                cursor = db.execute(
+                    "UPDATE session_state SET config_key = ?, state = ?, version = ?, updated_at = ? "
+                    "WHERE session_id = ? AND version = ?",
+                    (
+                        saved.config_key,
+                        saved.to_json(),
+                        saved.version,
+                        time.time(),
+                        saved.session_id,
+                        state.version,
+                    ),
+                )
+            if cursor.rowcount != 1:
+                raise SessionConflictError(state.session_id, state.version)
+        return saved
+
+    def delete(self, session_id: str) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM session_state WHERE session_id = ?", (session_id,))
+
+    def prune(self) -> int:
+        """Deletes sessions not saved within `ttl` and returns how many were removed."""
+        if self.ttl is None:
+            return 0
+        with self._connect() as db:
+            cursor = db.execute(
+                "DELETE FROM session_state WHERE updated_at < ?", (time.time() - self.ttl,)
+            )
+            return cursor.rowcount
+
+
+class RedisError(Exception):
+    """An error reply from the Redis server."""
+
+
+class RespConnection:
+    """
+    A minimal blocking RESP2 client: enough commands for `RedisSessionBackend`.
+
+    Args:
+        host (str): Server host.
+        port (int): Server port.
+        db (int): Database index selected after connecting.
+        password (str, optional): Sent with AUTH after connecting.
+        timeout (float): Socket timeout in seconds.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        timeout: float = 5.0,
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+
+    def _open(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._reader = self._sock.makefile("rb")
+        if self.password:
+            self._roundtrip("AUTH", self.password)
+        if self.db:
+            self._roundtrip("SELECT", self.db)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return self._reader.read(length + 2)[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply {line!r}")
+
+    def _roundtrip(self, *args: Any) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            value = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+            parts.append(b"$%d\r\n%s\r\n" % (len(value), value))
+        self._sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def execute(self, *args: Any) -> Any:
+        """Sends one command and returns its decoded reply, connecting on first use."""
+        if self._sock is None:
+            self._open()
+        try:
+            return self._roundtrip(*args)
+        except (OSError, ConnectionError):
+            # Never retry here: a half-sent transaction must not be replayed.
+            self.close()
+            raise
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 5.0) -> "RespConnection":
+        """Builds a connection from a redis://[:password@]host[:port][/db] URL."""
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported Redis URL scheme: {parsed.scheme}")
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=unquote(parsed.password) if parsed.password else None,
+            timeout=timeout,
+        )
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Session state in Redis (or anything speaking its protocol), shared across hosts.
+
+    Each session is one JSON string key. Saves are compare-and-set via WATCH/MULTI/EXEC,
+    which aborts if another client wrote the key after it was watched.
+
+    Args:
+        url (str): redis://[:password@]host[:port][/db]
+        prefix (str): Prepended to session ids to form keys.
+        ttl (float, optional): Seconds after the last save a session expires.
+        pool_size (int): Connections kept for concurrent callers.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        prefix: str = "salesgpt:session:",
+        ttl: Optional[float] = None,
+        pool_size: int = 4,
+    ):
+        self.url = url
+        self.prefix = prefix
+        self.ttl = ttl
+        self.pool_size = pool_size
+        self._pool: List[RespConnection] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connection(self) -> Iterator[RespConnection]:
+        with self._lock:
+            conn = self._pool.pop() if self._pool else RespConnection.from_url(self.url)
+        try:
+            yield conn
+        except SessionConflictError:
+            # The transaction was aborted or unwatched; the connection is reusable.
+            self._release(conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+
+    def _release(self, conn: RespConnection) -> None:
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def load(self, session_id: str) -> Optional[SessionState]:
+        with self._connection() as conn:
+            data = conn.execute("GET", self._key(session_id))
+        return SessionState.from_json(data.decode("utf-8")) if data is not None else None
+
+    def save(self, state: SessionState) -> SessionState:
+        key = self._key(state.session_id)
+        saved = replace(state, version=state.version + 1)
+        with self._connection() as conn:
+            conn.execute("WATCH", key)
+            try:
+                data = conn.execute("GET", key)
+                stored_version = SessionState.from_json(data.decode("utf-8")).version if data else 0
+                if stored_version != state.version:
+                    raise SessionConflictError(state.session_id, state.version)
+            except Exception:
+                conn.execute("UNWATCH")
+                raise
+            conn.execute("MULTI")
+            if self.ttl is not None:
+                conn.execute("SET", key, saved.to_json(), "PX", int(self.ttl * 1000))
+            else:
+                conn.execute("SET", key, saved.to_json())
+            if conn.execute("EXEC") is None:
+                raise SessionConflictError(state.session_id, state.version)
+        return saved
+
+    def delete(self, session_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("DEL", self._key(session_id))
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, []
+        for conn in pool:
+            conn.close()
+
+
+def session_backend_from_env() -> Optional[SessionBackend]:
+    """
+    The shared session backend selected by SESSION_BACKEND, or None for process-local sessions.
+
+    SESSION_BACKEND is "memory" (default), "sqlite" or "redis"; SESSION_SQLITE_PATH and
+    SESSION_REDIS_URL locate the store and SESSION_STATE_TTL expires idle sessions.
+    """
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    ttl = os.getenv("SESSION_STATE_TTL")
+    ttl = float(ttl) if ttl else None
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        return SQLiteSessionBackend(os.getenv("SESSION_SQLITE_PATH", "sessions.sqlite3"), ttl=ttl)
+    if backend == "redis":
+        return RedisSessionBackend(
+            os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0"), ttl=ttl
+        )
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
@@ -0,0 +1,316 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+# Stdlib only, like salesgpt.metrics, so the standalone app/ server can use it too.
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DiskSessionTier:
+    """
+    Keeps the serialized state of evicted sessions as one JSON file each.
+
+    Args:
+        path (str): Directory the files are written to.
+        ttl (float): Seconds a spilled session may be rehydrated for; older files are
+            deleted when they are next looked up or pruned.
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 24 * 3600.0):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, session_id: str) -> str:
+        key = hashlib.sha256(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.path, f"{key}.json")
+
+    def save(self, session_id: str, state: Dict[str, Any]) -> None:
+        entry = {"session_id": session_id, "spilled_at": time.time(), "state": state}
+        file = self._file(session_id)
+        tmp_file = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_file, file)
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the spilled state of `session_id` and removes it from the tier."""
+        file = self._file(session_id)
+        try:
+            with open(file, "r") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.exception("Discarding unreadable spilled session %s", session_id)
+            self.delete(session_id)
+            return None
+        self.delete(session_id)
+        if time.time() - entry.get("spilled_at", 0) > self.ttl:
+            return None
+        return entry["state"]
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.remove(self._file(session_id))
+        except FileNotFoundError:
+            pass
+
+    def prune(self) -> int:
+        """Deletes spilled sessions older than `ttl` and returns how many were removed."""
+        removed = 0
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.path):
+            file = os.path.join(self.path, name)
+            try:
+                if name.endswith(".json") and os.path.getmtime(file) < cutoff:
+                    os.remove(file)
+                    removed += 1
+            except FileNotFoundError:
+                # Rehydrated by a request while we were looking.
+                pass
+        return removed
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.path) if name.endswith(".json"))
+
+
+class SessionStore(Generic[T]):
+    """
+    Bounded in-memory session map with idle expiry, LRU eviction and a spill tier.
+
+    Sessions idle for longer than `idle_ttl`, and the least recently used ones once
+    more than `max_sessions` are held, are evicted. An evicted session is reduced to
+    the state `dump` returns and handed to `tier`; `get` rebuilds it with `load` on
+    its next request.
+
+    Args:
+        dump (Callable): Returns the JSON-serializable state worth keeping.
+        load (Callable): Rebuilds a session from its id and dumped state.
+        tier (DiskSessionTier, optional): Where evicted sessions go. Without one they are dropped.
+        max_sessions (int): Sessions kept in memory.
+        idle_ttl (float): Seconds a session may stay idle in memory.
+        metrics (AppMetrics, optional): Receives eviction and rehydration counts.
+    """
+
+    def __init__(
+        self,
+        dump: Callable[[T], Dict[str, Any]],
+        load: Callable[[str, Dict[str, Any]], T],
+        tier: Optional[DiskSessionTier] = None,
+        max_sessions: int = 500,
+        idle_ttl: float = 1800.0,
+        metrics: Any = None,
+    ):
+        self.dump = dump
+        self.load = load
+        self.tier = tier
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.metrics = metrics
+        self._sessions: "OrderedDict[str, Tuple[T, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Per-id locks, so one request rehydrates or creates a session while others wait.
+        self._loading: Dict[str, Tuple[threading.Lock, int]] = {}
+        self.evictions = {"lru": 0, "ttl": 0}
+        self.rehydrations = 0
+
+    def _spill(self, evicted: List[Tuple[str, T, str]]) -> None:
+        # Called without the lock held: dumping and disk I/O must not block other lookups.
+        for session_id, session, reason in evicted:
+            if self.metrics is not None:
+                self.metrics.session_evictions.inc(reason=reason)
+            if self.tier is None:
+                continue
+            try:
+                self.tier.save(session_id, self.dump(session))
+            except Exception:
+                logger.exception("Failed to spill session %s", session_id)
+
+    def _collect(self, now: float) -> List[Tuple[str, T, str]]:
+        evicted = []
+        while self._sessions:
+            session_id, (session, last_used) = next(iter(self._sessions.items()))
+            if now - last_used > self.idle_ttl:
+                reason = "ttl"
+            elif len(self._sessions) > self.max_sessions:
+                reason = "lru"
+            else:
+                break
+            del self._sessions[session_id]
+            self.evictions[reason] += 1
+            evicted.append((session_id, session, reason))
+        return evicted
+
+    @contextmanager
+    def _loading_lock(self, session_id: str):
+        with self._lock:
+            lock, waiters = self._loading.get(session_id, (threading.Lock(), 0))
+            self._loading[session_id] = (lock, waiters + 1)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                lock, waiters = self._loading[session_id]
+                if waiters == 1:
+                    del self._loading[session_id]
+                else:
+                    self._loading[session_id] = (lock, waiters - 1)
+
+    def _touch(self, session_id: str) -> Optional[T]:
+        """Returns the in-memory session, marking it used, after evicting stale ones."""
+        now = time.monotonic()
+        with self._lock:
+            evicted = self._collect(now)
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                self._sessions[session_id] = (entry[0], now)
+                self._sessions.move_to_end(session_id)
+        self._spill(evicted)
+        return entry[0] if entry is not None else None
+
+    def _rehydrate(self, session_id: str) -> Optional[T]:
+        # Called with the session's loading lock held.
+        session = self._touch(session_id)
+        if session is not None:
+            return session
+        state = self.tier.load(session_id) if self.tier is not None else None
+        if state is None:
+            return None
+        session = self.load(session_id, state)
+        with self._lock:
+            self.rehydrations += 1
+        if self.metrics is not None:
+            self.metrics.session_rehydrations.inc()
+        return self.put(session_id, session)
+
+    def get(self, session_id: str) -> Optional[T]:
+        """Returns the live session, rehydrating it from the spill tier if needed."""
+        session = self._touch(session_id)
+        if session is not None:
+            return session
+        with self._loading_lock(session_id):
+            return self._rehydrate(session_id)
+
+    def put(self, session_id: str, session: T) -> T:
+        """Stores `session` as the most recently used one and returns the live session."""
+        with self._lock:
+            existing = self._sessions.get(session_id)
+            if existing is not None:
+                # Another request rehydrated or created it first; keep that one.
+                session = existing[0]
+            self._sessions[session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            evicted = self._collect(time.monotonic())
+        self._spill(evicted)
+        return session
+
+    def get_or_create(self, session_id: str, create: Callable[[str], T]) -> T:
+        """
+        Returns the live session, rehydrating it or building it with `create`.
+
+        Concurrent calls for the same id wait for the first one, so a spilled
+        conversation is never replaced by a fresh session built alongside it.
+        """
+        session = self._touch(session_id)
+        if session is not None:
+            return session
+        with self._loading_lock(session_id):
+            session = self._rehydrate(session_id)
+            if session is None:
+                session = self.put(session_id, create(session_id))
+        return session
+
+    def pop(self, session_id: str) -> Optional[T]:
+        """Removes a session from memory and the spill tier without spilling it."""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if self.tier is not None:
+            self.tier.delete(session_id)
+        return entry[0] if entry is not None else None
+
+    def sweep(self) -> int:
+        """Evicts idle sessions now; returns how many were evicted."""
+        with self._lock:
+            evicted = self._collect(time.monotonic())
+        self._spill(evicted)
+        return len(evicted)
+
+    def expire(self) -> int:
+        """Evicts idle sessions and deletes spilled ones past the tier's TTL; returns how many."""
+        removed = self.sweep()
+        if self.tier is not None:
+            removed += self.tier.prune()
+        return removed
+
+    def spill_all(self) -> None:
+        """Spills every in-memory session, e.g. on shutdown, so none is lost."""
+        with self._lock:
+            evicted = [(sid, session, "shutdown") for sid, (session, _) in self._sessions.items()]
+            self._sessions.clear()
+        if self.tier is not None:
+            for session_id, session, _ in evicted:
+                try:
+                    self.tier.save(session_id, self.dump(session))
+                except Exception:
+                    logger.exception("Failed to spill session %s", session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._sessions
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                "in_memory": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "evictions": dict(self.evictions),
+                "rehydrations": self.rehydrations,
+            }
+        stats["spilled"] = len(self.tier) if self.tier is not None else 0
+        return stats
+
+
+def session_store_settings() -> Dict[str, Any]:
+    """SessionStore keyword arguments from SESSION_MAX_IN_MEMORY, SESSION_IDLE_TTL and SESSION_SPILL_DIR."""
+    spill_dir = os.getenv("SESSION_SPILL_DIR", "session_spill")
+    return {
+        "max_sessions": int(os.getenv("SESSION_MAX_IN_MEMORY", "500")),
+        "idle_ttl": float(os.getenv("SESSION_IDLE_TTL", "1800")),
+        "tier": DiskSessionTier(spill_dir) if spill_dir else None,
+    }
+
+
+def session_sweep_interval() -> float:
+    """Seconds between sweeps of expired sessions, from SESSION_SWEEP_INTERVAL."""
+    return float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+
+async def run_periodically(job: Callable[[], Any], interval: float) -> None:
+    """
+    Runs the blocking `job` off the event loop every `interval` seconds until cancelled.
+
+    A failing run is logged and the next one happens on schedule.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await loop.run_in_executor(None, job)
+        except Exception:
+            logger.exception("Periodic %s failed", getattr(job, "__name__", job))
@@ -0,0 +1,262 @@
+import logging
+import os
+import signal
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+from dotenv import dotenv_values, find_dotenv
+
+from salesgpt.agent_config import DEFAULT_SALESPERSON_NAME, get_agent_config_cache
+
+logger = logging.getLogger(__name__)
+
+SettingsListener = Callable[["ApiSettings", "ApiSettings"], None]
+
+
+def _flag(value: Optional[str], default: bool) -> bool:
+    if value is None:
+        return default
+    return value.lower() in ("true", "1", "t")
+
+
+@dataclass(frozen=True)
+class ApiSettings:
+    """
+    Everything the API reads from its environment, parsed once per load.
+
+    Handlers receive the current snapshot instead of calling `os.getenv` or opening
+    the agent config themselves; a reload replaces the whole snapshot at once.
+    """
+
+    environment: str = "development"
+    auth_key: Optional[str] = None
+    config_path: str = "examples/example_agent_setup.json"
+    product_catalog: str = "examples/sample_product_catalog.txt"
+    model_name: str = "gpt-3.5-turbo-0613"
+    secondary_model_name: Optional[str] = None
+    use_tools: bool = True
+    ws_idle_followup: float = 0.0
+    ws_max_buffered_chars: int = 256 * 1024
+    ws_max_queued_turns: int = 4
+    agent_config: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def production(self) -> bool:
+        return self.environment == "production"
+
+    @property
+    def salesperson_name(self) -> str:
+        return self.agent_config.get("salesperson_name", DEFAULT_SALESPERSON_NAME)
+
+    @property
+    def agent_fields(self) -> Tuple[Any, ...]:
+        """The settings an agent is built from; sessions need a new template when they change."""
+        return (
+            self.config_path,
+            self.product_catalog,
+            self.model_name,
+            self.secondary_model_name,
+            self.use_tools,
+            sorted(self.agent_config.items()),
+        )
+
+    def authorized(self, authorization: Optional[str]) -> bool:
+        """Whether an Authorization header carries the configured AUTH_KEY."""
+        return bool(self.auth_key) and authorization == f"Bearer {self.auth_key}"
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "ApiSettings":
+        """
+        Parses settings from `environ` and reads the agent config it points to.
+
+        Args:
+            environ (Mapping): Environment variables; the process environment by default.
+
+        Returns:
+            ApiSettings: The parsed snapshot.
+        """
+        config_path = environ.get("CONFIG_PATH", cls.config_path)
+        agent_config: Dict[str, Any] = {}
+        if config_path:
+            try:
+                agent_config = get_agent_config_cache().load(config_path)
+            except (OSError, ValueError) as e:
+                logger.warning("Could not read agent config %s: %s", config_path, e)
+        return cls(
+            environment=environ.get("ENVIRONMENT", cls.environment),
+            auth_key=environ.get("AUTH_KEY") or None,
+            config_path=config_path,
+            product_catalog=environ.get("PRODUCT_CATALOG", cls.product_catalog),
+            model_name=environ.get("GPT_MODEL", cls.model_name),
+            secondary_model_name=environ.get("SECONDARY_GPT_MODEL") or None,
+            use_tools=_flag(environ.get("USE_TOOLS_IN_API"), cls.use_tools),
+            ws_idle_followup=float(environ.get("WS_IDLE_FOLLOWUP_SECONDS", "0")),
+            ws_max_buffered_chars=int(environ.get("WS_MAX_BUFFERED_CHARS", str(256 * 1024))),
+            ws_max_queued_turns=int(environ.get("WS_MAX_QUEUED_TURNS", "4")),
+            agent_config=agent_config,
+        )
+
+
+class SettingsStore:
+    """
+    Holds the current `ApiSettings` and swaps in a freshly parsed copy on reload.
+
+    A reload re-reads the dotenv file and the agent config and replaces the snapshot
+    with one assignment, so a request sees either all old or all new settings. Values
+    from the dotenv file never override variables the process was started with, the
+    same precedence as `load_dotenv`. Reloads happen on SIGHUP (see `install_sighup`)
+    and, while `start`ed, when either file changes on disk.
+
+    Args:
+        env_file (str, optional): Dotenv file applied on every load.
+        watch_interval (float): Seconds between checks for changed files; 0 disables.
+    """
+
+    def __init__(self, env_file: Optional[str] = ".env", watch_interval: float = 0.0):
+        self.env_file = env_file
+        self.watch_interval = watch_interval
+        self.reloads = 0
+        self._process_keys = frozenset(os.environ)
+        # Variables the dotenv file set, so a reload can unset the ones it no longer has.
+        self._file_keys: FrozenSet[str] = frozenset()
+        self._listeners: List[SettingsListener] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._current = self._load()
+        self._signature = self._files_signature(self._current)
+
+    def _apply_env_file(self) -> None:
+        values = {}
+        if self.env_file and os.path.exists(self.env_file):
+            values = {
+                key: value
+                for key, value in dotenv_values(self.env_file).items()
+                if value is not None and key not in self._process_keys
+            }
+        for key in self._file_keys - values.keys():
+            os.environ.pop(key, None)
+        os.environ.update(values)
+        self._file_keys = frozenset(values)
+
+    def _load(self) -> ApiSettings:
+        self._apply_env_file()
+        return ApiSettings.from_env(os.environ)
+
+    def _files_signature(self, settings: ApiSettings) -> Tuple[Optional[Tuple[int, int]], ...]:
+        signature = []
+        for path in (self.env_file, settings.config_path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except (OSError, TypeError):
+                signature.append(None)
+        return tuple(signature)
+
+    def get(self) -> ApiSettings:
+        """The current snapshot; cheap enough to call on every request."""
+        return self._current
+
+    def subscribe(self, listener: SettingsListener) -> None:
+        """Calls `listener(previous, current)` after every successful reload."""
+        self._listeners.append(listener)
+
+    def reload(self) -> ApiSettings:
+        """
+        Re-reads the settings, keeping the current ones if they fail to parse.
+
+        Returns:
+            ApiSettings: The snapshot in effect after the reload.
+        """
+        with self._lock:
+            previous = self._current
+            try:
+                current = self._load()
+            except Exception:
+                logger.exception("Settings reload failed, keeping the current settings")
+                return previous
+            self._current = current
+            self._signature = self._files_signature(current)
+            self.reloads += 1
+        logger.info("Reloaded settings (reload %d)", self.reloads)
+        for listener in list(self._listeners):
+            try:
+                listener(previous, current)
+            except Exception:
+                logger.exception("Settings listener failed")
+        return current
+
+    def check_for_changes(self) -> bool:
+        """Reloads if the dotenv file or agent config changed on disk; returns whether it did."""
+        if self._files_signature(self._current) == self._signature:
+            return False
+        self.reload()
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.watch_interval):
+            try:
+                self.check_for_changes()
+            except Exception:
+                logger.exception("Settings watcher failed")
+
+    def start(self) -> None:
+        """Starts watching the files for changes, if a watch interval is set."""
+        if self.watch_interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name="salesgpt-settings-watch", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(1.0)
+
+    def install_sighup(self) -> bool:
+        """
+        Reloads the settings when the process receives SIGHUP.
+
+        Returns:
+            bool: False where signal handlers cannot be installed (Windows, non-main threads).
+        """
+        if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+            return False
+
+        def handle(signum: int, frame: Any) -> None:
+            # Reload off the handler: it may have interrupted a thread holding the lock.
+            threading.Thread(
+                target=self.reload, name="salesgpt-settings-reload", daemon=True
+            ).start()
+
+        signal.signal(signal.SIGHUP, handle)
+        return True
+
+
+_settings_store: Optional[SettingsStore] = None
+_settings_store_lock = threading.Lock()
+
+
+def get_settings_store() -> SettingsStore:
+    """
+    Returns the process-wide settings store, configured from SETTINGS_ENV_FILE (the
+    nearest .env by default) and SETTINGS_WATCH_INTERVAL. The first call applies the
+    dotenv file to the environment.
+    """
+    global _settings_store
+    with _settings_store_lock:
+        if _settings_store is None:
+            _settings_store = SettingsStore(
+                env_file=os.getenv("SETTINGS_ENV_FILE") or find_dotenv(usecwd=True) or None,
+                watch_interval=float(os.getenv("SETTINGS_WATCH_INTERVAL", "2")),
+            )
+        return _settings_store
+
+
+def get_settings() -> ApiSettings:
+    """The current settings snapshot, for use as a FastAPI dependency."""
+    return get_settings_store().get()
@@ -0,0 +1,181 @@
+import asyncio
+import importlib
+import logging
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Stdlib only, like salesgpt.sessions, so the standalone app/ server can use it too.
+
+logger = logging.getLogger(__name__)
+
+# Optional dependencies that should only be imported by the features using them.
+HEAVY_MODULES = (
+    "langchain.agents",
+    "langchain_community.vectorstores",
+    "chromadb",
+    "boto3",
+    "aioboto3",
+    "smtplib",
+)
+
+# What `python -m salesgpt.startup` profiles by default, in import order.
+DEFAULT_PROFILE_MODULES = (
+    "litellm",
+    "langchain_core",
+    "langchain.chains",
+    "langchain_community.chat_models",
+    "langchain_openai",
+    "salesgpt.agents",
+    "salesgpt.salesgptapi",
+    "salesgpt.tools",
+)
+
+
+@dataclass
+class ImportTiming:
+    """How long importing one module took, on top of what was already imported."""
+
+    module: str
+    seconds: float
+    modules_loaded: int
+    error: Optional[str] = None
+
+
+def profile_imports(modules: Iterable[str]) -> List[ImportTiming]:
+    """
+    Imports `modules` in order, timing each.
+
+    Each timing covers only what the module added to what earlier ones already
+    imported, so the first module that pulls in a shared dependency is charged for it.
+
+    Args:
+        modules (Iterable[str]): Dotted module names.
+
+    Returns:
+        List[ImportTiming]: One timing per module; failed imports carry their error.
+    """
+    timings = []
+    for module in modules:
+        loaded = len(sys.modules)
+        started = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        timings.append(
+            ImportTiming(module, time.perf_counter() - started, len(sys.modules) - loaded, error)
+        )
+    return timings
+
+
+def loaded_heavy_modules() -> List[str]:
+    """The optional heavy dependencies this process has imported so far."""
+    return [module for module in HEAVY_MODULES if module in sys.modules]
+
+
+def format_import_profile(timings: Sequence[ImportTiming]) -> str:
+    """A plain-text table of `timings`, slowest first, with the heavy modules now loaded."""
+    lines = [f"{'module':<40} {'seconds':>8} {'modules':>8}"]
+    for timing in sorted(timings, key=lambda t: t.seconds, reverse=True):
+        line = f"{timing.module:<40} {timing.seconds:>8.3f} {timing.modules_loaded:>8}"
+        lines.append(line + (f"  {timing.error}" if timing.error else ""))
+    lines.append(f"{'total':<40} {sum(t.seconds for t in timings):>8.3f}")
+    lines.append("heavy modules loaded: " + (", ".join(loaded_heavy_modules()) or "none"))
+    return "\n".join(lines)
+
+
+class Readiness:
+    """
+    Tracks a server from process start until warmup has finished.
+
+    The server binds its port as soon as it can and reports "not ready" until the
+    warmup steps (building the agent template, first imports of lazily loaded
+    modules) are done, so a proxy or orchestrator can wait for real readiness
+    instead of sleeping for a guessed time.
+    """
+
+    def __init__(self):
+        self.created_at = time.monotonic()
+        self.import_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.steps: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def imports_finished(self) -> None:
+        """Records the time spent importing the server module."""
+        self.import_seconds = time.monotonic() - self.created_at
+
+    def mark_ready(self) -> None:
+        self.warmup_seconds = time.monotonic() - self.created_at - (self.import_seconds or 0.0)
+        self._ready.set()
+        logger.info("Ready after %.2fs: %s", time.monotonic() - self.created_at, self.steps)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    async def warm_up(self, steps: Sequence[Tuple[str, Callable[[], Any]]]) -> None:
+        """
+        Runs blocking warmup `steps` off the event loop, then marks the server ready.
+
+        A failed step is logged and recorded but does not keep the server unready:
+        the work it would have done simply happens on the first request instead.
+
+        Args:
+            steps: (name, callable) pairs, run in order.
+        """
+        loop = asyncio.get_running_loop()
+        for name, step in steps:
+            started = time.monotonic()
+            try:
+                await loop.run_in_executor(None, step)
+            except Exception as e:
+                logger.exception("Warmup step %s failed", name)
+                self.error = f"{name}: {type(e).__name__}: {e}"
+            self.steps[name] = round(time.monotonic() - started, 3)
+        self.mark_ready()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime": round(time.monotonic() - self.created_at, 3),
+            "import_seconds": self.import_seconds and round(self.import_seconds, 3),
+            "warmup_seconds": self.warmup_seconds and round(self.warmup_seconds, 3),
+            "steps": dict(self.steps),
+            "heavy_modules": loaded_heavy_modules(),
+            "error": self.error,
+        }
+
+
+def install_readiness(app: Any, readiness: Readiness, path: str = "/ready") -> None:
+    """
+    Serves `readiness` at `path`: 200 once warm, 503 while still starting.
+
+    Args:
+        app (FastAPI): The app to install into.
+        readiness (Readiness): The server's startup tracker.
+        path (str): Route of the readiness probe.
+    """
+    from starlette.responses import JSONResponse
+
+    @app.get(path, include_in_schema=False)
+    async def ready():
+        return JSONResponse(readiness.status(), status_code=200 if readiness.ready else 503)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Prints an import profile of the given modules, or of the API's main dependencies."""
+    modules = list(argv if argv is not None else sys.argv[1:]) or list(DEFAULT_PROFILE_MODULES)
+    print(format_import_profile(profile_imports(modules)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,76 @@
 import json
 import os
+import re
+from typing import Optional
 
-import boto3
-import requests
+import httpx
 from langchain.agents import Tool
 from langchain.chains import RetrievalQA
 from langchain.text_splitter import CharacterTextSplitter
 from langchain_community.chat_models import BedrockChat
-from langchain_community.vectorstores import Chroma
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from litellm import completion
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
 
-def setup_knowledge_base(
-    product_catalog: str = None, model_name: str = "gpt-3.5-turbo"
-):
+from salesgpt.accounting import track_llm_call
+from salesgpt.bedrock import acompletion_bedrock, completion_bedrock
+from salesgpt.http_client import ToolUnavailableError, get_http_client
+from salesgpt.llm_cache import acompletion, completion
+from salesgpt.memo import ToolResultCache
+from salesgpt.outbox import get_email_outbox
+from salesgpt.prewarm import (
+    KNOWLEDGE_BASE_COLLECTION,
+    KNOWLEDGE_BASE_EMBEDDINGS_MODEL,
+    get_prewarm_artifact,
+)
+from salesgpt.scheduling import (
+    CalendlyError,
+    get_calendly_client,
+    get_scheduling_link_pool,
+)
+from salesgpt.tracing import trace_tool
+
+
+def tool_unavailable_message(tool_name: str) -> str:
+    """Observation returned to the agent when a tool dependency is unhealthy or timed out."""
+    return (
+        f"{tool_name} is temporarily unavailable. "
+        "Let the customer know and continue the conversation without it."
+    )
+
+
+FAILED_OBSERVATION_MARKERS = (
+    "is temporarily unavailable",
+    "Failed to",
+    "was not sent successfully",
+    "No available event types",
+)
+
+
+def is_failed_observation(observation) -> bool:
+    """Whether a tool observation reports a failure instead of a result."""
+    if not isinstance(observation, str):
+        return False
+    return any(marker in observation for marker in FAILED_OBSERVATION_MARKERS)
+
+
+def is_cacheable_observation(observation) -> bool:
+    """Tool observations that report a failure must not be memoized."""
+    return not is_failed_observation(observation)
+
+
+def build_knowledge_base_index(product_catalog: str, persist_directory: Optional[str] = None):
     """
-    We assume that the product catalog is simply a text string.
+    Embeds the product catalog into a Chroma vector store.
+
+    Args:
+        product_catalog (str): Path of the catalog text file.
+        persist_directory (str, optional): Where to persist the index; in memory if None.
+
+    Returns:
+        Chroma: The populated vector store.
     """
+    # The vector store and embeddings are only needed once a knowledge base is built.
+    from langchain_community.vectorstores import Chroma
+    from langchain_openai import OpenAIEmbeddings
+
     # load product catalog
     with open(product_catalog, "r") as f:
         product_catalog = f.read()
@@ -27,43 +78,45 @@ def setup_knowledge_base(
     text_splitter = CharacterTextSplitter(chunk_size=5000, chunk_overlap=200)
     texts = text_splitter.split_text(product_catalog)
 
-    llm = ChatOpenAI(model_name="gpt-4-0125-preview", temperature=0)
-
-    embeddings = OpenAIEmbeddings()
-    docsearch = Chroma.from_texts(
-        texts, embeddings, collection_name="product-knowledge-base"
+    return Chroma.from_texts(
+        texts,
+        OpenAIEmbeddings(model=KNOWLEDGE_BASE_EMBEDDINGS_MODEL),
+        collection_name=KNOWLEDGE_BASE_COLLECTION,
+        persist_directory=persist_directory,
     )
 
-    knowledge_base = RetrievalQA.from_chain_type(
-        llm=llm, chain_type="stuff", retriever=docsearch.as_retriever()
-    )
-    return knowledge_base
 
-
-def completion_bedrock(model_id, system_prompt, messages, max_tokens=1000):
-    """
-    High-level API call to generate a message with Anthropic Claude.
+def setup_knowledge_base(
+    product_catalog: str = None, model_name: str = "gpt-3.5-turbo"
+):
     """
-    bedrock_runtime = boto3.client(
-        service_name="bedrock-runtime", region_name=os.environ.get("AWS_REGION_NAME")
-    )
+    We assume that the product catalog is simply a text string.
 
-    body = json.dumps(
-        {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": max_tokens,
-            "system": system_prompt,
-            "messages": messages,
-        }
-    )
+    The catalog is embedded only if the prewarm artifact has no current index for it.
+    """
+    from langchain_community.vectorstores import Chroma
+    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+    artifact = get_prewarm_artifact()
+    prebuilt = artifact.knowledge_base_dir(product_catalog) if artifact else None
+    if prebuilt is not None:
+        docsearch = Chroma(
+            collection_name=KNOWLEDGE_BASE_COLLECTION,
+            embedding_function=OpenAIEmbeddings(model=KNOWLEDGE_BASE_EMBEDDINGS_MODEL),
+            persist_directory=prebuilt,
+        )
+    else:
+        docsearch = build_knowledge_base_index(product_catalog)
 
-    response = bedrock_runtime.invoke_model(body=body, modelId=model_id)
-    response_body = json.loads(response.get("body").read())
+    llm = ChatOpenAI(model_name="gpt-4-0125-preview", temperature=0)
 
-    return response_body
+    knowledge_base = RetrievalQA.from_chain_type(
+        llm=llm, chain_type="stuff", retriever=docsearch.as_retriever()
+    )
+    return knowledge_base
 
 
-def get_product_id_from_query(query, product_price_id_mapping_path):
+def _product_id_prompt(query, product_price_id_mapping_path):
     # Load product_price_id_mapping from a JSON file
     with open(product_price_id_mapping_path, "r") as f:
         product_price_id_mapping = json.load(f)
@@ -101,151 +154,349 @@ def get_product_id_from_query(query, product_price_id_mapping_path):
     Return a valid directly parsable json, dont return in it within a code snippet or add any kind of explanation!!
     """
     prompt += "{"
+    return prompt
+
+
+def get_product_id_from_query(query, product_price_id_mapping_path):
+    prompt = _product_id_prompt(query, product_price_id_mapping_path)
     model_name = os.getenv("GPT_MODEL", "gpt-3.5-turbo-1106")
 
     if "anthropic" in model_name:
-        response = completion_bedrock(
-            model_id=model_name,
-            system_prompt="You are a helpful assistant.",
-            messages=[{"content": prompt, "role": "user"}],
-            max_tokens=1000,
-        )
+        with track_llm_call(model_name, "product_id") as call:
+            response = completion_bedrock(
+                model_id=model_name,
+                system_prompt="You are a helpful assistant.",
+                messages=[{"content": prompt, "role": "user"}],
+                max_tokens=1000,
+            )
+            call.set_usage(response.get("usage"))
 
         product_id = response["content"][0]["text"]
 
     else:
-        response = completion(
-            model=model_name,
-            messages=[{"content": prompt, "role": "user"}],
-            max_tokens=1000,
-            temperature=0,
-        )
+        with track_llm_call(model_name, "product_id") as call:
+            response = completion(
+                model=model_name,
+                messages=[{"content": prompt, "role": "user"}],
+                max_tokens=1000,
+                temperature=0,
+            )
+            call.set_usage(response.get("usage"))
         product_id = response.choices[0].message.content.strip()
     return product_id
 
 
-def generate_stripe_payment_link(query: str) -> str:
-    """Generate a stripe payment link for a customer based on a single query string."""
+async def aget_product_id_from_query(query, product_price_id_mapping_path):
+    """Async variant of `get_product_id_from_query`."""
+    prompt = _product_id_prompt(query, product_price_id_mapping_path)
+    model_name = os.getenv("GPT_MODEL", "gpt-3.5-turbo-1106")
+
+    if "anthropic" in model_name:
+        with track_llm_call(model_name, "product_id") as call:
+            response = await acompletion_bedrock(
+                model_id=model_name,
+                system_prompt="You are a helpful assistant.",
+                messages=[{"content": prompt, "role": "user"}],
+                max_tokens=1000,
+            )
+            call.set_usage(response.get("usage"))
+
+        product_id = response["content"][0]["text"]
 
+    else:
+        with track_llm_call(model_name, "product_id") as call:
+            response = await acompletion(
+                model=model_name,
+                messages=[{"content": prompt, "role": "user"}],
+                max_tokens=1000,
+                temperature=0,
+            )
+            call.set_usage(response.get("usage"))
+        product_id = response.choices[0].message.content.strip()
+    return product_id
+
+
+def _stripe_payment_request(query: str, price_id: str):
+    """Builds the payment gateway URL and request body for a price id returned by the LLM."""
     # example testing payment gateway url
     PAYMENT_GATEWAY_URL = os.getenv(
         "PAYMENT_GATEWAY_URL", "https://agent-payments-gateway.vercel.app/payment"
     )
+    price_id = json.loads(price_id)
+    payload = json.dumps(
+        {"prompt": query, **price_id, "stripe_key": os.getenv("STRIPE_API_KEY")}
+    )
+    return PAYMENT_GATEWAY_URL, payload
+
+
+def generate_stripe_payment_link(query: str) -> str:
+    """Generate a stripe payment link for a customer based on a single query string."""
     PRODUCT_PRICE_MAPPING = os.getenv(
         "PRODUCT_PRICE_MAPPING", "example_product_price_id_mapping.json"
     )
 
     # use LLM to get the price_id from query
     price_id = get_product_id_from_query(query, PRODUCT_PRICE_MAPPING)
-    price_id = json.loads(price_id)
-    payload = json.dumps(
-        {"prompt": query, **price_id, "stripe_key": os.getenv("STRIPE_API_KEY")}
-    )
+    url, payload = _stripe_payment_request(query, price_id)
     headers = {
         "Content-Type": "application/json",
     }
 
-    response = requests.request(
-        "POST", PAYMENT_GATEWAY_URL, headers=headers, data=payload
+    try:
+        response = get_http_client().request(
+            "GeneratePaymentLink", "POST", url, headers=headers, content=payload
+        )
+    except (ToolUnavailableError, httpx.HTTPError):
+        return tool_unavailable_message("GeneratePaymentLink")
+    return response.text
+
+
+async def agenerate_stripe_payment_link(query: str) -> str:
+    """Async variant of `generate_stripe_payment_link`."""
+    PRODUCT_PRICE_MAPPING = os.getenv(
+        "PRODUCT_PRICE_MAPPING", "example_product_price_id_mapping.json"
     )
+
+    price_id = await aget_product_id_from_query(query, PRODUCT_PRICE_MAPPING)
+    url, payload = _stripe_payment_request(query, price_id)
+    headers = {
+        "Content-Type": "application/json",
+    }
+
+    try:
+        response = await get_http_client().arequest(
+            "GeneratePaymentLink", "POST", url, headers=headers, content=payload
+        )
+    except (ToolUnavailableError, httpx.HTTPError):
+        return tool_unavailable_message("GeneratePaymentLink")
     return response.text
 
+EMAIL_ADDRESS_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+EMAIL_SUBJECT_PATTERN = re.compile(
+    r"""(?:subject(?:\s+line)?|titled|entitled)\s*(?:is|of|:|=)?\s*(?P<quote>["'“‘])(?P<subject>.+?)["'”’]""",
+    re.IGNORECASE,
+)
+
+
+def extract_email_fields(query):
+    """
+    Pulls the recipient address and an explicitly quoted subject out of the query without an LLM call.
+
+    Returns:
+        tuple: (recipient, subject), either of which may be None when not present in the query.
+    """
+    recipient_match = EMAIL_ADDRESS_PATTERN.search(query)
+    recipient = recipient_match.group(0).rstrip(".") if recipient_match else None
+    subject_match = EMAIL_SUBJECT_PATTERN.search(query)
+    subject = subject_match.group("subject").strip() if subject_match else None
+    return recipient, subject
+
+
+def _email_draft_schema(include_subject):
+    properties = {"body": {"type": "string", "description": "Plain text body of the email."}}
+    if include_subject:
+        properties["subject"] = {"type": "string", "description": "Short subject line."}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _email_draft_messages(query, subject):
+    instructions = (
+        "Draft the email requested below. Write only the plain text body"
+        + ("" if subject else " and a short subject line")
+        + ". Do not invent facts that are not in the request."
+    )
+    if subject:
+        instructions += f'\nThe subject line is already set to: "{subject}".'
+    return [{"role": "user", "content": f"{instructions}\n\nRequest: {query}"}]
+
+
+def _email_draft_tool(schema):
+    return {
+        "type": "function",
+        "function": {
+            "name": "draft_email",
+            "description": "Return the drafted email.",
+            "parameters": schema,
+        },
+    }
+
+
+def _email_draft_bedrock_prompt(messages, schema):
+    return (
+        messages[0]["content"]
+        + "\n\nRespond with a single JSON object matching this JSON schema and nothing else:\n"
+        + json.dumps(schema)
+    )
+
+
+def _parse_email_draft(arguments, schema):
+    draft = json.loads(arguments)
+    missing = [key for key in schema["required"] if not isinstance(draft.get(key), str)]
+    if missing:
+        raise ValueError(f"Email draft is missing fields: {missing}")
+    return draft
+
+
+def _email_details(recipient, subject, draft):
+    return {
+        "recipient": recipient,
+        "subject": subject or draft["subject"],
+        "body": draft["body"],
+    }
+
+
 def get_mail_body_subject_from_query(query):
-    prompt = f"""
-    Given the query: "{query}", analyze the content and extract the necessary information to send an email. The information needed includes the recipient's email address, the subject of the email, and the body content of the email. 
-    Based on the analysis, return a dictionary in Python format where the keys are 'recipient', 'subject', and 'body', and the values are the corresponding pieces of information extracted from the query. 
-    For example, if the query was about sending an email to notify someone of an upcoming event, the output should look like this:
-    {{
-        "recipient": "example@example.com",
-        "subject": "Upcoming Event Notification",
-        "body": "Dear [Name], we would like to remind you of the upcoming event happening next week. We look forward to seeing you there."
-    }}
-    Now, based on the provided query, return the structured information as described.
-    Return a valid directly parsable json, dont return in it within a code snippet or add any kind of explanation!!
     """
+    Builds the email details for the query.
+
+    The recipient and any explicit subject are extracted locally; the LLM is only asked
+    to draft what is missing, constrained to a strict schema via function calling.
+
+    Returns:
+        dict: Keys 'recipient', 'subject' and 'body'.
+    """
+    recipient, subject = extract_email_fields(query)
+    if recipient is None:
+        raise ValueError("No recipient email address found in the request.")
+
+    schema = _email_draft_schema(include_subject=subject is None)
+    messages = _email_draft_messages(query, subject)
     model_name = os.getenv("GPT_MODEL", "gpt-3.5-turbo-1106")
 
     if "anthropic" in model_name:
-        response = completion_bedrock(
-            model_id=model_name,
-            system_prompt="You are a helpful assistant.",
-            messages=[{"content": prompt, "role": "user"}],
-            max_tokens=1000,
-        )
+        with track_llm_call(model_name, "email_draft") as call:
+            response = completion_bedrock(
+                model_id=model_name,
+                system_prompt="You are a helpful assistant that only answers in JSON.",
+                messages=[
+                    {"role": "user", "content": _email_draft_bedrock_prompt(messages, schema)},
+                    {"role": "assistant", "content": "{"},
+                ],
+                max_tokens=1000,
+            )
+            call.set_usage(response.get("usage"))
+        arguments = "{" + response["content"][0]["text"]
 
-        mail_body_subject = response["content"][0]["text"]
+    else:
+        with track_llm_call(model_name, "email_draft") as call:
+            response = completion(
+                model=model_name,
+                messages=messages,
+                tools=[_email_draft_tool(schema)],
+                tool_choice={"type": "function", "function": {"name": "draft_email"}},
+                max_tokens=1000,
+                temperature=0.2,
+            )
+            call.set_usage(response.get("usage"))
+        arguments = response.choices[0].message.tool_calls[0].function.arguments
+    return _email_details(recipient, subject, _parse_email_draft(arguments, schema))
+
+
+async def aget_mail_body_subject_from_query(query):
+    """Async variant of `get_mail_body_subject_from_query` using the async model clients."""
+    recipient, subject = extract_email_fields(query)
+    if recipient is None:
+        raise ValueError("No recipient email address found in the request.")
+
+    schema = _email_draft_schema(include_subject=subject is None)
+    messages = _email_draft_messages(query, subject)
+    model_name = os.getenv("GPT_MODEL", "gpt-3.5-turbo-1106")
+
+    if "anthropic" in model_name:
+        with track_llm_call(model_name, "email_draft") as call:
+            response = await acompletion_bedrock(
+                model_id=model_name,
+                system_prompt="You are a helpful assistant that only answers in JSON.",
+                messages=[
+                    {"role": "user", "content": _email_draft_bedrock_prompt(messages, schema)},
+                    {"role": "assistant", "content": "{"},
+                ],
+                max_tokens=1000,
+            )
+            call.set_usage(response.get("usage"))
+        arguments = "{" + response["content"][0]["text"]
 
     else:
-        response = completion(
-            model=model_name,
-            messages=[{"content": prompt, "role": "user"}],
-            max_tokens=1000,
-            temperature=0.2,
+        with track_llm_call(model_name, "email_draft") as call:
+            response = await acompletion(
+                model=model_name,
+                messages=messages,
+                tools=[_email_draft_tool(schema)],
+                tool_choice={"type": "function", "function": {"name": "draft_email"}},
+                max_tokens=1000,
+                temperature=0.2,
+            )
+            call.set_usage(response.get("usage"))
+        arguments = response.choices[0].message.tool_calls[0].function.arguments
+    return _email_details(recipient, subject, _parse_email_draft(arguments, schema))
+
+def _enqueue_email(email_details):
+    if isinstance(email_details, str):
+        email_details = json.loads(email_details)  # Ensure it's a dictionary
+    try:
+        get_email_outbox().enqueue(
+            email_details["recipient"], email_details["subject"], email_details["body"]
         )
-        mail_body_subject = response.choices[0].message.content.strip()
-    print(mail_body_subject)
-    return mail_body_subject
+    except Exception as e:
+        return f"Email was not sent successfully, error: {e}"
+    return f"Email to {email_details['recipient']} queued for delivery."
+
 
-def send_email_with_gmail(email_details):
-    '''.env should include GMAIL_MAIL and GMAIL_APP_PASSWORD to work correctly'''
+def send_email_tool(query):
+    '''Queues an email based on the single query string for background delivery'''
     try:
-        sender_email = os.getenv("GMAIL_MAIL")
-        app_password = os.getenv("GMAIL_APP_PASSWORD")
-        recipient_email = email_details["recipient"]
-        subject = email_details["subject"]
-        body = email_details["body"]
-        # Create MIME message
-        msg = MIMEMultipart()
-        msg['From'] = sender_email
-        msg['To'] = recipient_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Create server object with SSL option
-        server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-        server.login(sender_email, app_password)
-        text = msg.as_string()
-        server.sendmail(sender_email, recipient_email, text)
-        server.quit()
-        return "Email sent successfully."
+        email_details = get_mail_body_subject_from_query(query)
     except Exception as e:
         return f"Email was not sent successfully, error: {e}"
+    return _enqueue_email(email_details)
 
-def send_email_tool(query):
-    '''Sends an email based on the single query string'''
-    email_details = get_mail_body_subject_from_query(query)
-    if isinstance(email_details, str):
-        email_details = json.loads(email_details)  # Ensure it's a dictionary
-    print("EMAIL DETAILS")
-    print(email_details)
-    result = send_email_with_gmail(email_details)
-    return result
+
+async def asend_email_tool(query):
+    '''Async variant of `send_email_tool`'''
+    try:
+        email_details = await aget_mail_body_subject_from_query(query)
+    except Exception as e:
+        return f"Email was not sent successfully, error: {e}"
+    return _enqueue_email(email_details)
 
 
 def generate_calendly_invitation_link(query):
     '''Generate a calendly invitation link based on the single query string'''
-    event_type_uuid = os.getenv("CALENDLY_EVENT_UUID")
-    api_key = os.getenv('CALENDLY_API_KEY')
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json'
-    }
-    url = 'https://api.calendly.com/scheduling_links'
-    payload = {
-    "max_event_count": 1,
-    "owner": f"https://api.calendly.com/event_types/{event_type_uuid}",
-    "owner_type": "EventType"
-    }
-    
-    
-    response = requests.post(url, json=payload, headers=headers)
-    if response.status_code == 201:
-        data = response.json()
-        return f"url: {data['resource']['booking_url']}"
-    else:
-        return "Failed to create Calendly link: "
-
-def get_tools(product_catalog):
+    client = get_calendly_client()
+    try:
+        event_type_uuid = client.default_event_type_uuid()
+        booking_url = get_scheduling_link_pool().take(event_type_uuid)
+        if booking_url is None:
+            # Pool is empty or not warmed up yet: fall back to a live call.
+            booking_url = client.create_scheduling_link(event_type_uuid)
+    except (ToolUnavailableError, httpx.HTTPError):
+        return tool_unavailable_message("SendCalendlyInvitation")
+    except CalendlyError as e:
+        return str(e)
+    return f"url: {booking_url}"
+
+
+async def agenerate_calendly_invitation_link(query):
+    '''Async variant of `generate_calendly_invitation_link`'''
+    client = get_calendly_client()
+    try:
+        event_type_uuid = await client.adefault_event_type_uuid()
+        booking_url = get_scheduling_link_pool().take(event_type_uuid)
+        if booking_url is None:
+            booking_url = await client.acreate_scheduling_link(event_type_uuid)
+    except (ToolUnavailableError, httpx.HTTPError):
+        return tool_unavailable_message("SendCalendlyInvitation")
+    except CalendlyError as e:
+        return str(e)
+    return f"url: {booking_url}"
+
+
+def get_tools(product_catalog, tool_cache: Optional[ToolResultCache] = None):
     # query to get_tools can be used to be embedded and relevant tools found
     # see here: https://langchain-langchain.vercel.app/docs/use_cases/agents/custom_agent_with_plugin_retrieval#tool-retriever
 
@@ -255,24 +506,36 @@ def get_tools(product_catalog):
         Tool(
             name="ProductSearch",
             func=knowledge_base.run,
+            coroutine=knowledge_base.arun,
             description="useful for when you need to answer questions about product information or services offered, availability and their costs.",
         ),
         Tool(
             name="GeneratePaymentLink",
             func=generate_stripe_payment_link,
+            coroutine=agenerate_stripe_payment_link,
             description="useful to close a transaction with a customer. You need to include product name and quantity and customer name in the query input.",
         ),
         Tool(
             name="SendEmail",
             func=send_email_tool,
-            description="Sends an email based on the query input. The query should specify the recipient, subject, and body of the email.",
+            coroutine=asend_email_tool,
+            # Sending is a side effect: never serve a repeated request from cache.
+            metadata={"memoize": False},
+            description="Sends an email based on the query input. The query must include the recipient's email address and should specify the subject and what the email should say.",
         ),
         Tool(
             name="SendCalendlyInvitation",
             func=generate_calendly_invitation_link,
+            coroutine=agenerate_calendly_invitation_link,
+            # Booking links are single use: a cached one must never be handed out twice.
+            metadata={"memoize": False},
             description='''Useful for when you need to create invite for a personal meeting in Sleep Heaven shop. 
             Sends a calendly invitation based on the query input.''',
         )
     ]
 
+    # Traced inside the cache, so tool spans and latency cover real calls only.
+    tools = [trace_tool(tool, is_failure=is_failed_observation) for tool in tools]
+    if tool_cache is not None:
+        tools = tool_cache.wrap_all(tools)
     return tools
@@ -0,0 +1,480 @@
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tools import Tool
+
+from salesgpt.context import current_session_id
+
+logger = logging.getLogger(__name__)
+
+# Attributes a span copies from its parent, so LLM and tool spans carry the turn's ids.
+INHERITED_ATTRIBUTES = ("session.id", "agent.id")
+
+EXPORT_FORMATS = ("jsonl", "otlp")
+
+
+class Span:
+    """
+    One timed operation. Spans started while another span is current become its
+    children and share its trace id.
+    """
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "error",
+    )
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes: Dict[str, Any] = {}
+        if parent:
+            for key in INHERITED_ATTRIBUTES:
+                if key in parent.attributes:
+                    self.attributes[key] = parent.attributes[key]
+        session_id = current_session_id.get()
+        if session_id is not None:
+            self.attributes["session.id"] = session_id
+        self.attributes.update(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds the span ran for, or None while it is open."""
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns is not None else None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        logger.debug("Span %s took %.4fs", self.name, self.duration)
+        exporter = _exporter
+        if exporter is not None:
+            exporter.export(self)
+        for listener in _span_listeners:
+            try:
+                listener(self)
+            except Exception:
+                logger.exception("Span listener %r failed", listener)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_s": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+_span_listeners: List[Callable[[Span], None]] = []
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """Calls `listener` with every finished span, on the thread that ended it."""
+    if listener not in _span_listeners:
+        _span_listeners.append(listener)
+
+
+def remove_span_listener(listener: Callable[[Span], None]) -> None:
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("salesgpt_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Span:
+    """
+    Starts a child of the current span without making it current. The caller must
+    call `end`; use this for operations whose start and end are separate callbacks.
+    """
+    return Span(name, _current_span.get(), attributes or {})
+
+
+@contextmanager
+def span(name: str, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Span]:
+    """Runs the block inside a new span, which is current for the block's duration."""
+    new_span = start_span(name, attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.record_error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        new_span.end()
+
+
+def traced(
+    name: Optional[str] = None,
+    attributes: Optional[Callable[..., Dict[str, Any]]] = None,
+) -> Callable[[Callable], Callable]:
+    """
+    Decorator that runs every call of the function in a span.
+
+    Coroutine functions are timed until they return, not until the coroutine is
+    created. For generator and async generator functions the span covers the whole
+    iteration and is current only while the generator body runs, so spans opened
+    by the consumer between items are not parented to it.
+
+    Args:
+        name (str, optional): Span name. Defaults to the function's qualified name.
+        attributes (Callable, optional): Called with the function's arguments and
+            returns extra span attributes.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        def open_span(args, kwargs) -> Span:
+            return start_span(span_name, attributes(*args, **kwargs) if attributes else None)
+
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def async_gen_wrapper(*args, **kwargs):
+                new_span = open_span(args, kwargs)
+                agen = func(*args, **kwargs)
+                try:
+                    while True:
+                        token = _current_span.set(new_span)
+                        try:
+                            item = await agen.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            _current_span.reset(token)
+                        yield item
+                except BaseException as e:
+                    if not isinstance(e, GeneratorExit):
+                        new_span.record_error(e)
+                    raise
+                finally:
+                    await agen.aclose()
+                    new_span.end()
+
+            return async_gen_wrapper
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def gen_wrapper(*args, **kwargs):
+                new_span = open_span(args, kwargs)
+                gen = func(*args, **kwargs)
+                try:
+                    while True:
+                        token = _current_span.set(new_span)
+                        try:
+                            item = next(gen)
+                        except StopIteration as stop:
+                            return stop.value
+                        finally:
+                            _current_span.reset(token)
+                        yield item
+                except BaseException as e:
+                    if not isinstance(e, GeneratorExit):
+                        new_span.record_error(e)
+                    raise
+                finally:
+                    gen.close()
+                    new_span.end()
+
+            return gen_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, attributes(*args, **kwargs) if attributes else None):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, attributes(*args, **kwargs) if attributes else None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def trace_tool(tool: Tool, is_failure: Optional[Callable[[Any], bool]] = None) -> Tool:
+    """
+    Returns a copy of `tool` whose sync and async entry points run in a `tool` span.
+
+    Args:
+        tool (Tool): The tool to trace.
+        is_failure (Callable, optional): Recognizes observations that report a failure
+            instead of raising; their spans get `tool.failed` set.
+    """
+    tool_attributes = lambda *args, **kwargs: {"tool.name": tool.name}  # noqa: E731
+    func, coroutine = tool.func, tool.coroutine
+
+    def mark(observation: Any) -> Any:
+        tool_span = current_span()
+        if is_failure is not None and tool_span is not None and is_failure(observation):
+            tool_span.set_attribute("tool.failed", True)
+        return observation
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        return mark(func(*args, **kwargs))
+
+    async def arun(*args, **kwargs):
+        return mark(await coroutine(*args, **kwargs))
+
+    return Tool(
+        name=tool.name,
+        description=tool.description,
+        func=traced("tool", tool_attributes)(run),
+        coroutine=traced("tool", tool_attributes)(arun) if coroutine else None,
+        args_schema=tool.args_schema,
+        return_direct=tool.return_direct,
+        metadata=tool.metadata,
+        tags=tool.tags,
+    )
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Opens an `llm` span, a child of the current span, for every LangChain model call."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or ""
+        with self._lock:
+            self._spans[run_id] = start_span("llm", {"llm.model": model})
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.end()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.record_error(error)
+            llm_span.end()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": _otlp_attributes(span.attributes),
+        "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    return otlp
+
+
+class FileSpanExporter:
+    """
+    Appends finished spans to a local file from a background thread, so ending a
+    span only costs a queue put.
+
+    With format "jsonl" every line is one span. With format "otlp" every line is an
+    OTLP/JSON ExportTraceServiceRequest, the layout the OpenTelemetry Collector's
+    file exporter writes and its otlpjsonfile receiver reads.
+
+    Args:
+        path (str): File to append to.
+        format (str): "jsonl" or "otlp".
+        service_name (str): `service.name` resource attribute for OTLP output.
+        flush_interval (float): Seconds the writer waits to batch spans.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str = "jsonl",
+        service_name: str = "salesgpt",
+        flush_interval: float = 1.0,
+    ):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown trace export format {format!r}, expected one of {EXPORT_FORMATS}")
+        self.path = path
+        self.format = format
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._closed = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(
+            target=self._run, name="salesgpt-span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        if not self._closed:
+            self._queue.put(span)
+
+    def _lines(self, spans: List[Span]) -> List[str]:
+        if self.format == "jsonl":
+            return [json.dumps(span.to_dict(), default=str) for span in spans]
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [_otlp_span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        return [json.dumps(request, default=str)]
+
+    def _write(self, spans: List[Span]) -> None:
+        if not spans:
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(self._lines(spans)) + "\n")
+        except OSError:
+            logger.exception("Failed to export %d spans to %s", len(spans), self.path)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            batch = []
+            stop = first is None
+            if not stop:
+                batch.append(first)
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+            self._write(batch)
+            if stop:
+                return
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Writes the spans still queued and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_exporter: Optional[FileSpanExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def set_span_exporter(exporter: Optional[FileSpanExporter]) -> Optional[FileSpanExporter]:
+    """Installs `exporter` for all finished spans and returns the one it replaced."""
+    global _exporter
+    with _exporter_lock:
+        previous, _exporter = _exporter, exporter
+    return previous
+
+
+def get_span_exporter() -> Optional[FileSpanExporter]:
+    return _exporter
+
+
+def configure_tracing_from_env() -> Optional[FileSpanExporter]:
+    """
+    Installs a file exporter as configured by TRACING_EXPORTER ("off", "jsonl" or
+    "otlp") and TRACING_PATH. Spans are still timed, and logged at debug level,
+    when export is off.
+    """
+    export_format = os.getenv("TRACING_EXPORTER", "off").lower()
+    if export_format == "off":
+        return None
+    exporter = FileSpanExporter(
+        os.getenv("TRACING_PATH", f"traces.{export_format}.jsonl"),
+        format=export_format,
+        service_name=os.getenv("TRACING_SERVICE_NAME", "salesgpt"),
+    )
+    previous = set_span_exporter(exporter)
+    if previous is not None:
+        previous.shutdown()
+    atexit.register(exporter.shutdown)
+    return exporter
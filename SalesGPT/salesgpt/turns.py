@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+# Stdlib only, like salesgpt.sessions, so the standalone app/ server can use it too.
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SessionBusyError(Exception):
+    """Raised when a session already has as many turns waiting as it may queue."""
+
+    def __init__(self, session_id: str, max_pending: int):
+        super().__init__(f"Session {session_id} already has {max_pending} turns pending")
+        self.session_id = session_id
+        self.max_pending = max_pending
+
+
+class _Lane:
+    __slots__ = ("lock", "pending", "inflight")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+        self.inflight: Dict[str, "_SharedTurn"] = {}
+
+
+class _SharedTurn:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        # Requests still waiting for the result; the turn is cancelled when none are left.
+        self.waiters = 0
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """A key identifying identical requests, e.g. a retried POST with the same message."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+class TurnSerializer:
+    """
+    Runs the turns of each session one at a time, in arrival order.
+
+    A session's agent and history are mutated by every turn, so two concurrent requests
+    for it would interleave. Each session gets an asyncio lock and at most `max_pending`
+    turns may run or wait on it; more are refused with `SessionBusyError`. A request
+    whose fingerprint matches a turn already running or queued for the same session
+    waits for that turn's result instead of generating a second reply.
+
+    Args:
+        max_pending (int): Turns a session may have running or queued.
+        metrics (AppMetrics, optional): Receives coalesced and rejected counts.
+    """
+
+    def __init__(self, max_pending: int = 4, metrics: Any = None):
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self._lanes: Dict[str, _Lane] = {}
+        self.coalesced = 0
+        self.rejected = 0
+
+    def _lane(self, session_id: str) -> _Lane:
+        lane = self._lanes.get(session_id)
+        if lane is None:
+            lane = self._lanes[session_id] = _Lane()
+        return lane
+
+    def _release(self, session_id: str, lane: _Lane) -> None:
+        lane.pending -= 1
+        if lane.pending == 0 and not lane.inflight:
+            self._lanes.pop(session_id, None)
+
+    def check(self, session_id: str) -> None:
+        """
+        Raises `SessionBusyError` now if a turn for the session would be refused.
+
+        Lets a caller that can only start its turn later, e.g. inside a streamed
+        response, answer with an error status while it still can.
+        """
+        lane = self._lanes.get(session_id)
+        if lane is not None and lane.pending >= self.max_pending:
+            self._reject(session_id)
+
+    def _reject(self, session_id: str) -> None:
+        self.rejected += 1
+        if self.metrics is not None:
+            self.metrics.turns_rejected.inc()
+        raise SessionBusyError(session_id, self.max_pending)
+
+    def _admit(self, session_id: str, lane: _Lane) -> None:
+        if lane.pending >= self.max_pending:
+            self._reject(session_id)
+        lane.pending += 1
+
+    @asynccontextmanager
+    async def turn(self, session_id: str) -> AsyncIterator[None]:
+        """
+        Holds the session's turn for the duration of the block.
+
+        For turns whose result cannot be shared, such as a streamed reply.
+
+        Raises:
+            SessionBusyError: If the session's queue is full.
+        """
+        lane = self._lane(session_id)
+        self._admit(session_id, lane)
+        try:
+            async with lane.lock:
+                yield
+        finally:
+            self._release(session_id, lane)
+
+    async def run(
+        self,
+        session_id: str,
+        turn: Callable[[], Awaitable[T]],
+        fingerprint: Optional[str] = None,
+    ) -> T:
+        """
+        Runs `turn` once every earlier turn of the session has finished.
+
+        Args:
+            session_id (str): The session the turn belongs to.
+            turn (Callable): Produces the turn's coroutine; only called if the turn runs.
+            fingerprint (str, optional): Identifies duplicate requests to coalesce.
+
+        The turn is cancelled once every request waiting for it has been cancelled.
+
+        Returns:
+            The turn's result, or the result of the identical turn already in flight.
+
+        Raises:
+            SessionBusyError: If the session's queue is full.
+        """
+        lane = self._lane(session_id)
+        shared = lane.inflight.get(fingerprint) if fingerprint is not None else None
+        if shared is not None:
+            self.coalesced += 1
+            if self.metrics is not None:
+                self.metrics.turns_coalesced.inc()
+            logger.info("Coalescing duplicate request for session %s", session_id)
+        else:
+            self._admit(session_id, lane)
+            shared = _SharedTurn(
+                asyncio.ensure_future(self._execute(session_id, lane, turn, fingerprint))
+            )
+            if fingerprint is not None:
+                lane.inflight[fingerprint] = shared
+        shared.waiters += 1
+        try:
+            # Shielded so one request giving up (its client left, its deadline passed)
+            # does not cancel a turn another request is still waiting for.
+            return await asyncio.shield(shared.task)
+        finally:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.task.done():
+                shared.task.cancel()
+
+    async def _execute(
+        self,
+        session_id: str,
+        lane: _Lane,
+        turn: Callable[[], Awaitable[T]],
+        fingerprint: Optional[str],
+    ) -> T:
+        try:
+            async with lane.lock:
+                return await turn()
+        finally:
+            shared = lane.inflight.get(fingerprint) if fingerprint is not None else None
+            if shared is not None and shared.task is asyncio.current_task():
+                del lane.inflight[fingerprint]
+            self._release(session_id, lane)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active_sessions": len(self._lanes),
+            "pending": sum(lane.pending for lane in self._lanes.values()),
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
+
+def turn_serializer_settings() -> Dict[str, Any]:
+    """TurnSerializer keyword arguments from SESSION_MAX_PENDING_TURNS."""
+    return {"max_pending": int(os.getenv("SESSION_MAX_PENDING_TURNS", "4"))}
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+Emit = Callable[[Dict[str, Any]], None]
+TurnRunner = Callable[[Optional[str], Emit], Awaitable[None]]
+
+
+class SlowConsumerError(Exception):
+    """Raised when a client reads so slowly that its backlog exceeds the buffer budget."""
+
+
+class OutboundStream:
+    """
+    Buffers server-to-client messages so producers never wait on the socket.
+
+    A turn emits deltas as fast as the LLM produces them and returns, releasing its
+    admission slot; a separate sender drains the buffer at the client's pace. Deltas
+    of one turn that pile up behind a slow client are merged into a single message,
+    and a client whose backlog still grows past `max_buffered_chars` is disconnected.
+
+    Args:
+        max_buffered_chars (int): Text a client may have waiting before it is dropped.
+    """
+
+    def __init__(self, max_buffered_chars: int = 256 * 1024):
+        self.max_buffered_chars = max_buffered_chars
+        self.buffered_chars = 0
+        self.sequence = 0
+        self._messages: Deque[Dict[str, Any]] = deque()
+        self._ready = asyncio.Event()
+        self._closed = False
+
+    @staticmethod
+    def _size(message: Dict[str, Any]) -> int:
+        return len(message.get("text") or "") + 64
+
+    def put(self, message: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        last = self._messages[-1] if self._messages else None
+        if (
+            message.get("type") == "delta"
+            and last is not None
+            and last.get("type") == "delta"
+            and last.get("turn") == message.get("turn")
+        ):
+            last["text"] += message["text"]
+            self.buffered_chars += len(message["text"])
+        else:
+            self.sequence += 1
+            message = dict(message, seq=self.sequence)
+            self._messages.append(message)
+            self.buffered_chars += self._size(message)
+        if self.buffered_chars > self.max_buffered_chars:
+            self.close()
+            raise SlowConsumerError(f"{self.buffered_chars} characters waiting for the client")
+        self._ready.set()
+
+    async def get(self) -> Optional[Dict[str, Any]]:
+        """The next message, or None once the stream is closed and drained."""
+        while not self._messages:
+            if self._closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        message = self._messages.popleft()
+        self.buffered_chars -= self._size(message)
+        return message
+
+    def close(self) -> None:
+        self._closed = True
+        self._ready.set()
+
+
+def _consume_result(task: "asyncio.Task") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug("WebSocket task ended with %r", task.exception())
+
+
+class ChatSocket:
+    """
+    One chat session bound to one WebSocket for the connection's lifetime.
+
+    Client messages are JSON objects: {"type": "user_turn", "text": ...} starts a
+    turn and {"type": "ping"} is answered with a pong. The server sends "session" on
+    connect, then per turn "turn_start" (with "initiator" "user" or "agent"),
+    "delta" pieces of the reply, "stage" and "turn_end"; failures arrive as "error"
+    with a "code". Every server message carries an increasing "seq".
+
+    Turns run one at a time in arrival order. The agent speaks first on connect
+    when `greet` is set, and again after `idle_followup` seconds of client silence.
+
+    Args:
+        websocket (WebSocket): The accepted connection.
+        session_id (str): The session bound to the connection.
+        run_turn (Callable): Runs one turn given the user text (None for agent turns)
+            and an emit callback for its events, including its own "error" events.
+        greet (bool): Start with an agent turn.
+        idle_followup (float): Seconds of silence before an agent follow-up; 0 disables.
+        max_buffered_chars (int): See `OutboundStream`.
+        max_queued_turns (int): User turns a client may have waiting; more are refused
+            with a "busy" error instead of queueing LLM work without limit.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        run_turn: TurnRunner,
+        greet: bool = False,
+        idle_followup: float = 0.0,
+        max_buffered_chars: int = 256 * 1024,
+        max_queued_turns: int = 4,
+    ):
+        self.websocket = websocket
+        self.session_id = session_id
+        self.run_turn = run_turn
+        self.greet = greet
+        self.idle_followup = idle_followup
+        self.outbound = OutboundStream(max_buffered_chars)
+        self._turns: "asyncio.Queue[Optional[str]]" = asyncio.Queue(max_queued_turns)
+        self._turn_count = 0
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.outbound.put(message)
+
+    async def _sender(self) -> None:
+        while True:
+            message = await self.outbound.get()
+            if message is None:
+                return
+            await self.websocket.send_json(message)
+
+    async def _take_turn(self, human_input: Optional[str]) -> None:
+        self._turn_count += 1
+        turn = self._turn_count
+        initiator = "user" if human_input is not None else "agent"
+        self.send({"type": "turn_start", "turn": turn, "initiator": initiator})
+
+        def emit(event: Dict[str, Any]) -> None:
+            event = dict(event, turn=turn)
+            if event["type"] == "end":
+                event["type"] = "turn_end"
+            self.send(event)
+
+        try:
+            await self.run_turn(human_input, emit)
+        except SlowConsumerError:
+            raise
+        except Exception:
+            logger.exception("WebSocket turn failed for session %s", self.session_id)
+            self.send({"type": "error", "turn": turn, "code": "turn_failed"})
+
+    async def _turn_worker(self) -> None:
+        followed_up = False
+        while True:
+            # One follow-up per silence: after it, wait for the client however long it takes.
+            timeout = self.idle_followup if self.idle_followup > 0 and not followed_up else None
+            try:
+                human_input = await asyncio.wait_for(self._turns.get(), timeout)
+            except asyncio.TimeoutError:
+                # The client went quiet: the agent takes the initiative.
+                human_input = None
+            followed_up = human_input is None
+            await self._take_turn(human_input)
+
+    async def _receiver(self) -> None:
+        while True:
+            try:
+                message = json.loads(await self.websocket.receive_text())
+            except ValueError:
+                message = None
+            kind = message.get("type") if isinstance(message, dict) else None
+            if kind == "user_turn" and isinstance(message.get("text"), str):
+                try:
+                    self._turns.put_nowait(message["text"])
+                except asyncio.QueueFull:
+                    self.send({"type": "error", "code": "busy"})
+            elif kind == "ping":
+                self.send({"type": "pong"})
+            else:
+                self.send({"type": "error", "code": "bad_message"})
+
+    async def serve(self) -> None:
+        """Runs the connection until the client leaves or falls too far behind."""
+        self.send({"type": "session", "session_id": self.session_id})
+        if self.greet:
+            self._turns.put_nowait(None)
+        tasks = [
+            asyncio.create_task(self._sender()),
+            asyncio.create_task(self._turn_worker()),
+            asyncio.create_task(self._receiver()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if isinstance(error, SlowConsumerError):
+                    logger.warning("Dropping slow WebSocket client of session %s", self.session_id)
+                    await self.websocket.close(code=1013)
+                elif error is not None and not isinstance(error, WebSocketDisconnect):
+                    raise error
+        finally:
+            # The client is gone or dropped: stop generating for it. The tasks unwind
+            # (releasing turn locks and admission slots) on their own; awaiting them here
+            # would only hold the handler open after the client left.
+            self.outbound.close()
+            for task in tasks:
+                task.cancel()
+                task.add_done_callback(_consume_result)
@@ -0,0 +1,158 @@
+from typing import Any, List
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from salesgpt.accounting import (
+    LLMCallRecord,
+    UsageAccountant,
+    UsageCallbackHandler,
+    aaccount_stream,
+    estimate_cost,
+    parse_usage,
+    track_llm_call,
+)
+from salesgpt.context import session_scope
+from salesgpt.models import _litellm_chunk
+
+
+class UsageChatModel(BaseChatModel):
+    model: str = "claude-3-haiku"
+
+    @property
+    def _llm_type(self) -> str:
+        return "usage-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any):
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content="Hi"))],
+            llm_output={
+                "model": self.model,
+                "token_usage": {"input_tokens": 1000, "output_tokens": 200},
+            },
+        )
+
+
+@pytest.fixture
+def accountant():
+    return UsageAccountant()
+
+
+def test_parse_usage_handles_openai_and_anthropic_shapes():
+    assert parse_usage(None) == (0, 0, 0)
+    assert parse_usage(
+        {
+            "prompt_tokens": 120,
+            "completion_tokens": 30,
+            "prompt_tokens_details": {"cached_tokens": 100},
+        }
+    ) == (120, 30, 100)
+    assert parse_usage(
+        {"input_tokens": 50, "output_tokens": 7, "cache_read_input_tokens": 40}
+    ) == (50, 7, 40)
+
+
+def test_estimate_cost_uses_known_pricing():
+    assert estimate_cost("anthropic.claude-3-haiku-20240307-v1:0", 1000, 200) == pytest.approx(
+        0.0005
+    )
+    assert estimate_cost("gpt-3.5-turbo", 1000, 0) > 0
+    assert estimate_cost("unknown-model", 1000, 200) is None
+
+
+def test_calls_roll_up_per_turn_and_session(accountant):
+    accountant.start_turn("s1")
+    accountant.record("s1", LLMCallRecord(model="a", prompt_tokens=10, completion_tokens=2, cost=0.1))
+    accountant.start_turn("s1")
+    accountant.record("s1", LLMCallRecord(model="a", prompt_tokens=5, completion_tokens=1, cost=0.2))
+    accountant.record("s1", LLMCallRecord(model="b", prompt_tokens=1, completion_tokens=1))
+
+    turn = accountant.turn_summary("s1")
+    assert turn["turn"] == 2
+    assert turn["calls"] == 2
+    assert not turn["cost_complete"]
+
+    session = accountant.session_summary("s1")
+    assert session["prompt_tokens"] == 16
+    assert session["cost_usd"] == pytest.approx(0.3)
+    assert session["by_model"]["a"]["calls"] == 2
+    assert [t["calls"] for t in session["turns"]] == [1, 2]
+    assert accountant.session_summary("unknown") is None
+
+
+def test_least_recent_sessions_are_evicted():
+    accountant = UsageAccountant(max_sessions=2)
+    for session_id in ("s1", "s2", "s3"):
+        accountant.start_turn(session_id)
+
+    assert accountant.session_summary("s1") is None
+    assert accountant.session_summary("s3") is not None
+
+
+def test_callback_handler_accounts_langchain_calls(accountant):
+    llm = UsageChatModel(callbacks=[UsageCallbackHandler(accountant)])
+
+    with session_scope("s1"):
+        accountant.start_turn("s1")
+        llm.invoke([HumanMessage(content="Hello")])
+    llm.invoke([HumanMessage(content="No session")])
+
+    (call,) = accountant.calls("s1")
+    assert call["prompt_tokens"] == 1000
+    assert call["completion_tokens"] == 200
+    assert call["cost"] == pytest.approx(0.0005)
+    assert call["latency"] >= 0
+
+
+def test_track_llm_call_records_against_current_session(monkeypatch, accountant):
+    monkeypatch.setattr("salesgpt.accounting.get_usage_accountant", lambda: accountant)
+
+    with session_scope("s1"):
+        with track_llm_call("gpt-3.5-turbo", "product_id") as call:
+            call.set_usage({"prompt_tokens": 20, "completion_tokens": 3})
+
+    (record,) = accountant.calls("s1")
+    assert record["source"] == "product_id"
+    assert record["prompt_tokens"] == 20
+
+
+def test_failed_and_timed_out_calls_are_still_accounted(monkeypatch, accountant):
+    monkeypatch.setattr("salesgpt.accounting.get_usage_accountant", lambda: accountant)
+
+    with session_scope("s1"):
+        accountant.start_turn("s1")
+        with pytest.raises(TimeoutError):
+            with track_llm_call("gpt-3.5-turbo", "product_id"):
+                raise TimeoutError("provider too slow")
+        with track_llm_call("gpt-3.5-turbo", "product_id") as call:
+            call.set_usage({"prompt_tokens": 20, "completion_tokens": 3})
+
+    failed, succeeded = accountant.calls("s1")
+    assert failed["error"] == "TimeoutError"
+    assert failed["latency"] >= 0
+    assert succeeded["error"] is None
+    summary = accountant.turn_summary("s1")
+    assert summary["calls"] == 2
+    assert summary["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_streams_record_time_to_first_token(monkeypatch, accountant):
+    monkeypatch.setattr("salesgpt.accounting.get_usage_accountant", lambda: accountant)
+
+    async def chunks():
+        for text in ("Hello", " there"):
+            yield _litellm_chunk(text, "gpt-3.5-turbo")
+
+    messages = [{"role": "user", "content": "Hi"}]
+    with session_scope("s1"):
+        stream = aaccount_stream(chunks(), "gpt-3.5-turbo", messages)
+    received = [chunk async for chunk in stream]
+
+    assert len(received) == 2
+    (record,) = accountant.calls("s1")
+    assert record["time_to_first_token"] is not None
+    assert record["prompt_tokens"] > 0
+    assert record["completion_tokens"] > 0
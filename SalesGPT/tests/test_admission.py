@@ -0,0 +1,123 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from salesgpt.admission import AdmissionController, AdmissionRejected, install_admission_control
+from salesgpt.metrics import AppMetrics
+from salesgpt.salesgptapi import SalesGPTAPI
+
+
+def test_freed_slot_goes_to_the_highest_priority_waiter():
+    controller = AdmissionController(slots=1, queue_limit=8)
+    order = []
+
+    async def work(name, priority):
+        async with controller.slot(priority):
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        first = asyncio.create_task(work("first", "chat"))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(work("preview", "preview")),
+            asyncio.create_task(work("chat", "chat")),
+            asyncio.create_task(work("call", "call")),
+        ]
+        await asyncio.gather(first, *tasks)
+
+    asyncio.run(main())
+
+    assert order == ["first", "call", "chat", "preview"]
+    assert controller.in_use == 0
+
+
+def test_lower_classes_are_shed_first():
+    metrics = AppMetrics()
+    controller = AdmissionController(slots=1, queue_limit=3, metrics=metrics)
+
+    async def main():
+        async with controller.slot("chat"):
+            waiting = [asyncio.create_task(controller.acquire("preview"))]
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected) as rejected:
+                await controller.acquire("preview")
+            controller.check("call")
+            assert metrics.admission_queue_depth.value(priority="preview") == 1
+            for task in waiting:
+                task.cancel()
+        return rejected.value
+
+    rejected = asyncio.run(main())
+
+    assert rejected.status_code == 429
+    assert rejected.retry_after >= 1
+    assert metrics.admission_rejected.value(priority="preview", reason="queue_full") == 1
+    assert controller.stats()["queued"] == {"call": 0, "chat": 0, "preview": 0}
+    assert controller.in_use == 0
+
+
+def test_wait_past_max_wait_is_refused_with_503():
+    controller = AdmissionController(slots=1, max_wait=0.01)
+
+    async def main():
+        async with controller.slot():
+            with pytest.raises(AdmissionRejected) as rejected:
+                await controller.acquire()
+        return rejected.value
+
+    assert asyncio.run(main()).status_code == 503
+    assert controller.stats()["rejected"]["timeout"] == 1
+
+
+def test_nested_slots_share_the_parent_slot():
+    controller = AdmissionController(slots=1, max_wait=0.05)
+
+    async def main():
+        async with controller.slot():
+            async with controller.slot():
+                return controller.in_use
+
+    assert asyncio.run(main()) == 1
+    assert controller.in_use == 0
+
+
+def test_installed_app_answers_with_retry_after():
+    controller = AdmissionController(slots=0, queue_limit=0)
+    app = FastAPI()
+    install_admission_control(app, controller)
+
+    @app.get("/work")
+    async def work():
+        async with controller.slot():
+            return {"ok": True}
+
+    with TestClient(app) as client:
+        busy = client.get("/work", headers={"X-Request-Priority": "call"})
+        unknown = client.get("/work", headers={"X-Request-Priority": "vip"})
+
+    assert busy.status_code == 429
+    assert busy.headers["Retry-After"] == "1"
+    assert unknown.status_code == 400
+
+
+def test_a_refused_turn_leaves_the_history_as_it_was():
+    api = SalesGPTAPI(config_path="examples/example_agent_setup.json", use_tools=False)
+    history = list(api.sales_agent.conversation_history)
+    full = AdmissionController(slots=0, queue_limit=0)
+
+    async def main():
+        with pytest.raises(AdmissionRejected):
+            await api.do("Hello")
+        with pytest.raises(AdmissionRejected):
+            async for _ in api.astream_turn("Hello"):
+                pass
+
+    with patch("salesgpt.salesgptapi.get_admission_controller", return_value=full):
+        asyncio.run(main())
+
+    assert api.sales_agent.conversation_history == history
+    assert api.current_turn == 0
@@ -0,0 +1,42 @@
+import json
+import os
+
+import pytest
+
+from salesgpt.agent_config import AgentConfigCache
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    path = tmp_path / "agent.json"
+    path.write_text(json.dumps({"salesperson_name": "Ted", "company_name": "Sleep Haven"}))
+    return str(path)
+
+
+def test_unchanged_config_is_parsed_once(config_file):
+    cache = AgentConfigCache()
+
+    first = cache.load(config_file)
+    first["salesperson_name"] = "mutated by caller"
+    second = cache.load(config_file)
+
+    assert second["salesperson_name"] == "Ted"
+    assert cache.stats() == {"files": 1, "hits": 1, "loads": 1}
+
+
+def test_changed_config_is_reparsed(config_file):
+    cache = AgentConfigCache()
+    assert cache.load(config_file)["salesperson_name"] == "Ted"
+
+    with open(config_file, "w") as f:
+        json.dump({"salesperson_name": "Rebecca"}, f)
+    stat = os.stat(config_file)
+    os.utime(config_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert cache.load(config_file) == {"salesperson_name": "Rebecca"}
+    assert cache.stats()["loads"] == 2
+
+
+def test_missing_config_is_an_error():
+    with pytest.raises(FileNotFoundError):
+        AgentConfigCache().load("missing.json")
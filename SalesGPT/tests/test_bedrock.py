@@ -0,0 +1,232 @@
+import asyncio
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from salesgpt.bedrock import BedrockClientManager, acompletion_bedrock, completion_bedrock
+
+
+@pytest.fixture
+def mock_boto3_session():
+    with patch("boto3.session.Session") as session_cls:
+        session = session_cls.return_value
+        session.client.side_effect = lambda **kwargs: MagicMock(name=kwargs["region_name"])
+        yield session
+
+
+def test_sync_clients_are_reused_per_region(mock_boto3_session):
+    manager = BedrockClientManager(max_pool_connections=7, default_region="us-east-1")
+
+    first = manager.client()
+    assert manager.client("us-east-1") is first
+    other = manager.client("eu-west-1")
+
+    assert other is not first
+    assert mock_boto3_session.client.call_count == 2
+    config = mock_boto3_session.client.call_args.kwargs["config"]
+    assert config.max_pool_connections == 7
+
+
+def test_close_releases_sync_clients(mock_boto3_session):
+    manager = BedrockClientManager(default_region="us-east-1")
+    client = manager.client()
+
+    manager.close()
+
+    client.close.assert_called_once()
+    assert manager.client() is not client, "A closed client must not be handed out again."
+
+
+def test_completion_bedrock_uses_pooled_client(mock_boto3_session):
+    manager = BedrockClientManager(default_region="us-east-1")
+    runtime = manager.client()
+    runtime.invoke_model.side_effect = lambda **kwargs: {
+        "body": io.BytesIO(json.dumps({"content": [{"text": "hi"}]}).encode())
+    }
+
+    with patch("salesgpt.bedrock.get_bedrock_client_manager", return_value=manager):
+        for _ in range(2):
+            response = completion_bedrock("model", "system", [{"role": "user", "content": "q"}])
+
+    assert response["content"][0]["text"] == "hi"
+    assert runtime.invoke_model.call_count == 2
+    assert mock_boto3_session.client.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_async_client_is_entered_once_and_closed():
+    runtime = MagicMock()
+    body = MagicMock()
+    body.read = AsyncMock(return_value=json.dumps({"content": [{"text": "hi"}]}).encode())
+    runtime.invoke_model = AsyncMock(return_value={"body": body})
+    client_cm = MagicMock()
+    client_cm.__aenter__ = AsyncMock(return_value=runtime)
+    client_cm.__aexit__ = AsyncMock(return_value=False)
+
+    manager = BedrockClientManager(default_region="us-east-1")
+    with patch("aioboto3.Session") as session_cls, patch(
+        "salesgpt.bedrock.get_bedrock_client_manager", return_value=manager
+    ):
+        session_cls.return_value.client.return_value = client_cm
+        for _ in range(3):
+            response = await acompletion_bedrock("model", "system", [])
+        assert response["content"][0]["text"] == "hi"
+        client_cm.__aenter__.assert_awaited_once()
+
+        await manager.aclose()
+
+    client_cm.__aexit__.assert_awaited_once()
+
+
+def _stream_events(*texts):
+    events = [{"chunk": {"bytes": json.dumps({"type": "message_start"}).encode()}}]
+    for text in texts:
+        payload = {"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}
+        events.append({"chunk": {"bytes": json.dumps(payload).encode()}})
+    events.append({"chunk": {"bytes": json.dumps({"type": "message_stop"}).encode()}})
+    return events
+
+
+class _AsyncEvents:
+    def __init__(self, events):
+        self._events = iter(events)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._events)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.fixture
+def bedrock_model():
+    from salesgpt.models import BedrockCustomModel
+
+    return BedrockCustomModel(
+        type="bedrock-model",
+        model="anthropic.claude-3-haiku-20240307-v1:0",
+        system_prompt="You are a helpful assistant.",
+        openai_api_key="unused",
+    )
+
+
+def test_stream_yields_message_chunks(mock_boto3_session, bedrock_model):
+    manager = BedrockClientManager(default_region="us-east-1")
+    runtime = manager.client()
+    runtime.invoke_model_with_response_stream.return_value = {
+        "body": _stream_events("Hello", " there")
+    }
+
+    with patch("salesgpt.bedrock.get_bedrock_client_manager", return_value=manager):
+        chunks = list(bedrock_model.stream("hi", stop=["<END_OF_TURN>"]))
+
+    assert [chunk.content for chunk in chunks] == ["Hello", " there"]
+    body = json.loads(runtime.invoke_model_with_response_stream.call_args.kwargs["body"])
+    assert body["stop_sequences"] == ["<END_OF_TURN>"]
+
+
+def test_completion_with_retry_matches_litellm_chunk_shape(mock_boto3_session, bedrock_model):
+    manager = BedrockClientManager(default_region="us-east-1")
+    runtime = manager.client()
+    runtime.invoke_model_with_response_stream.return_value = {
+        "body": _stream_events("Hi", "!")
+    }
+
+    with patch("salesgpt.bedrock.get_bedrock_client_manager", return_value=manager):
+        stream = bedrock_model.completion_with_retry(
+            messages=[{"role": "system", "content": "prompt"}],
+            stop="<END_OF_TURN>",
+            stream=True,
+            model=bedrock_model.model,
+        )
+        tokens = [
+            choice["delta"]["content"] for chunk in stream for choice in chunk.choices
+        ]
+
+    assert tokens == ["Hi", "!"]
+
+
+@pytest.mark.asyncio
+async def test_astream_and_streaming_agenerate(bedrock_model):
+    runtime = MagicMock()
+    runtime.invoke_model_with_response_stream = AsyncMock(
+        side_effect=lambda **kwargs: {"body": _AsyncEvents(_stream_events("a", "b"))}
+    )
+    manager = MagicMock()
+    manager.aclient = AsyncMock(return_value=runtime)
+
+    with patch("salesgpt.bedrock.get_bedrock_client_manager", return_value=manager):
+        chunks = [chunk.content async for chunk in bedrock_model.astream("hi")]
+        result = await bedrock_model.ainvoke("hi", stream=True)
+
+    assert chunks == ["a", "b"]
+    assert result.content == "ab"
+
+
+def _throttling_error():
+    from botocore.exceptions import ClientError
+
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+        "InvokeModel",
+    )
+
+
+@pytest.mark.asyncio
+async def test_abatch_caps_concurrency_and_keeps_order(bedrock_model):
+    in_flight = peak = 0
+
+    async def fake_acompletion(model_id, system_prompt, messages, **kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return {"content": [{"text": messages[-1]["content"].upper()}]}
+
+    bedrock_model.batch_concurrency = 3
+    with patch("salesgpt.models.acompletion_bedrock", side_effect=fake_acompletion):
+        results = await bedrock_model.abatch([f"msg {i}" for i in range(10)])
+
+    assert [result.content for result in results] == [f"MSG {i}" for i in range(10)]
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_abatch_retries_throttled_requests(bedrock_model):
+    calls = 0
+
+    async def flaky_acompletion(model_id, system_prompt, messages, **kwargs):
+        nonlocal calls
+        calls += 1
+        if calls <= 2:
+            raise _throttling_error()
+        return {"content": [{"text": "ok"}]}
+
+    bedrock_model.throttle_backoff = 0
+    with patch("salesgpt.models.acompletion_bedrock", side_effect=flaky_acompletion):
+        results = await bedrock_model.abatch(["hello"])
+
+    assert results[0].content == "ok"
+    assert calls == 3
+
+
+@pytest.mark.asyncio
+async def test_abatch_returns_exceptions_in_place(bedrock_model):
+    async def fake_acompletion(model_id, system_prompt, messages, **kwargs):
+        if messages[-1]["content"] == "bad":
+            raise ValueError("boom")
+        return {"content": [{"text": "ok"}]}
+
+    with patch("salesgpt.models.acompletion_bedrock", side_effect=fake_acompletion):
+        results = await bedrock_model.abatch(["good", "bad"], return_exceptions=True)
+        with pytest.raises(ValueError):
+            await bedrock_model.abatch(["good", "bad"])
+
+    assert results[0].content == "ok"
+    assert isinstance(results[1], ValueError)
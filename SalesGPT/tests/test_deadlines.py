@@ -0,0 +1,163 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import litellm
+import openai
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from salesgpt import llm_cache
+from salesgpt.agents import SalesGPT, _create_retry_decorator
+from salesgpt.deadlines import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    bounded_timeout,
+    cancel_on_disconnect,
+    deadline_scope,
+    install_deadlines,
+    remaining,
+    request_timeout,
+    run_within_deadline,
+)
+from salesgpt.metrics import AppMetrics
+from salesgpt.salesgptapi import SalesGPTAPI
+from salesgpt.turns import TurnSerializer
+
+
+def test_nested_scopes_only_tighten_the_deadline():
+    assert remaining() is None
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining() <= 10
+        with deadline_scope(1):
+            assert bounded_timeout(30) <= 1
+    assert remaining() is None
+    assert bounded_timeout(30) == 30
+
+    with deadline_scope(0):
+        with pytest.raises(DeadlineExceeded):
+            bounded_timeout(30)
+
+
+def test_header_values_fall_back_and_are_capped():
+    assert request_timeout(None, default=60, maximum=300) == 60
+    assert request_timeout("5.5", default=60, maximum=300) == 5.5
+    assert request_timeout("soon", default=60, maximum=300) == 60
+    assert request_timeout("-1", default=60, maximum=300) == 60
+    assert request_timeout("3600", default=60, maximum=300) == 300
+
+
+def test_retries_stop_when_the_backoff_would_outlast_the_deadline():
+    calls = []
+
+    @_create_retry_decorator(SimpleNamespace(max_retries=5))
+    def flaky():
+        calls.append(1)
+        raise openai.APIConnectionError(request=httpx.Request("POST", "https://api.test"))
+
+    # The first backoff is 4 seconds: with 1 second left, no retry is attempted.
+    with deadline_scope(1):
+        with pytest.raises(openai.APIConnectionError):
+            flaky()
+
+    assert len(calls) == 1
+
+
+def test_llm_calls_get_the_time_left_as_their_timeout(monkeypatch):
+    seen = []
+    monkeypatch.setattr(litellm, "completion", lambda **kwargs: seen.append(kwargs))
+
+    llm_cache.completion(model="gpt-test", messages=[])
+    with deadline_scope(5):
+        llm_cache.completion(model="gpt-test", messages=[], timeout=30)
+
+    assert "timeout" not in seen[0]
+    assert 0 < seen[1]["timeout"] <= 5
+
+
+def test_work_is_cancelled_when_the_client_disconnects():
+    metrics = AppMetrics()
+    disconnected = asyncio.Event()
+    request = SimpleNamespace(
+        is_disconnected=AsyncMock(side_effect=lambda: disconnected.is_set()),
+        url=SimpleNamespace(path="/chat"),
+    )
+
+    async def main():
+        work = asyncio.ensure_future(asyncio.sleep(10))
+        asyncio.get_running_loop().call_later(0.02, disconnected.set)
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(request, work, poll_interval=0.01, metrics=metrics)
+        await asyncio.sleep(0)
+        return work
+
+    assert asyncio.run(main()).cancelled()
+    assert metrics.requests_abandoned.value(reason="disconnect") == 1
+
+
+def test_a_turn_survives_while_a_coalesced_request_still_waits():
+    serializer = TurnSerializer()
+    finished = []
+
+    async def slow_turn():
+        await asyncio.sleep(0.05)
+        finished.append(1)
+        return "reply"
+
+    async def main():
+        leader = asyncio.create_task(serializer.run("s", slow_turn, fingerprint="k"))
+        await asyncio.sleep(0)
+        retry = asyncio.create_task(serializer.run("s", slow_turn, fingerprint="k"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        reply = await retry
+
+        alone = asyncio.create_task(serializer.run("s", slow_turn))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        await asyncio.sleep(0.1)
+        return reply
+
+    assert asyncio.run(main()) == "reply"
+    assert finished == [1]
+    assert serializer.stats()["active_sessions"] == 0
+
+
+def test_an_expired_turn_leaves_the_history_as_it_was():
+    api = SalesGPTAPI(config_path="examples/example_agent_setup.json", use_tools=False)
+    history = list(api.sales_agent.conversation_history)
+
+    async def slow_step(stream):
+        await asyncio.sleep(10)
+
+    async def main():
+        with patch.object(SalesGPT, "astep", AsyncMock(side_effect=slow_step)):
+            with deadline_scope(0.02):
+                with pytest.raises(DeadlineExceeded):
+                    await run_within_deadline(api.do("Hello"))
+
+    asyncio.run(main())
+
+    assert api.sales_agent.conversation_history == history
+    assert api.current_turn == 0
+
+
+def test_installed_app_answers_expired_requests_with_504():
+    metrics = AppMetrics()
+    app = FastAPI()
+    install_deadlines(app, metrics=metrics, default=5, maximum=10)
+
+    @app.get("/work")
+    async def work():
+        return await run_within_deadline(asyncio.sleep(1, result={"ok": True}))
+
+    with TestClient(app) as client:
+        expired = client.get("/work", headers={"X-Request-Timeout": "0.01"})
+        served = client.get("/work")
+
+    assert expired.status_code == 504
+    assert served.json() == {"ok": True}
+    assert metrics.requests_abandoned.value(reason="deadline") == 1
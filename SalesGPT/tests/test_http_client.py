@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import pytest
+
+from salesgpt.http_client import (
+    CircuitBreaker,
+    ToolHttpClient,
+    ToolPolicy,
+    ToolUnavailableError,
+)
+
+
+def make_client(handler, **policy_kwargs):
+    policy = ToolPolicy(backoff=0, **policy_kwargs)
+    return ToolHttpClient(
+        policies={"TestTool": policy},
+        transport=httpx.MockTransport(handler),
+        async_transport=httpx.MockTransport(handler),
+    )
+
+
+def test_request_retries_server_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        status = 503 if len(calls) == 1 else 200
+        return httpx.Response(status, text="ok")
+
+    client = make_client(handler, retries=2)
+    response = client.request("TestTool", "GET", "https://example.com")
+
+    assert response.status_code == 200
+    assert len(calls) == 2, "A 5xx response should be retried within the retry budget."
+
+
+def test_request_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(400)
+
+    client = make_client(handler, retries=2)
+    response = client.request("TestTool", "GET", "https://example.com")
+
+    assert response.status_code == 400
+    assert len(calls) == 1
+
+
+def test_circuit_opens_after_repeated_failures():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ConnectTimeout("timed out", request=request)
+
+    client = make_client(handler, retries=0, failure_threshold=2, recovery_time=60)
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectTimeout):
+            client.request("TestTool", "GET", "https://example.com")
+
+    with pytest.raises(ToolUnavailableError) as excinfo:
+        client.request("TestTool", "GET", "https://example.com")
+
+    assert len(calls) == 2, "An open circuit must not reach the dependency."
+    assert excinfo.value.retry_after > 0
+
+
+def test_circuit_half_open_allows_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+    breaker.record_failure()
+
+    assert breaker.allow(), "An expired open circuit should let a trial call through."
+    assert not breaker.allow(), "Only one trial call is allowed while half-open."
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_a_trial_that_raises_otherwise_still_settles_the_circuit():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.TooManyRedirects("redirect loop", request=request)
+        return httpx.Response(200)
+
+    client = make_client(handler, retries=0, failure_threshold=1, recovery_time=0)
+    client.breaker("TestTool").record_failure()
+
+    with pytest.raises(httpx.TooManyRedirects):
+        client.request("TestTool", "GET", "https://example.com")
+
+    # The failed trial reopened the circuit, so once recovered another trial goes through.
+    assert client.request("TestTool", "GET", "https://example.com").status_code == 200
+    assert client.breaker("TestTool").state == CircuitBreaker.CLOSED
+
+
+def test_a_cancelled_trial_gives_its_slot_back():
+    breaker = CircuitBreaker(failure_threshold=1, recovery_time=60)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+
+    assert breaker.allow()
+    breaker.record_outcome_of(asyncio.CancelledError())
+    assert breaker.allow(), "A cancelled trial says nothing about the dependency."
+
+
+@pytest.mark.asyncio
+async def test_arequest_reuses_pooled_client():
+    def handler(request):
+        return httpx.Response(200, json={"ok": True})
+
+    client = make_client(handler)
+    first = await client.arequest("TestTool", "GET", "https://example.com")
+    pooled = client._async_client()
+    second = await client.arequest("TestTool", "GET", "https://example.com")
+
+    assert first.json() == second.json() == {"ok": True}
+    assert client._async_client() is pooled, "Async requests should share one pooled client per loop."
+    await client.aclose()
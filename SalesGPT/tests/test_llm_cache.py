@@ -0,0 +1,136 @@
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import litellm
+import pytest
+from litellm.utils import ModelResponse
+
+from salesgpt.llm_cache import (
+    LLMCache,
+    LLMCacheMiss,
+    acompletion,
+    completion,
+    decode_litellm_response,
+    encode_litellm_response,
+    install_llm_cache,
+    request_key,
+)
+
+
+@pytest.fixture
+def cache_factory(tmp_path):
+    created = []
+
+    def factory(mode, **kwargs):
+        cache = LLMCache(path=str(tmp_path / "llm_cache"), mode=mode, **kwargs)
+        install_llm_cache(cache)
+        created.append(cache)
+        return cache
+
+    yield factory
+    install_llm_cache(None)
+
+
+def _model_response(text):
+    response = ModelResponse(model="gpt-3.5-turbo")
+    response.choices[0].message.content = text
+    return response
+
+
+def _chunk(text):
+    chunk = ModelResponse(stream=True, model="gpt-3.5-turbo")
+    chunk.choices[0].delta.content = text
+    return chunk
+
+
+def test_request_key_ignores_volatile_arguments():
+    request = {"model": "gpt", "messages": [{"role": "user", "content": "hi"}]}
+    assert request_key("litellm", request) == request_key(
+        "litellm", {**request, "api_key": "secret", "request_timeout": 5}
+    )
+    assert request_key("litellm", request) != request_key(
+        "litellm", {**request, "temperature": 0.9}
+    )
+
+
+def test_litellm_response_round_trip():
+    response = _model_response("hello")
+    decoded = decode_litellm_response(json.loads(json.dumps(encode_litellm_response(response))))
+
+    assert decoded["choices"][0]["message"]["content"] == "hello"
+    chunk = decode_litellm_response(encode_litellm_response(_chunk("he")))
+    assert chunk.choices[0]["delta"]["content"] == "he"
+
+
+def test_record_then_replay(cache_factory):
+    messages = [{"role": "user", "content": "What sizes?"}]
+    with patch("salesgpt.llm_cache._original") as original:
+        original.return_value = MagicMock(return_value=_model_response("Twin and Queen"))
+        cache_factory("record")
+        completion(model="gpt-3.5-turbo", messages=messages)
+
+        replay = cache_factory("replay")
+        response = completion(model="gpt-3.5-turbo", messages=messages)
+
+    assert response["choices"][0]["message"]["content"] == "Twin and Queen"
+    assert original.return_value.call_count == 1
+    assert replay.hits == 1
+    with pytest.raises(LLMCacheMiss):
+        completion(model="gpt-3.5-turbo", messages=[{"role": "user", "content": "new"}])
+
+
+def test_litellm_module_is_patched_for_chat_litellm(cache_factory):
+    cache_factory("auto")
+    assert litellm.completion is completion
+    install_llm_cache(None)
+    assert litellm.completion is not completion
+
+
+def test_streamed_chunks_are_recorded_and_replayed(cache_factory):
+    kwargs = dict(model="gpt-3.5-turbo", messages=[{"role": "user", "content": "hi"}], stream=True)
+    with patch("salesgpt.llm_cache._original") as original:
+        original.return_value = MagicMock(return_value=iter([_chunk("Hel"), _chunk("lo")]))
+        cache_factory("auto")
+        recorded = [c.choices[0].delta.content for c in completion(**kwargs)]
+        replayed = [c.choices[0].delta.content for c in completion(**kwargs)]
+
+    assert recorded == replayed == ["Hel", "lo"]
+    assert original.return_value.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_async_stream_replay(cache_factory):
+    async def fake_stream():
+        for text in ["a", "b"]:
+            yield _chunk(text)
+
+    async def fake_acompletion(**kwargs):
+        return fake_stream()
+
+    kwargs = dict(model="gpt-3.5-turbo", messages=[], stream=True)
+    with patch("salesgpt.llm_cache._original", return_value=fake_acompletion):
+        cache_factory("auto", replay_latency=0.001)
+        recorded = [c.choices[0].delta.content async for c in await acompletion(**kwargs)]
+        replayed = [c.choices[0].delta.content async for c in await acompletion(**kwargs)]
+
+    assert recorded == replayed == ["a", "b"]
+
+
+def test_bedrock_helpers_go_through_the_cache(cache_factory):
+    from salesgpt.bedrock import completion_bedrock
+
+    runtime = MagicMock()
+    runtime.invoke_model.side_effect = lambda **kwargs: {
+        "body": io.BytesIO(json.dumps({"content": [{"text": "hi"}]}).encode())
+    }
+    manager = MagicMock()
+    manager.client.return_value = runtime
+
+    cache_factory("auto")
+    with patch("salesgpt.bedrock.get_bedrock_client_manager", return_value=manager):
+        first = completion_bedrock("model", "system", [{"role": "user", "content": "q"}])
+        second = completion_bedrock("model", "system", [{"role": "user", "content": "q"}])
+
+    assert first == second == {"content": [{"text": "hi"}]}
+    assert runtime.invoke_model.call_count == 1
@@ -0,0 +1,75 @@
+import json
+import logging
+
+import pytest
+
+from salesgpt.context import session_scope
+from salesgpt.logger import (
+    SamplingFilter,
+    parse_sampling,
+    setup_logging,
+    shutdown_logging,
+)
+from salesgpt.tracing import span
+
+
+@pytest.fixture
+def restore_root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    shutdown_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def _record(name, level=logging.INFO):
+    return logging.LogRecord(name, level, __file__, 1, "message", None, None)
+
+
+def test_sampling_keeps_a_deterministic_fraction():
+    sampling = SamplingFilter({"salesgpt": 0.25, "salesgpt.agents": 0.5})
+
+    kept_tools = [sampling.filter(_record("salesgpt.tools")) for _ in range(8)]
+    kept_agents = [sampling.filter(_record("salesgpt.agents")) for _ in range(8)]
+
+    assert sum(kept_tools) == 2
+    assert sum(kept_agents) == 4
+    assert sampling.filter(_record("uvicorn"))
+    assert sampling.filter(_record("salesgpt.tools", logging.WARNING))
+
+
+def test_parse_sampling():
+    assert parse_sampling("salesgpt.agents=0.1, salesgpt.tracing=0.01") == {
+        "salesgpt.agents": 0.1,
+        "salesgpt.tracing": 0.01,
+    }
+    assert parse_sampling("") == {}
+
+
+def test_setup_logging_writes_json_with_context(tmp_path, restore_root_logger):
+    log_file = tmp_path / "logs" / "salesgpt.log"
+    setup_logging(level="DEBUG", log_file=str(log_file), json_format=True, sampling={})
+
+    with session_scope("s1"), span("turn") as turn:
+        logging.getLogger("salesgpt.agents").debug("Stage: %s", "Introduction")
+    shutdown_logging()
+
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    (entry,) = [e for e in entries if e["logger"] == "salesgpt.agents"]
+    assert entry["message"] == "Stage: Introduction"
+    assert entry["session_id"] == "s1"
+    assert entry["trace_id"] == turn.trace_id
+
+
+def test_log_file_is_rotated_by_size(tmp_path, restore_root_logger):
+    log_file = tmp_path / "salesgpt.log"
+    setup_logging(log_file=str(log_file), max_bytes=512, backup_count=2, sampling={})
+
+    for i in range(100):
+        logging.getLogger("salesgpt.test").info("line %d %s", i, "x" * 40)
+    shutdown_logging()
+
+    rotated = sorted(p.name for p in tmp_path.iterdir())
+    assert rotated == ["salesgpt.log", "salesgpt.log.1", "salesgpt.log.2"]
+    assert all(p.stat().st_size <= 512 for p in tmp_path.iterdir())
@@ -0,0 +1,90 @@
+import pytest
+from langchain.agents import Tool
+
+from salesgpt.context import session_scope
+from salesgpt.memo import ToolResultCache, normalize_tool_input
+
+
+def make_tool(name, calls, **kwargs):
+    def func(query):
+        calls.append(query)
+        return f"{name} result {len(calls)}"
+
+    async def coroutine(query):
+        return func(query)
+
+    return Tool(name=name, func=func, coroutine=coroutine, description=name, **kwargs)
+
+
+def test_normalize_tool_input():
+    assert normalize_tool_input("  What sizes does the  EcoGreen come in? ") == normalize_tool_input(
+        "what sizes does the ecogreen come in"
+    )
+
+
+def test_repeated_question_is_served_from_cache():
+    calls = []
+    cache = ToolResultCache()
+    tool = cache.wrap(make_tool("ProductSearch", calls))
+
+    with session_scope("session-1"):
+        first = tool.run("What sizes does the EcoGreen come in?")
+        second = tool.run("what sizes does the EcoGreen come in")
+
+    assert first == second
+    assert len(calls) == 1
+    assert cache.stats("session-1") == {"hits": 1, "misses": 1, "bypassed": 0, "hit_rate": 0.5}
+
+
+def test_results_are_isolated_per_session():
+    calls = []
+    cache = ToolResultCache()
+    tool = cache.wrap(make_tool("ProductSearch", calls))
+
+    with session_scope("session-1"):
+        tool.run("price of the EcoGreen")
+    with session_scope("session-2"):
+        tool.run("price of the EcoGreen")
+
+    assert len(calls) == 2, "A cached result must not leak into another session."
+
+
+def test_side_effecting_tool_opts_out():
+    calls = []
+    cache = ToolResultCache()
+    tool = cache.wrap(make_tool("SendEmail", calls, metadata={"memoize": False}))
+
+    with session_scope("session-1"):
+        tool.run("email jane@example.com")
+        tool.run("email jane@example.com")
+
+    assert len(calls) == 2
+    assert cache.stats("session-1")["bypassed"] == 2
+
+
+def test_failed_observations_are_not_cached():
+    calls = []
+    cache = ToolResultCache(is_cacheable=lambda result: "unavailable" not in result)
+    tool = make_tool("GeneratePaymentLink", calls)
+    tool.func = lambda query: calls.append(query) or "GeneratePaymentLink is temporarily unavailable."
+    tool = cache.wrap(tool)
+
+    with session_scope("session-1"):
+        tool.run("buy an EcoGreen")
+        tool.run("buy an EcoGreen")
+
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_entry_point_uses_cache():
+    calls = []
+    cache = ToolResultCache(ttls={"ProductSearch": 60})
+    tool = cache.wrap(make_tool("ProductSearch", calls))
+
+    with session_scope("session-1"):
+        first = await tool.arun("EcoGreen sizes")
+        second = await tool.arun("EcoGreen sizes")
+
+    assert first == second
+    assert len(calls) == 1
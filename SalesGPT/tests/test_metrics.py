@@ -0,0 +1,126 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from langchain.agents import Tool
+
+from salesgpt.accounting import track_llm_call
+from salesgpt.memo import ToolResultCache
+from salesgpt.metrics import AppMetrics, MetricsRegistry, instrument_app
+from salesgpt.tools import is_failed_observation, tool_unavailable_message
+from salesgpt.tracing import add_span_listener, remove_span_listener, trace_tool
+
+
+@pytest.fixture
+def metrics():
+    return AppMetrics()
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, route="/chat")
+
+    lines = registry.render().splitlines()
+
+    assert "# TYPE latency_seconds histogram" in lines
+    assert 'latency_seconds_bucket{route="/chat",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/chat",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/chat",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/chat"} 3' in lines
+    assert 'latency_seconds_sum{route="/chat"} 5.55' in lines
+
+
+def test_registry_returns_existing_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter("errors_total", "Errors.", ("tool",))
+
+    assert registry.counter("errors_total", "Errors.", ("tool",)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge("errors_total", "Errors.")
+
+
+def test_llm_calls_are_labelled_by_role(monkeypatch, metrics):
+    monkeypatch.setattr("salesgpt.accounting.get_app_metrics", lambda: metrics)
+
+    with track_llm_call("gpt-3.5-turbo", "product_id"):
+        pass
+    with track_llm_call("gpt-3.5-turbo", "utterance") as call:
+        call.first_token()
+
+    assert metrics.llm_latency.count(role="tool_helper", model="gpt-3.5-turbo") == 1
+    assert metrics.llm_ttft.count(role="utterance", model="gpt-3.5-turbo") == 1
+    assert metrics.llm_ttft.count(role="tool_helper", model="gpt-3.5-turbo") == 0
+
+
+def test_tool_spans_feed_latency_and_errors(metrics):
+    def fail(query):
+        raise RuntimeError("down")
+
+    ok = trace_tool(Tool(name="Ok", func=str.upper, description="d"))
+    failing = trace_tool(Tool(name="Failing", func=fail, description="d"))
+    add_span_listener(metrics.observe_span)
+    try:
+        ok.run("x")
+        with pytest.raises(RuntimeError):
+            failing.run("x")
+    finally:
+        remove_span_listener(metrics.observe_span)
+
+    assert metrics.tool_latency.count(tool="Ok") == 1
+    assert metrics.tool_errors.value(tool="Ok") == 0
+    assert metrics.tool_errors.value(tool="Failing") == 1
+
+
+def test_failures_reported_as_observations_count_and_cache_hits_are_not_timed(metrics):
+    def unavailable(query):
+        return tool_unavailable_message("Calendly")
+
+    search = trace_tool(
+        Tool(name="ProductSearch", func=str.upper, description="d"),
+        is_failure=is_failed_observation,
+    )
+    broken = trace_tool(
+        Tool(name="SendCalendlyInvitation", func=unavailable, description="d"),
+        is_failure=is_failed_observation,
+    )
+    search, broken = ToolResultCache().wrap_all([search, broken])
+    add_span_listener(metrics.observe_span)
+    try:
+        search.run("mattress")
+        search.run("mattress")
+        broken.run("tomorrow")
+    finally:
+        remove_span_listener(metrics.observe_span)
+
+    assert metrics.tool_latency.count(tool="ProductSearch") == 1, "The cache hit is not a call."
+    assert metrics.tool_errors.value(tool="ProductSearch") == 0
+    assert metrics.tool_errors.value(tool="SendCalendlyInvitation") == 1
+
+
+def test_instrumented_app_exposes_metrics(metrics):
+    app = FastAPI()
+    sessions = {"a": object(), "b": object()}
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    instrument_app(app, metrics=metrics, active_sessions=lambda: len(sessions), lag_interval=0.01)
+
+    with TestClient(app) as client:
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/items/0")
+        response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'salesgpt_http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2'
+        in body
+    )
+    assert 'route="/items/{item_id}",status="404"' in body
+    assert "salesgpt_active_sessions 2" in body
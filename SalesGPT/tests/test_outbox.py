@@ -0,0 +1,119 @@
+import smtplib
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from salesgpt.outbox import FAILED, PENDING, SENDING, SENT, EmailOutbox
+
+
+@pytest.fixture
+def smtp_server():
+    server = MagicMock()
+    server.noop.return_value = (250, b"OK")
+    return server
+
+
+@pytest.fixture
+def outbox(tmp_path, smtp_server):
+    factory = MagicMock(return_value=smtp_server)
+    return EmailOutbox(
+        path=str(tmp_path / "outbox.sqlite3"),
+        smtp_factory=factory,
+        sender_email="agent@example.com",
+        base_backoff=0,
+        max_attempts=2,
+    )
+
+
+def test_batch_reuses_one_connection(outbox, smtp_server):
+    outbox.start = MagicMock()  # drive the sender by hand
+    ids = [outbox.enqueue(f"user{i}@example.com", "Hi", "Body") for i in range(3)]
+
+    assert outbox.process_batch() == 3
+    assert outbox.smtp_factory.call_count == 1, "A batch should be sent over a single SMTP connection."
+    assert smtp_server.sendmail.call_count == 3
+    assert all(outbox.status(i)["status"] == SENT for i in ids)
+
+
+def test_failed_send_is_retried_then_given_up(outbox, smtp_server):
+    outbox.start = MagicMock()
+    smtp_server.sendmail.side_effect = smtplib.SMTPServerDisconnected("gone")
+    message_id = outbox.enqueue("user@example.com", "Hi", "Body")
+
+    outbox.process_batch()
+    record = outbox.status(message_id)
+    assert record["status"] == PENDING and record["attempts"] == 1
+    assert "gone" in record["last_error"]
+
+    outbox.process_batch()
+    assert outbox.status(message_id)["status"] == FAILED
+    assert outbox.smtp_factory.call_count == 2, "A broken connection should be replaced."
+
+
+def test_spool_survives_restart(tmp_path, smtp_server):
+    path = str(tmp_path / "outbox.sqlite3")
+    first = EmailOutbox(path=path, smtp_factory=MagicMock(return_value=smtp_server))
+    first.start = MagicMock()
+    message_id = first.enqueue("user@example.com", "Hi", "Body")
+
+    second = EmailOutbox(path=path, smtp_factory=MagicMock(return_value=smtp_server))
+    assert second.pending_count() == 1
+    second.process_batch()
+    assert second.status(message_id)["status"] == SENT
+
+
+def test_background_sender_delivers(outbox, smtp_server):
+    message_id = outbox.enqueue("user@example.com", "Hi", "Body")
+    deadline = time.time() + 5
+    while outbox.status(message_id)["status"] != SENT and time.time() < deadline:
+        time.sleep(0.01)
+    outbox.stop()
+
+    assert outbox.status(message_id)["status"] == SENT
+    smtp_server.quit.assert_called_once()
+
+
+def test_workers_sharing_a_spool_never_send_a_message_twice(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    sent = []
+
+    def worker_smtp():
+        server = MagicMock()
+        server.noop.return_value = (250, b"OK")
+        server.sendmail.side_effect = lambda sender, recipient, message: sent.append(recipient)
+        return server
+
+    workers = [EmailOutbox(path=path, smtp_factory=worker_smtp, batch_size=5) for _ in range(2)]
+    for worker in workers:
+        worker.start = MagicMock()
+    ids = [workers[0].enqueue(f"user{i}@example.com", "Hi", "Body") for i in range(40)]
+
+    def drain(worker):
+        while worker.process_batch():
+            pass
+
+    threads = [threading.Thread(target=drain, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(sent) == sorted(f"user{i}@example.com" for i in range(40))
+    assert all(workers[0].status(i)["status"] == SENT for i in ids)
+
+
+def test_messages_of_a_dead_sender_are_reclaimed_after_its_lease(tmp_path, smtp_server):
+    path = str(tmp_path / "outbox.sqlite3")
+    crashed = EmailOutbox(path=path, smtp_factory=MagicMock(), lease_time=0)
+    crashed.start = MagicMock()
+    message_id = crashed.enqueue("user@example.com", "Hi", "Body")
+    crashed._claim_batch()  # claimed, then the process died before sending
+    assert crashed.status(message_id)["status"] == SENDING
+
+    survivor = EmailOutbox(path=path, smtp_factory=MagicMock(return_value=smtp_server))
+    assert survivor.pending_count() == 1
+    survivor.process_batch()
+
+    assert survivor.status(message_id)["status"] == SENT
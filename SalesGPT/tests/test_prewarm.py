@@ -0,0 +1,112 @@
+import json
+import os
+
+import httpx
+import pytest
+
+from salesgpt.http_client import ToolHttpClient, set_http_client
+from salesgpt.prewarm import (
+    KNOWLEDGE_BASE,
+    MANIFEST_NAME,
+    VOICES,
+    PrewarmArtifact,
+    build_artifact,
+    knowledge_base_inputs,
+    voice_section,
+)
+
+VOICE_LISTING = [
+    {"name": "Rachel", "voice_id": "r-1"},
+    {"name": "Matthew (narration)", "voice_id": "m-2"},
+]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    path = tmp_path / "catalog.txt"
+    path.write_text("Classic mattress, $999")
+    return str(path)
+
+
+@pytest.fixture
+def artifact_dir(tmp_path, catalog):
+    def fake_index(directory):
+        with open(os.path.join(directory, "chroma.sqlite3"), "w") as f:
+            f.write("index")
+        return {"inputs": knowledge_base_inputs(catalog)}
+
+    def no_network(directory):
+        raise ConnectionError("offline")
+
+    output = str(tmp_path / "prewarm")
+    manifest = build_artifact(
+        output,
+        {
+            KNOWLEDGE_BASE: fake_index,
+            VOICES: voice_section("key", ["Matthew"], fetch_voices=lambda key: VOICE_LISTING),
+            "tokenizers": no_network,
+        },
+    )
+    assert sorted(manifest["sections"]) == [KNOWLEDGE_BASE, VOICES]
+    return output
+
+
+def test_current_sections_are_used_and_missing_ones_built_live(artifact_dir, catalog):
+    artifact = PrewarmArtifact.load(artifact_dir)
+
+    prebuilt = artifact.knowledge_base_dir(catalog)
+    assert open(os.path.join(prebuilt, "chroma.sqlite3")).read() == "index"
+    # Chroma may write to what it opens: the baked copy stays untouched.
+    assert prebuilt != os.path.join(artifact_dir, KNOWLEDGE_BASE)
+    assert artifact.knowledge_base_dir(catalog) == prebuilt
+    assert artifact.voice_ids("key") == {"Matthew": "m-2"}
+    assert artifact.voice_ids("another account") == {}
+    assert artifact.tokenizer_dir() is None
+    assert artifact.corrupt_sections() == []
+
+
+def test_stale_or_tampered_sections_fall_back_to_live_builds(artifact_dir, catalog):
+    with open(catalog, "a") as f:
+        f.write("\nNew pillow, $99")
+    assert PrewarmArtifact.load(artifact_dir).knowledge_base_dir(catalog) is None
+
+    with open(os.path.join(artifact_dir, VOICES, "unexpected"), "w") as f:
+        f.write("x")
+    with open(os.path.join(artifact_dir, KNOWLEDGE_BASE, "chroma.sqlite3"), "w") as f:
+        f.write("tampered")
+    artifact = PrewarmArtifact.load(artifact_dir)
+    assert artifact.corrupt_sections() == [KNOWLEDGE_BASE]
+    # Files not listed in the manifest are ignored; listed ones must match.
+    assert artifact.voice_ids("key") == {"Matthew": "m-2"}
+
+
+def test_artifacts_of_another_format_are_ignored(artifact_dir):
+    path = os.path.join(artifact_dir, MANIFEST_NAME)
+    with open(path) as f:
+        manifest = json.load(f)
+    manifest["format"] = 0
+    with open(path, "w") as f:
+        json.dump(manifest, f)
+
+    assert PrewarmArtifact.load(artifact_dir) is None
+    assert PrewarmArtifact.load(os.path.join(artifact_dir, "missing")) is None
+
+
+def test_index_built_with_other_embeddings_is_stale(artifact_dir, catalog, monkeypatch):
+    monkeypatch.setattr("salesgpt.prewarm.KNOWLEDGE_BASE_EMBEDDINGS_MODEL", "text-embedding-3-small")
+
+    assert PrewarmArtifact.load(artifact_dir).knowledge_base_dir(catalog) is None
+
+
+def test_voices_are_fetched_through_the_shared_http_client(tmp_path):
+    def handler(request):
+        assert request.headers["xi-api-key"] == "key"
+        return httpx.Response(200, json={"voices": VOICE_LISTING})
+
+    set_http_client(ToolHttpClient(transport=httpx.MockTransport(handler)))
+    try:
+        result = voice_section("key", ["Rachel"])(str(tmp_path))
+    finally:
+        set_http_client(None)
+
+    assert result["data"] == {"ids": {"Rachel": "r-1"}}
@@ -0,0 +1,193 @@
+import asyncio
+import time
+from typing import Any, List
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from salesgpt.accounting import UsageAccountant, UsageCallbackHandler
+from salesgpt.context import current_session_id
+from salesgpt.metrics import ROUTER_RUN_TAG
+from salesgpt.router import HedgedRouterChatModel, LatencyTracker, backend_key
+
+
+class SlowChatModel(BaseChatModel):
+    model: str
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+    cancelled: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _reply(self) -> ChatResult:
+        if self.fail:
+            raise RuntimeError(f"{self.model} is down")
+        message = AIMessage(content=f"from {self.model}")
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self._reply()
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs: Any):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return self._reply()
+
+
+def make_router(primary, secondary, **kwargs):
+    """Returns the router and the backend instances it actually calls (pydantic copies them)."""
+    kwargs.setdefault("default_hedge_delay", 0.05)
+    router = HedgedRouterChatModel(
+        backends=[primary, secondary], tracker=LatencyTracker(), **kwargs
+    )
+    return router, router.backends[0], router.backends[1]
+
+
+def test_latency_tracker_quantiles():
+    tracker = LatencyTracker(window_size=100)
+    for value in range(1, 101):
+        tracker.record("a", value / 100)
+
+    assert tracker.quantile("a", 0.5) == 0.5
+    assert tracker.quantile("a", 0.95) == 0.95
+    assert tracker.quantile("missing", 0.95) is None
+    assert tracker.snapshot()["a"]["count"] == 100
+
+
+def test_router_exposes_primary_model_name():
+    router, _, _ = make_router(SlowChatModel(model="gpt-4"), SlowChatModel(model="claude"))
+    assert router.model == "gpt-4"
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    primary, secondary = SlowChatModel(model="p"), SlowChatModel(model="s")
+    router, primary, secondary = make_router(primary, secondary)
+
+    result = await router.ainvoke([HumanMessage(content="hi")])
+
+    assert result.content == "from p"
+    assert secondary.calls == 0
+    assert router.tracker.count(backend_key(primary)) == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary = SlowChatModel(model="p", delay=1.0)
+    secondary = SlowChatModel(model="s", delay=0.01)
+    router, primary, secondary = make_router(primary, secondary)
+
+    start = time.monotonic()
+    result = await router.ainvoke([HumanMessage(content="hi")])
+
+    assert result.content == "from s"
+    assert time.monotonic() - start < 0.5
+    await asyncio.sleep(0)
+    assert primary.cancelled == 1
+    assert (router.hedged, router.hedge_wins) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_hedge_waits_for_primary_p95():
+    primary = SlowChatModel(model="p", delay=0.05)
+    secondary = SlowChatModel(model="s")
+    router, primary, secondary = make_router(
+        primary, secondary, min_samples=5, prefer_fastest=False
+    )
+    for _ in range(5):
+        router.tracker.record(backend_key(primary), 0.5)
+
+    result = await router.ainvoke([HumanMessage(content="hi")])
+
+    assert result.content == "from p"
+    assert secondary.calls == 0, "Primary answered within its p95, no hedge expected."
+
+
+@pytest.mark.asyncio
+async def test_failed_primary_fails_over():
+    primary = SlowChatModel(model="p", fail=True)
+    secondary = SlowChatModel(model="s")
+    router, primary, secondary = make_router(primary, secondary, default_hedge_delay=10)
+
+    result = await router.ainvoke([HumanMessage(content="hi")])
+
+    assert result.content == "from s"
+
+
+def test_prefer_fastest_demotes_slow_backend():
+    primary, secondary = SlowChatModel(model="p"), SlowChatModel(model="s")
+    router, primary, secondary = make_router(primary, secondary, min_samples=3)
+    for _ in range(3):
+        router.tracker.record(backend_key(primary), 2.0)
+        router.tracker.record(backend_key(secondary), 0.2)
+
+    assert router.ordered_backends() == [secondary, primary]
+    assert router.streaming_backend is secondary
+
+
+def test_sync_generate_hedges():
+    primary = SlowChatModel(model="p", delay=0.5)
+    secondary = SlowChatModel(model="s")
+    router, primary, secondary = make_router(primary, secondary)
+
+    result = router.invoke([HumanMessage(content="hi")])
+
+    assert result.content == "from s"
+    assert router.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_calls_do_not_lower_the_median():
+    primary = SlowChatModel(model="p", delay=1.0)
+    secondary = SlowChatModel(model="s", delay=0.01)
+    # Too few samples to trust p95, so the hedge goes out after the 0.05s default.
+    router, primary, secondary = make_router(primary, secondary, min_samples=10)
+    for _ in range(3):
+        router.tracker.record(backend_key(primary), 0.8)
+
+    await router.ainvoke([HumanMessage(content="hi")])
+    await asyncio.sleep(0)
+
+    assert primary.cancelled == 1
+    assert router.tracker.count(backend_key(primary)) == 3, "A short cancelled call is no sample."
+
+    router._record_cancelled(primary, 1.5)
+    assert router.tracker.count(backend_key(primary)) == 4, "A slower-than-usual one is."
+
+
+@pytest.mark.asyncio
+async def test_backend_calls_reach_the_router_handlers_once():
+    accountant = UsageAccountant()
+    primary, secondary = SlowChatModel(model="p"), SlowChatModel(model="s")
+    router, primary, secondary = make_router(primary, secondary)
+    started = []
+
+    class Recorder(BaseCallbackHandler):
+        def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+            started.append((run_id, parent_run_id, ROUTER_RUN_TAG in (kwargs.get("tags") or [])))
+
+    router.callbacks = [UsageCallbackHandler(accountant), Recorder()]
+
+    token = current_session_id.set("session-1")
+    try:
+        await router.ainvoke([HumanMessage(content="hi")])
+        router.invoke([HumanMessage(content="hi")])
+    finally:
+        current_session_id.reset(token)
+
+    router_runs = {run_id for run_id, _, is_router in started if is_router}
+    backend_runs = [parent for _, parent, is_router in started if not is_router]
+    assert len(router_runs) == 2 and sorted(map(str, backend_runs)) == sorted(map(str, router_runs))
+    assert accountant.session_summary("session-1")["calls"] == 2, "Counted per backend call only."
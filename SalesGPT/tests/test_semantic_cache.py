@@ -0,0 +1,125 @@
+import re
+from typing import List
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_core.embeddings import Embeddings
+
+from salesgpt.agents import SalesGPT
+from salesgpt.semantic_cache import SemanticResponseCache
+
+VOCABULARY = ["sizes", "ecogreen", "price", "luxury", "cloud", "delivery", "come"]
+
+
+class KeywordEmbeddings(Embeddings):
+    """Bag-of-words over a tiny vocabulary: similar wording gives similar vectors."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        words = re.findall(r"\w+", text.lower())
+        return [float(words.count(term)) for term in VOCABULARY] + [0.01]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class FakeAgentLLM(FakeListChatModel):
+    model: str = "fake-model"
+
+
+@pytest.fixture
+def cache():
+    return SemanticResponseCache(embeddings=KeywordEmbeddings(), threshold=0.9)
+
+
+def test_similar_question_hits_within_scope(cache):
+    scope = ("config", "Needs analysis")
+    answer, vector = cache.lookup(scope, "What sizes does the EcoGreen come in?")
+    assert answer is None
+    cache.store(scope, "What sizes does the EcoGreen come in?", "Twin to King.", vector)
+
+    assert cache.lookup(scope, "what sizes does EcoGreen come in")[0] == "Twin to King."
+    assert cache.lookup(scope, "What is the delivery price?")[0] is None
+    assert cache.lookup(("config", "Close"), "What sizes does the EcoGreen come in?")[0] is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["hit_rate"] == 0.25
+
+
+def test_expired_answers_are_not_served(cache):
+    cache.ttl = 0
+    scope = ("config", "stage")
+    _, vector = cache.lookup(scope, "EcoGreen sizes")
+    cache.store(scope, "EcoGreen sizes", "Twin to King.", vector)
+
+    assert cache.lookup(scope, "EcoGreen sizes")[0] is None
+    assert cache.stats()["entries"] == 0
+
+
+def _agent(responses, cache):
+    agent = SalesGPT.from_llm(FakeAgentLLM(responses=responses), use_tools=False)
+    agent.semantic_cache = cache
+    agent.seed_agent()
+    return agent
+
+
+def test_agent_reuses_answer_across_sessions(cache):
+    first = _agent(["The EcoGreen comes in Twin to King. <END_OF_TURN>"], cache)
+    first.human_step("What sizes does the EcoGreen come in?")
+    first.step()
+
+    second = _agent(["Freshly generated answer <END_OF_TURN>"], cache)
+    second.human_step("what sizes does the ecogreen come in")
+    second.step()
+
+    assert second.last_utterance_cached
+    assert second.conversation_history[-1] == (
+        "Ted Lasso: The EcoGreen comes in Twin to King. <END_OF_TURN>"
+    )
+
+
+@pytest.mark.asyncio
+async def test_agent_without_user_turn_skips_cache(cache):
+    agent = _agent(["Hello, this is Ted. <END_OF_TURN>"], cache)
+
+    await agent.astep()
+
+    assert not agent.last_utterance_cached
+    assert cache.embeddings.calls == 0
+
+
+def test_short_replies_after_different_agent_turns_are_not_shared(cache):
+    first = _agent(["Great, I'll book the King size for you. <END_OF_TURN>"], cache)
+    first.conversation_history.append("Ted Lasso: Shall I book the King size? <END_OF_TURN>")
+    first.human_step("yes")
+    first.step()
+
+    second = _agent(["Sure, what is the best email to reach you? <END_OF_TURN>"], cache)
+    second.conversation_history.append("Ted Lasso: Can I email you a quote? <END_OF_TURN>")
+    second.human_step("yes")
+    second.step()
+
+    assert not second.last_utterance_cached
+    assert second.conversation_history[-1] == (
+        "Ted Lasso: Sure, what is the best email to reach you? <END_OF_TURN>"
+    )
+    assert cache.embeddings.calls == 0
+
+
+def test_same_question_after_different_agent_turns_is_answered_afresh(cache):
+    first = _agent(["The luxury cloud comes in Queen and King. <END_OF_TURN>"], cache)
+    first.conversation_history.append("Ted Lasso: Have you seen the Luxury Cloud? <END_OF_TURN>")
+    first.human_step("What sizes does it come in?")
+    first.step()
+
+    second = _agent(["The EcoGreen comes in Twin to King. <END_OF_TURN>"], cache)
+    second.conversation_history.append("Ted Lasso: Have you seen the EcoGreen? <END_OF_TURN>")
+    second.human_step("What sizes does it come in?")
+    second.step()
+
+    assert not second.last_utterance_cached
+    assert second.conversation_history[-1] == (
+        "Ted Lasso: The EcoGreen comes in Twin to King. <END_OF_TURN>"
+    )
@@ -0,0 +1,240 @@
+import socketserver
+import threading
+
+import pytest
+
+from salesgpt.salesgptapi import SalesGPTAPI
+from salesgpt.session_backends import (
+    MemorySessionBackend,
+    RedisSessionBackend,
+    RespConnection,
+    SessionConflictError,
+    SessionState,
+    SQLiteSessionBackend,
+)
+
+
+class RespStandIn(socketserver.ThreadingTCPServer):
+    """Just enough of a Redis server for the session backend: strings and WATCH/MULTI/EXEC."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = {}
+        self.writes = {}
+        self.lock = threading.Lock()
+
+    def write(self, key, value):
+        if value is None:
+            self.data.pop(key, None)
+        else:
+            self.data[key] = value
+        self.writes[key] = self.writes.get(key, 0) + 1
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    def read_command(self):
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def reply(self, value):
+        if value is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(value, bytes):
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(value), value))
+        elif isinstance(value, int):
+            self.wfile.write(b":%d\r\n" % value)
+        elif isinstance(value, list):
+            self.wfile.write(b"*%d\r\n" % len(value))
+            for item in value:
+                self.reply(item)
+        else:
+            self.wfile.write(b"+%s\r\n" % value.encode())
+
+    def run(self, name, args):
+        server = self.server
+        if name == b"GET":
+            return server.data.get(args[0])
+        if name == b"SET":
+            server.write(args[0], args[1])
+            return "OK"
+        if name == b"DEL":
+            existed = args[0] in server.data
+            server.write(args[0], None)
+            return int(existed)
+        return "PONG"
+
+    def handle(self):
+        watched, queued = {}, None
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            name, args = command[0].upper(), command[1:]
+            with self.server.lock:
+                if name == b"WATCH":
+                    watched.update({key: self.server.writes.get(key, 0) for key in args})
+                    self.reply("OK")
+                elif name == b"UNWATCH":
+                    watched = {}
+                    self.reply("OK")
+                elif name == b"MULTI":
+                    queued = []
+                    self.reply("OK")
+                elif name == b"EXEC":
+                    changed = any(self.server.writes.get(k, 0) != v for k, v in watched.items())
+                    results = None if changed else [self.run(n, a) for n, a in queued]
+                    watched, queued = {}, None
+                    if results is None:
+                        self.wfile.write(b"*-1\r\n")
+                    else:
+                        self.reply(results)
+                elif queued is not None:
+                    queued.append((name, args))
+                    self.reply("QUEUED")
+                else:
+                    self.reply(self.run(name, args))
+
+
+@pytest.fixture
+def resp_server():
+    server = RespStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        yield MemorySessionBackend()
+    elif request.param == "sqlite":
+        yield SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"))
+    else:
+        server = request.getfixturevalue("resp_server")
+        backend = RedisSessionBackend(f"redis://127.0.0.1:{server.server_address[1]}/0")
+        yield backend
+        backend.close()
+
+
+def test_state_round_trips_with_bumped_version(backend):
+    state = SessionState("a", "cfg", ["User: hi <END_OF_TURN>"], "2", current_turn=1)
+
+    saved = backend.save(state)
+    loaded = backend.load("a")
+
+    assert saved.version == 1
+    assert loaded == saved
+    assert backend.load("missing") is None
+
+
+def test_concurrent_writers_conflict(backend):
+    first = backend.save(SessionState("a", "cfg"))
+    worker_a = backend.load("a")
+    worker_b = backend.load("a")
+
+    worker_a.conversation_history.append("User: from a")
+    assert backend.save(worker_a).version == first.version + 1
+    worker_b.conversation_history.append("User: from b")
+    with pytest.raises(SessionConflictError):
+        backend.save(worker_b)
+    with pytest.raises(SessionConflictError):
+        backend.save(SessionState("a", "cfg"))
+
+    assert backend.load("a").conversation_history == ["User: from a"]
+
+
+def test_delete_forgets_the_session(backend):
+    backend.save(SessionState("a", "cfg"))
+    backend.delete("a")
+
+    assert backend.load("a") is None
+    assert backend.save(SessionState("a", "cfg")).version == 1
+
+
+def test_watched_key_written_mid_transaction_aborts(resp_server, monkeypatch):
+    backend = RedisSessionBackend(f"redis://127.0.0.1:{resp_server.server_address[1]}")
+    state = backend.save(SessionState("a", "cfg"))
+    other = RespConnection.from_url(backend.url)
+    execute = RespConnection.execute
+
+    def execute_with_interleaved_write(conn, *args):
+        result = execute(conn, *args)
+        if args[0] == "GET" and conn is not other:
+            # Another host commits between our version check and EXEC.
+            execute(other, "SET", "salesgpt:session:a", state.to_json())
+        return result
+
+    monkeypatch.setattr(RespConnection, "execute", execute_with_interleaved_write)
+    with pytest.raises(SessionConflictError):
+        backend.save(state)
+
+    other.close()
+    backend.close()
+
+
+def test_sqlite_sessions_expire(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"), ttl=0)
+    backend.save(SessionState("a", "cfg"))
+
+    assert backend.load("a") is None
+    assert backend.prune() == 1
+
+
+def test_expired_sqlite_session_can_be_started_afresh(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"), ttl=60)
+    backend.save(SessionState("a", "cfg", ["User: hi <END_OF_TURN>"]))
+    with backend._connect() as db:
+        db.execute("UPDATE session_state SET updated_at = updated_at - 120")
+    assert backend.load("a") is None
+
+    saved = backend.save(SessionState("a", "cfg"))
+
+    assert saved.version == 1
+    assert backend.load("a").conversation_history == []
+    # A live session is still protected from a writer that never loaded it.
+    with pytest.raises(SessionConflictError):
+        backend.save(SessionState("a", "cfg"))
+
+
+def test_redis_url_parsing():
+    conn = RespConnection.from_url("redis://:s%40cret@cache.internal:6380/2")
+
+    assert (conn.host, conn.port, conn.db, conn.password) == ("cache.internal", 6380, 2, "s@cret")
+    with pytest.raises(ValueError):
+        RespConnection.from_url("http://localhost")
+
+
+def test_session_resumes_on_another_worker_from_its_template(tmp_path):
+    backend = SQLiteSessionBackend(str(tmp_path / "sessions.sqlite3"))
+    settings = {"config_path": "examples/example_agent_setup.json", "use_tools": False}
+    template_a = SalesGPTAPI(session_id="template", **settings)
+    template_b = SalesGPTAPI(session_id="template", **settings)
+
+    on_a = template_a.clone("s1")
+    on_a.sales_agent.human_step("Hi, I need a mattress")
+    on_a.sales_agent.conversation_stage_id = "2"
+    on_a.current_turn = 1
+    on_a.state_version = backend.save(on_a.to_session_state()).version
+
+    on_b = template_b.clone("s1")
+    on_b.apply_session_state(backend.load("s1"))
+
+    assert on_b.config_key == on_a.config_key
+    assert on_b.sales_agent.conversation_history == ["User: Hi, I need a mattress <END_OF_TURN>"]
+    assert on_b.sales_agent.current_conversation_stage == on_b.sales_agent.retrieve_conversation_stage("2")
+    assert on_b.current_turn == 1
+    assert on_b.sales_agent.stage_analyzer_chain is template_b.sales_agent.stage_analyzer_chain
+    assert template_b.sales_agent.conversation_history == []
+    with pytest.raises(SessionConflictError):
+        backend.save(template_b.clone("s1").to_session_state())
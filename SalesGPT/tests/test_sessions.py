@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from salesgpt.metrics import AppMetrics
+from salesgpt.sessions import DiskSessionTier, SessionStore, run_periodically
+
+
+class Conversation:
+    def __init__(self, session_id, history=None, stage="1"):
+        self.session_id = session_id
+        self.history = history or []
+        self.stage = stage
+
+
+def dump(conversation):
+    return {"history": conversation.history, "stage": conversation.stage}
+
+
+def load(session_id, state):
+    return Conversation(session_id, state["history"], state["stage"])
+
+
+@pytest.fixture
+def tier(tmp_path):
+    return DiskSessionTier(str(tmp_path / "spill"))
+
+
+def test_least_recently_used_session_is_spilled_and_rehydrated(tier):
+    metrics = AppMetrics()
+    store = SessionStore(dump, load, tier=tier, max_sessions=2, metrics=metrics)
+    first = store.get_or_create("a", Conversation)
+    first.history.append("User: hi")
+    first.stage = "2"
+    store.get_or_create("b", Conversation)
+    store.get("a")
+    store.get_or_create("c", Conversation)
+
+    assert "b" not in store
+    assert len(store) == 2
+    assert len(tier) == 1
+    assert metrics.session_evictions.value(reason="lru") == 1
+
+    store.put("b", store.get("b"))
+    assert "a" not in store
+    rehydrated = store.get("a")
+
+    assert rehydrated is not first
+    assert rehydrated.history == ["User: hi"]
+    assert rehydrated.stage == "2"
+    assert store.stats()["rehydrations"] == 2
+    assert metrics.session_rehydrations.value() == 2
+
+
+def test_idle_sessions_expire_to_the_tier(tier):
+    store = SessionStore(dump, load, tier=tier, idle_ttl=0.01)
+    store.get_or_create("a", Conversation).history.append("User: hi")
+    time.sleep(0.02)
+
+    assert store.sweep() == 1
+    assert len(store) == 0
+    assert store.stats()["evictions"]["ttl"] == 1
+    assert store.get("a").history == ["User: hi"]
+
+
+def test_without_tier_evicted_sessions_are_dropped():
+    store = SessionStore(dump, load, max_sessions=1)
+    store.get_or_create("a", Conversation)
+    store.get_or_create("b", Conversation)
+
+    assert store.get("a") is None
+
+
+def test_spilled_state_is_consumed_and_expires(tier):
+    tier.save("a", {"history": [], "stage": "1"})
+    assert tier.load("a") == {"history": [], "stage": "1"}
+    assert tier.load("a") is None
+
+    tier.ttl = 0
+    tier.save("b", {"history": [], "stage": "1"})
+    time.sleep(0.01)
+    assert tier.load("b") is None
+
+
+def test_spill_all_keeps_sessions_resumable(tier):
+    store = SessionStore(dump, load, tier=tier)
+    store.get_or_create("a", Conversation).stage = "3"
+    store.spill_all()
+
+    restarted = SessionStore(dump, load, tier=tier)
+    assert restarted.get("a").stage == "3"
+
+
+def test_concurrent_requests_share_one_rehydrated_session(tier):
+    tier.save("a", {"history": ["User: hi"], "stage": "2"})
+    loads = []
+
+    def slow_load(session_id, state):
+        loads.append(session_id)
+        time.sleep(0.1)
+        return load(session_id, state)
+
+    store = SessionStore(dump, slow_load, tier=tier)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(store.get_or_create("a", Conversation)))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["a"]
+    assert all(session is results[0] for session in results)
+    assert results[0].history == ["User: hi"]
+
+
+def test_periodic_jobs_survive_failures_until_cancelled():
+    runs = []
+
+    def job():
+        runs.append(time.monotonic())
+        if len(runs) == 1:
+            raise OSError("disk full")
+
+    async def main():
+        task = asyncio.ensure_future(run_periodically(job, 0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(main())
+    assert len(runs) >= 2
+
+
+def test_expire_evicts_idle_sessions_and_deletes_stale_spills(tmp_path):
+    tier = DiskSessionTier(str(tmp_path / "spill"), ttl=0)
+    store = SessionStore(dump, load, tier=tier, idle_ttl=0.01)
+    store.get_or_create("a", Conversation)
+    time.sleep(0.02)
+
+    assert store.expire() == 2
+    assert len(store) == 0
+    assert len(tier) == 0
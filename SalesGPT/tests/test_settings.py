@@ -0,0 +1,111 @@
+import json
+import os
+import signal
+import time
+
+import pytest
+
+from salesgpt.settings import ApiSettings, SettingsStore
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    config = tmp_path / "agent.json"
+    config.write_text(json.dumps({"salesperson_name": "Ada"}))
+    env_file = tmp_path / ".env"
+    env_file.write_text(f"CONFIG_PATH={config}\nGPT_MODEL=gpt-a\nAUTH_KEY=one\n")
+    for key in ("CONFIG_PATH", "GPT_MODEL", "AUTH_KEY", "ENVIRONMENT"):
+        monkeypatch.delenv(key, raising=False)
+    yield env_file, config
+    for key in ("CONFIG_PATH", "GPT_MODEL", "AUTH_KEY"):
+        os.environ.pop(key, None)
+
+
+def rewrite(path, text):
+    # Keep the size-or-mtime signature changing even on coarse filesystem clocks.
+    time.sleep(0.01)
+    path.write_text(text)
+
+
+def test_settings_are_parsed_from_the_environment():
+    settings = ApiSettings.from_env(
+        {
+            "ENVIRONMENT": "production",
+            "AUTH_KEY": "secret",
+            "CONFIG_PATH": "examples/example_agent_setup.json",
+            "USE_TOOLS_IN_API": "false",
+            "WS_IDLE_FOLLOWUP_SECONDS": "2.5",
+        }
+    )
+
+    assert settings.production
+    assert settings.authorized("Bearer secret")
+    assert not settings.authorized("Bearer guess")
+    assert settings.use_tools is False
+    assert settings.ws_idle_followup == 2.5
+    assert settings.salesperson_name == "Ted Lasso"
+    assert not ApiSettings().authorized("Bearer ")
+
+
+def test_env_file_never_overrides_the_process_environment(files, monkeypatch):
+    env_file, _ = files
+    monkeypatch.setenv("GPT_MODEL", "gpt-from-process")
+
+    settings = SettingsStore(env_file=str(env_file)).get()
+
+    assert settings.model_name == "gpt-from-process"
+    assert settings.auth_key == "one"
+    assert settings.salesperson_name == "Ada"
+
+
+def test_changed_files_are_reloaded_atomically_and_announced(files):
+    env_file, config = files
+    store = SettingsStore(env_file=str(env_file))
+    before = store.get()
+    changes = []
+    store.subscribe(lambda previous, current: changes.append((previous, current)))
+
+    assert not store.check_for_changes()
+    rewrite(env_file, f"CONFIG_PATH={config}\nGPT_MODEL=gpt-b\nAUTH_KEY=two\n")
+    assert store.check_for_changes()
+    rewrite(config, json.dumps({"salesperson_name": "Grace"}))
+    assert store.check_for_changes()
+
+    after = store.get()
+    assert (before.model_name, before.auth_key) == ("gpt-a", "one")
+    assert (after.model_name, after.auth_key, after.salesperson_name) == ("gpt-b", "two", "Grace")
+    assert [previous for previous, _ in changes][0] is before
+    assert changes[0][1].agent_fields != before.agent_fields
+    assert store.reloads == 2
+
+
+def test_keys_removed_from_the_env_file_are_unset_on_reload(files, monkeypatch):
+    env_file, config = files
+    monkeypatch.setenv("ENVIRONMENT", "production")
+    store = SettingsStore(env_file=str(env_file))
+    assert store.get().auth_key == "one"
+
+    rewrite(env_file, f"CONFIG_PATH={config}\nGPT_MODEL=gpt-a\nENVIRONMENT=development\n")
+    assert store.check_for_changes()
+
+    assert "AUTH_KEY" not in os.environ
+    assert not store.get().auth_key
+    # Variables the process was started with are never the file's to remove.
+    assert os.environ["ENVIRONMENT"] == "production"
+
+
+def test_sighup_triggers_a_reload(files):
+    env_file, config = files
+    store = SettingsStore(env_file=str(env_file))
+    previous = signal.getsignal(signal.SIGHUP)
+    try:
+        assert store.install_sighup()
+        rewrite(env_file, f"CONFIG_PATH={config}\nGPT_MODEL=gpt-c\n")
+        os.kill(os.getpid(), signal.SIGHUP)
+        deadline = time.monotonic() + 2
+        while store.reloads == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+
+    assert store.get().model_name == "gpt-c"
@@ -0,0 +1,60 @@
+import asyncio
+import subprocess
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from salesgpt.startup import Readiness, install_readiness, profile_imports
+
+
+def test_a_no_tools_agent_imports_no_optional_dependencies():
+    code = (
+        "import salesgpt.salesgptapi\n"
+        "from salesgpt.startup import loaded_heavy_modules\n"
+        "print('heavy:' + ','.join(loaded_heavy_modules()))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip().splitlines()[-1] == "heavy:"
+
+
+def test_profile_charges_each_module_only_for_what_it_adds():
+    timings = profile_imports(["json", "salesgpt.no_such_module"])
+
+    assert timings[0].module == "json" and timings[0].error is None
+    assert timings[0].modules_loaded == 0
+    assert timings[1].error.startswith("ModuleNotFoundError")
+
+
+def test_warmup_records_steps_and_survives_a_failing_one():
+    readiness = Readiness()
+    readiness.imports_finished()
+    built = []
+
+    def broken():
+        raise RuntimeError("no catalog")
+
+    asyncio.run(readiness.warm_up([("template", lambda: built.append(1)), ("catalog", broken)]))
+
+    status = readiness.status()
+    assert built == [1]
+    assert status["ready"] and set(status["steps"]) == {"template", "catalog"}
+    assert status["error"] == "catalog: RuntimeError: no catalog"
+    assert status["warmup_seconds"] is not None
+
+
+def test_ready_probe_answers_503_until_warm():
+    readiness = Readiness()
+    app = FastAPI()
+    install_readiness(app, readiness)
+
+    with TestClient(app) as client:
+        starting = client.get("/ready")
+        readiness.mark_ready()
+        ready = client.get("/ready")
+
+    assert starting.status_code == 503 and starting.json()["ready"] is False
+    assert ready.status_code == 200 and ready.json()["ready"] is True
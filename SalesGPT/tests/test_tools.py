@@ -1,23 +1,34 @@
+import httpx
 import pytest
-from unittest.mock import patch, MagicMock
-from salesgpt.tools import generate_stripe_payment_link, send_email_tool, generate_calendly_invitation_link
+from unittest.mock import patch, MagicMock, AsyncMock
+from salesgpt.context import session_scope
+from salesgpt.http_client import ToolUnavailableError
+from salesgpt.memo import ToolResultCache
+from salesgpt.outbox import EmailOutbox
+from salesgpt.scheduling import CalendlyClient, SchedulingLinkPool
+import salesgpt.tools
+from salesgpt.tools import get_tools, generate_stripe_payment_link, send_email_tool, generate_calendly_invitation_link, agenerate_calendly_invitation_link, tool_unavailable_message, extract_email_fields, get_mail_body_subject_from_query
 import os
 import json
 
 @pytest.fixture
 def mock_requests_post():
-    with patch("salesgpt.tools.requests.request") as mock_post:
-        yield mock_post
+    with patch("salesgpt.tools.get_http_client") as mock_client:
+        yield mock_client.return_value.request
 
 @pytest.fixture
 def mock_smtplib():
-    with patch("salesgpt.tools.smtplib.SMTP_SSL") as mock_smtp:
+    with patch("salesgpt.outbox.smtplib.SMTP_SSL") as mock_smtp:
         yield mock_smtp
 
 @pytest.fixture
 def mock_requests():
-    with patch("salesgpt.tools.requests.post") as mock_post:
-        yield mock_post
+    client = CalendlyClient(api_key="test-key", event_type_uuid="event-type-uuid")
+    pool = SchedulingLinkPool(create_link=client.create_scheduling_link)
+    with patch("salesgpt.scheduling.get_http_client") as mock_client, \
+            patch("salesgpt.tools.get_calendly_client", return_value=client), \
+            patch("salesgpt.tools.get_scheduling_link_pool", return_value=pool):
+        yield mock_client.return_value.request
 
 def test_generate_stripe_payment_link(mock_requests_post):
     # Mock the response of the requests.post call within your tool function
@@ -34,13 +45,16 @@ def test_generate_stripe_payment_link(mock_requests_post):
         # Assert that the result is as expected
         assert result == "https://mocked_payment_link.com", "The function should return the URL from the mocked response."
 
-        # Additionally, you can assert that the requests.post was called with the correct arguments
+        # Additionally, you can assert that the pooled client was called on behalf of the tool
         mock_requests_post.assert_called_once()
+        assert mock_requests_post.call_args.args[:2] == ("GeneratePaymentLink", "POST")
 
-def test_send_email_tool(mock_smtplib):
+def test_send_email_tool(mock_smtplib, tmp_path):
     # Mock the SMTP server object and its methods
     mock_server = MagicMock()
+    mock_server.noop.return_value = (250, b"OK")
     mock_smtplib.return_value = mock_server
+    outbox = EmailOutbox(path=str(tmp_path / "outbox.sqlite3"))
 
     # Mock the email details extraction
     email_details = {
@@ -48,14 +62,19 @@ def test_send_email_tool(mock_smtplib):
         "subject": "Test Subject",
         "body": "Test Body"
     }
-    with patch("salesgpt.tools.get_mail_body_subject_from_query", return_value=json.dumps(email_details)):
+    with patch("salesgpt.tools.get_mail_body_subject_from_query", return_value=json.dumps(email_details)), \
+            patch("salesgpt.tools.get_email_outbox", return_value=outbox), \
+            patch.object(outbox, "start"):
         result = send_email_tool("query about sending an email")
-        assert result == "Email sent successfully.", "The function should return a success message."
+        assert result == "Email to test@example.com queued for delivery.", "The function should return a queued message."
+        mock_smtplib.assert_not_called()
 
+        # The background sender delivers the spooled message
+        assert outbox.process_batch() == 1
         mock_smtplib.assert_called_once_with('smtp.gmail.com', 465)
         mock_server.login.assert_called_once_with(os.getenv("GMAIL_MAIL"), os.getenv("GMAIL_APP_PASSWORD"))
         mock_server.sendmail.assert_called_once()
-        mock_server.quit.assert_called_once()
+        assert outbox.status(1)["status"] == "sent"
 
 def test_generate_calendly_invitation_link(mock_requests):
     mock_response = MagicMock()
@@ -69,4 +88,124 @@ def test_generate_calendly_invitation_link(mock_requests):
     result = generate_calendly_invitation_link("query about a meeting")
 
     assert result == "url: https://mocked_calendly_link.com", "The function should return the URL from the mocked response."
-    mock_requests.assert_called_once()
\ No newline at end of file
+    mock_requests.assert_called_once()
+
+def test_generate_calendly_invitation_link_unavailable(mock_requests):
+    mock_requests.side_effect = ToolUnavailableError("SendCalendlyInvitation", retry_after=10)
+    result = generate_calendly_invitation_link("query about a meeting")
+
+    assert result == tool_unavailable_message("SendCalendlyInvitation"), "An open circuit should return the unavailable observation."
+
+
+def test_generate_calendly_invitation_link_failures_become_observations(mock_requests):
+    mock_requests.side_effect = httpx.TooManyRedirects("redirect loop")
+    assert generate_calendly_invitation_link("query") == tool_unavailable_message("SendCalendlyInvitation")
+
+    mock_response = MagicMock()
+    mock_response.status_code = 201
+    mock_response.json.side_effect = ValueError("not json")
+    mock_requests.side_effect = None
+    mock_requests.return_value = mock_response
+    result = generate_calendly_invitation_link("query")
+
+    assert result.startswith("Failed to read Calendly scheduling link"), "A malformed reply must not crash the agent step."
+
+
+@pytest.mark.asyncio
+async def test_agenerate_calendly_invitation_link_http_error(mock_requests):
+    with patch("salesgpt.scheduling.get_http_client") as mock_client:
+        mock_client.return_value.arequest = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        result = await agenerate_calendly_invitation_link("query about a meeting")
+
+    assert result == tool_unavailable_message("SendCalendlyInvitation")
+
+
+@pytest.mark.asyncio
+async def test_agenerate_calendly_invitation_link(mock_requests):
+    mock_response = MagicMock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {
+        "resource": {
+            "booking_url": "https://mocked_calendly_link.com"
+        }
+    }
+    with patch("salesgpt.scheduling.get_http_client") as mock_client:
+        mock_client.return_value.arequest = AsyncMock(return_value=mock_response)
+        result = await agenerate_calendly_invitation_link("query about a meeting")
+
+    assert result == "url: https://mocked_calendly_link.com", "The async tool should return the URL from the mocked response."
+
+
+def test_generate_calendly_invitation_link_from_pool(mock_requests):
+    mock_response = MagicMock()
+    mock_response.status_code = 201
+    mock_response.json.return_value = {
+        "resource": {
+            "booking_url": "https://pooled_calendly_link.com"
+        }
+    }
+    mock_requests.return_value = mock_response
+    pool = salesgpt.tools.get_scheduling_link_pool()
+    pool.track("event-type-uuid")
+    assert pool.refill() == pool.pool_size
+    mock_requests.reset_mock()
+
+    result = generate_calendly_invitation_link("query about a meeting")
+
+    assert result == "url: https://pooled_calendly_link.com"
+    mock_requests.assert_not_called()
+    assert pool.size("event-type-uuid") == pool.pool_size - 1
+
+
+def test_extract_email_fields_fast_path():
+    recipient, subject = extract_email_fields(
+        'Send an email to jane.doe@example.com with subject "Your EcoGreen order" to confirm delivery.'
+    )
+    assert recipient == "jane.doe@example.com"
+    assert subject == "Your EcoGreen order"
+
+    recipient, subject = extract_email_fields("Email bob@example.org about mattress sizes.")
+    assert recipient == "bob@example.org"
+    assert subject is None, "Subject should only be taken when stated explicitly."
+
+
+def test_get_mail_body_subject_from_query_drafts_body_only():
+    tool_call = MagicMock()
+    tool_call.function.arguments = json.dumps({"body": "Hi Jane, your order ships today."})
+    mock_response = MagicMock()
+    mock_response.choices[0].message.tool_calls = [tool_call]
+
+    with patch.dict(os.environ, {"GPT_MODEL": "gpt-3.5-turbo-1106"}), \
+            patch("salesgpt.tools.completion", return_value=mock_response) as mock_completion:
+        details = get_mail_body_subject_from_query(
+            'Email jane@example.com with subject "Order update" saying the order ships today.'
+        )
+
+    assert details == {
+        "recipient": "jane@example.com",
+        "subject": "Order update",
+        "body": "Hi Jane, your order ships today.",
+    }
+    schema = mock_completion.call_args.kwargs["tools"][0]["function"]["parameters"]
+    assert schema["required"] == ["body"], "Only the missing fields should be drafted by the LLM."
+
+
+def test_send_email_tool_without_recipient():
+    with patch("salesgpt.tools.completion") as mock_completion:
+        result = send_email_tool("Send the customer a thank you email.")
+
+    assert result.startswith("Email was not sent successfully")
+    mock_completion.assert_not_called()
+
+
+def test_single_use_booking_links_are_never_memoized():
+    links = iter(["url: https://calendly.com/d/one", "url: https://calendly.com/d/two"])
+    with patch("salesgpt.tools.setup_knowledge_base"), \
+            patch("salesgpt.tools.generate_calendly_invitation_link", side_effect=lambda query: next(links)):
+        tools = {tool.name: tool for tool in get_tools("catalog.txt", tool_cache=ToolResultCache())}
+
+    with session_scope("s1"):
+        first = tools["SendCalendlyInvitation"].run("book a meeting")
+        second = tools["SendCalendlyInvitation"].run("book a meeting")
+
+    assert first != second, "Each prospect must get a fresh single-use booking link."
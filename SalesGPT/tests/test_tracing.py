@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import pytest
+from langchain.agents import Tool
+
+from salesgpt.context import session_scope
+from salesgpt.tracing import (
+    FileSpanExporter,
+    set_span_exporter,
+    span,
+    trace_tool,
+    traced,
+)
+
+
+class CollectingExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, finished):
+        self.spans.append(finished)
+
+    def by_name(self, name):
+        return [s for s in self.spans if s.name == name]
+
+
+@pytest.fixture
+def exporter():
+    collecting = CollectingExporter()
+    previous = set_span_exporter(collecting)
+    yield collecting
+    set_span_exporter(previous)
+
+
+@pytest.mark.asyncio
+async def test_async_spans_time_the_awaited_work(exporter):
+    @traced("work")
+    async def work():
+        await asyncio.sleep(0.05)
+
+    await work()
+
+    (finished,) = exporter.spans
+    assert finished.duration >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_nested_spans_share_trace_and_session(exporter):
+    @traced("tool")
+    def tool():
+        return "result"
+
+    @traced("llm")
+    async def llm():
+        return tool()
+
+    with session_scope("s1"):
+        with span("turn", {"agent.id": "a1"}) as turn:
+            await llm()
+
+    tool_span, llm_span, turn_span = exporter.spans
+    assert turn_span is turn
+    assert llm_span.parent_id == turn.span_id
+    assert tool_span.parent_id == llm_span.span_id
+    assert {s.trace_id for s in exporter.spans} == {turn.trace_id}
+    assert tool_span.attributes["session.id"] == "s1"
+    assert tool_span.attributes["agent.id"] == "a1"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_tasks_keep_their_own_parents(exporter):
+    @traced("child")
+    async def child():
+        await asyncio.sleep(0.01)
+
+    async def turn(name):
+        with span(name):
+            await child()
+
+    await asyncio.gather(turn("a"), turn("b"))
+
+    parents = {s.span_id: s.name for s in exporter.spans if s.name in ("a", "b")}
+    assert sorted(parents[s.parent_id] for s in exporter.by_name("child")) == ["a", "b"]
+
+
+def test_generator_span_covers_iteration_and_errors(exporter):
+    @traced("stream")
+    def stream():
+        yield 1
+        yield 2
+        raise ValueError("boom")
+
+    consumed = []
+    with pytest.raises(ValueError):
+        for item in stream():
+            consumed.append(item)
+            with span("consumer"):
+                pass
+
+    assert consumed == [1, 2]
+    (stream_span,) = exporter.by_name("stream")
+    assert stream_span.error == "ValueError: boom"
+    assert all(s.parent_id is None for s in exporter.by_name("consumer"))
+
+
+@pytest.mark.asyncio
+async def test_async_generator_spans(exporter):
+    @traced("astream")
+    async def astream():
+        for item in range(3):
+            await asyncio.sleep(0)
+            yield item
+
+    assert [item async for item in astream()] == [0, 1, 2]
+    assert exporter.by_name("astream")[0].end_ns is not None
+
+
+@pytest.mark.asyncio
+async def test_traced_tools_record_tool_name(exporter):
+    async def acheck(query):
+        return query.upper()
+
+    tool = trace_tool(Tool(name="Check", func=str.upper, coroutine=acheck, description="d"))
+
+    assert tool.run("x") == "X"
+    assert await tool.arun("y") == "Y"
+    assert [s.attributes["tool.name"] for s in exporter.by_name("tool")] == ["Check", "Check"]
+
+
+@pytest.mark.parametrize("export_format", ["jsonl", "otlp"])
+def test_file_exporter_writes_batches(tmp_path, export_format):
+    path = tmp_path / "traces.jsonl"
+    file_exporter = FileSpanExporter(str(path), format=export_format, flush_interval=0.01)
+    previous = set_span_exporter(file_exporter)
+    try:
+        with span("turn", {"turn.number": 1}):
+            with span("llm"):
+                pass
+    finally:
+        set_span_exporter(previous)
+        file_exporter.shutdown()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    if export_format == "jsonl":
+        assert [line["name"] for line in lines] == ["llm", "turn"]
+    else:
+        spans = [
+            s
+            for line in lines
+            for resource in line["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for s in scope["spans"]
+        ]
+        assert [s["name"] for s in spans] == ["llm", "turn"]
+        assert spans[0]["parentSpanId"] == spans[1]["spanId"]
+        assert spans[1]["attributes"] == [{"key": "turn.number", "value": {"intValue": "1"}}]
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from salesgpt.metrics import AppMetrics
+from salesgpt.turns import SessionBusyError, TurnSerializer, request_fingerprint
+
+
+class Conversation:
+    def __init__(self):
+        self.history = []
+        self.generations = 0
+
+    async def turn(self, message):
+        self.generations += 1
+        self.history.append(f"User: {message}")
+        await asyncio.sleep(0.01)
+        self.history.append(f"Bot: reply to {message}")
+        return self.history[-1]
+
+
+def test_turns_of_one_session_do_not_interleave():
+    serializer = TurnSerializer()
+    conversation = Conversation()
+
+    async def main():
+        return await asyncio.gather(
+            *(serializer.run("s", lambda m=m: conversation.turn(m)) for m in ("a", "b", "c"))
+        )
+
+    replies = asyncio.run(main())
+
+    assert replies == ["Bot: reply to a", "Bot: reply to b", "Bot: reply to c"]
+    assert conversation.history == [
+        "User: a", "Bot: reply to a", "User: b", "Bot: reply to b", "User: c", "Bot: reply to c"
+    ]
+    assert serializer.stats()["active_sessions"] == 0
+
+
+def test_duplicate_requests_share_the_in_flight_turn():
+    metrics = AppMetrics()
+    serializer = TurnSerializer(metrics=metrics)
+    conversation = Conversation()
+    key = request_fingerprint("hi")
+
+    async def main():
+        return await asyncio.gather(
+            serializer.run("s", lambda: conversation.turn("hi"), fingerprint=key),
+            serializer.run("s", lambda: conversation.turn("hi"), fingerprint=key),
+        )
+
+    assert asyncio.run(main()) == ["Bot: reply to hi", "Bot: reply to hi"]
+    assert conversation.generations == 1
+    assert metrics.turns_coalesced.value() == 1
+
+
+def test_full_session_queue_is_refused():
+    serializer = TurnSerializer(max_pending=2)
+    conversation = Conversation()
+
+    async def main():
+        return await asyncio.gather(
+            *(serializer.run("s", lambda m=m: conversation.turn(m)) for m in ("a", "b", "c")),
+            serializer.run("other", lambda: conversation.turn("d")),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(main())
+
+    assert isinstance(results[2], SessionBusyError)
+    assert results[3] == "Bot: reply to d"
+    assert serializer.stats()["rejected"] == 1
+
+
+def test_failure_reaches_duplicates_and_frees_the_session():
+    serializer = TurnSerializer()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("llm down")
+
+    async def main():
+        results = await asyncio.gather(
+            serializer.run("s", fail, fingerprint="k"),
+            serializer.run("s", fail, fingerprint="k"),
+            return_exceptions=True,
+        )
+        async with serializer.turn("s"):
+            pass
+        return results
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert serializer.stats() == {"active_sessions": 0, "pending": 0, "coalesced": 1, "rejected": 0}
+
+
+def test_check_refuses_before_a_streamed_turn_starts():
+    serializer = TurnSerializer(max_pending=1)
+
+    async def main():
+        async with serializer.turn("s"):
+            with pytest.raises(SessionBusyError):
+                serializer.check("s")
+        serializer.check("s")
+
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+
+from salesgpt.agents import SalesGPT
+from salesgpt.salesgptapi import SalesGPTAPI
+from salesgpt.ws_chat import ChatSocket, OutboundStream, SlowConsumerError
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[{"delta": {"content": text}}])
+
+
+async def stream(*texts):
+    for text in texts:
+        yield chunk(text)
+
+
+def test_outbound_stream_merges_backed_up_deltas():
+    async def main():
+        outbound = OutboundStream()
+        outbound.put({"type": "turn_start", "turn": 1})
+        for text in ("Hel", "lo", "!"):
+            outbound.put({"type": "delta", "turn": 1, "text": text})
+        outbound.put({"type": "turn_end", "turn": 1})
+        outbound.close()
+        return [message async for message in iter_stream(outbound)]
+
+    async def iter_stream(outbound):
+        while True:
+            message = await outbound.get()
+            if message is None:
+                return
+            yield message
+
+    messages = asyncio.run(main())
+
+    assert [m["type"] for m in messages] == ["turn_start", "delta", "turn_end"]
+    assert messages[1]["text"] == "Hello!"
+    assert [m["seq"] for m in messages] == [1, 2, 3]
+
+
+def test_outbound_stream_drops_clients_that_fall_too_far_behind():
+    async def main():
+        outbound = OutboundStream(max_buffered_chars=100)
+        outbound.put({"type": "delta", "turn": 1, "text": "x" * 30})
+        with pytest.raises(SlowConsumerError):
+            outbound.put({"type": "delta", "turn": 1, "text": "x" * 30})
+        outbound.put({"type": "pong"})
+        return await outbound.get(), await outbound.get()
+
+    first, after_close = asyncio.run(main())
+    assert first["type"] == "delta"
+    assert after_close is None
+
+
+def socket_app(run_turn):
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def chat(websocket: WebSocket, greet: bool = False):
+        await websocket.accept()
+        await ChatSocket(websocket, "s1", run_turn, greet=greet).serve()
+
+    return app
+
+
+async def echo_turn(human_input, emit):
+    reply = f"you said {human_input}" if human_input is not None else "hello there"
+    for word in reply.split(" "):
+        emit({"type": "delta", "text": word + " "})
+    emit({"type": "stage", "stage_id": "1", "stage": "Introduction"})
+    emit({"type": "end", "response": reply, "end_of_call": False})
+
+
+def receive_turn(ws):
+    messages = [ws.receive_json()]
+    while messages[-1]["type"] not in ("turn_end", "error"):
+        messages.append(ws.receive_json())
+    return messages
+
+
+def test_socket_streams_user_and_agent_initiated_turns():
+    with TestClient(socket_app(echo_turn)) as client:
+        with client.websocket_connect("/ws?greet=true") as ws:
+            assert ws.receive_json()["type"] == "session"
+            greeting = receive_turn(ws)
+            ws.send_json({"type": "user_turn", "text": "hi"})
+            reply = receive_turn(ws)
+            ws.send_json({"type": "ping"})
+            pong = ws.receive_json()
+            ws.send_text("not json")
+            bad = ws.receive_json()
+
+    assert greeting[0] == {"type": "turn_start", "turn": 1, "initiator": "agent", "seq": 2}
+    assert greeting[-1]["response"] == "hello there"
+    assert reply[0]["initiator"] == "user"
+    assert "".join(m["text"] for m in reply if m["type"] == "delta") == "you said hi "
+    assert [m["type"] for m in reply if m["type"] != "delta"] == ["turn_start", "stage", "turn_end"]
+    assert pong["type"] == "pong"
+    assert bad == {"type": "error", "code": "bad_message", "seq": bad["seq"]}
+
+
+def test_turns_past_the_queue_limit_are_refused_as_busy():
+    release = asyncio.Event()
+
+    async def slow_turn(human_input, emit):
+        await release.wait()
+        await echo_turn(human_input, emit)
+
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def chat(websocket: WebSocket):
+        await websocket.accept()
+        await ChatSocket(websocket, "s1", slow_turn, max_queued_turns=1).serve()
+
+    @app.websocket("/release")
+    async def release_turns(websocket: WebSocket):
+        await websocket.accept()
+        release.set()
+        await websocket.close()
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.receive_json()
+            ws.send_json({"type": "user_turn", "text": "a"})
+            assert ws.receive_json()["type"] == "turn_start"
+            ws.send_json({"type": "user_turn", "text": "b"})
+            ws.send_json({"type": "user_turn", "text": "c"})
+            busy = ws.receive_json()
+            with client.websocket_connect("/release"):
+                pass
+            first = receive_turn(ws)
+            second = receive_turn(ws)
+
+    assert busy == {"type": "error", "code": "busy", "seq": busy["seq"]}
+    assert first[-1]["response"] == "you said a"
+    assert second[-1]["response"] == "you said b"
+
+
+def test_failed_turn_is_reported_and_the_connection_survives():
+    calls = []
+
+    async def flaky_turn(human_input, emit):
+        calls.append(human_input)
+        if len(calls) == 1:
+            raise RuntimeError("provider down")
+        await echo_turn(human_input, emit)
+
+    with TestClient(socket_app(flaky_turn)) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.receive_json()
+            ws.send_json({"type": "user_turn", "text": "a"})
+            failed = receive_turn(ws)
+            ws.send_json({"type": "user_turn", "text": "b"})
+            recovered = receive_turn(ws)
+
+    assert failed[-1]["code"] == "turn_failed"
+    assert recovered[-1]["response"] == "you said b"
+
+
+def test_streamed_turn_keeps_reply_and_stage_on_the_agent():
+    api = SalesGPTAPI(config_path="examples/example_agent_setup.json", use_tools=False)
+    name = api.sales_agent.salesperson_name
+
+    async def determine_stage():
+        api.sales_agent.conversation_stage_id = "2"
+
+    async def main():
+        with patch.object(SalesGPT, "astep", AsyncMock(return_value=stream(name[:3], name[3:] + ": Hi", " there <END_OF_TURN>"))), \
+                patch.object(SalesGPT, "adetermine_conversation_stage", side_effect=determine_stage):
+            return [event async for event in api.astream_turn("Hello")]
+
+    events = asyncio.run(main())
+
+    assert "".join(e["text"] for e in events if e["type"] == "delta") == "Hi there "
+    assert events[-2] == {"type": "stage", "stage_id": "2", "stage": api.sales_agent.current_conversation_stage}
+    assert events[-1] == {"type": "end", "response": "Hi there", "end_of_call": False}
+    assert api.sales_agent.conversation_history[-1] == f"{name}: Hi there <END_OF_TURN>"
+    assert api.current_turn == 1
@@ -13,6 +13,12 @@ import requests
 from pathlib import Path
 from typing import Optional, Dict, Any, List
 
+try:
+    from salesgpt.prewarm import get_prewarm_artifact
+except ImportError:
+    # Used without the SalesGPT package on the path: always resolve voices live
+    get_prewarm_artifact = lambda: None
+
 # Configure logger
 logger = logging.getLogger("elevenlabs_helper")
 
@@ -23,6 +29,14 @@ elevenlabs_available = False
 # Set a flag to ensure we only try to import once
 _elevenlabs_import_attempted = False
 
+# Voice name -> id, resolved once per process (or at image build time, see prewarm)
+_voice_ids: Dict[str, str] = {}
+
+def _prewarmed_voice_ids() -> Dict[str, str]:
+    """Voice ids baked into the prewarm artifact for the configured API key."""
+    artifact = get_prewarm_artifact()
+    return artifact.voice_ids(ELEVENLABS_API_KEY) if artifact else {}
+
 def initialize_elevenlabs():
     """Initialize ElevenLabs API with proper error handling."""
     global elevenlabs_available, _elevenlabs_import_attempted, ELEVENLABS_API_KEY
@@ -39,6 +53,14 @@ def initialize_elevenlabs():
         elevenlabs_available = False
         return False
     
+    # Voices resolved with this key at build time prove it works; skip the probe
+    prewarmed = _prewarmed_voice_ids()
+    if prewarmed:
+        _voice_ids.update(prewarmed)
+        logger.info(f"Using {len(prewarmed)} prewarmed ElevenLabs voice ids")
+        elevenlabs_available = True
+        return True
+    
     # Test API key with direct API call
     try:
         url = "https://api.elevenlabs.io/v1/voices"
@@ -83,7 +105,15 @@ def initialize_elevenlabs():
         return False
 
 def get_voice_id(voice_name: str = "Matthew") -> Optional[str]:
-    """Get the voice ID for a given voice name."""
+    """Get the voice ID for a given voice name, looking it up only once per process."""
+    if voice_name in _voice_ids:
+        return _voice_ids[voice_name]
+    voice_id = _fetch_voice_id(voice_name)
+    if voice_id:
+        _voice_ids[voice_name] = voice_id
+    return voice_id
+
+def _fetch_voice_id(voice_name: str) -> Optional[str]:
     try:
         url = "https://api.elevenlabs.io/v1/voices"
         headers = {
@@ -120,8 +150,8 @@ def get_voice_id(voice_name: str = "Matthew") -> Optional[str]:
         logger.error(f"Error in get_voice_id: {str(e)}")
         return None
 
-def generate_speech(text: str, voice_name: str = "Matthew", model: str = "eleven_monolingual_v1") -> Optional[bytes]:
-    """Generate speech from text using ElevenLabs direct API."""
+def generate_speech(text: str, voice_name: str = "Matthew", model: str = "eleven_monolingual_v1", timeout: Optional[float] = None) -> Optional[bytes]:
+    """Generate speech from text using ElevenLabs direct API, giving up after `timeout` seconds."""
     global elevenlabs_available, ELEVENLABS_API_KEY
     
     # Initialize ElevenLabs if not already done
@@ -159,7 +189,7 @@ def generate_speech(text: str, voice_name: str = "Matthew", model: str = "eleven
         }
         
         # Make the request
-        response = requests.post(url, json=body, headers=headers)
+        response = requests.post(url, json=body, headers=headers, timeout=timeout)
         
         if response.status_code == 200:
             logger.info("Successfully generated speech")
@@ -5,6 +5,7 @@ This server provides API endpoints for interacting with the SalesGPT sales conve
 It handles chat interactions and voice synthesis using ElevenLabs.
 """
 
+import asyncio
 import os
 import sys
 import json
@@ -17,18 +18,48 @@ from typing import Dict, List, Optional, Union
 # Add project root to path for imports
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
+sys.path.append(str(project_root / "SalesGPT"))
+
+from salesgpt.prewarm import activate_prewarm_artifact
+from salesgpt.startup import Readiness, install_readiness
+
+# Created before the heavy imports below so /ready can report how long they took.
+readiness = Readiness()
+# Use the tokenizer files and voice ids baked into the image instead of fetching them.
+prewarm_artifact = activate_prewarm_artifact()
 
 # FastAPI imports
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Header, Query
+from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks, Header, Query, Request
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 import dotenv
 import uvicorn
+import time
 from datetime import datetime
 from starlette.responses import StreamingResponse
 
+from salesgpt.admission import AdmissionRejected, install_admission_control
+from salesgpt.deadlines import (
+    ClientDisconnected,
+    DeadlineExceeded,
+    bounded_timeout,
+    cancel_on_disconnect,
+    deadline_settings,
+    install_deadlines,
+    run_within_deadline,
+)
+from salesgpt.metrics import get_app_metrics, instrument_app
+from salesgpt.sessions import (
+    SessionStore,
+    run_periodically,
+    session_store_settings,
+    session_sweep_interval,
+)
+from salesgpt.turns import SessionBusyError, TurnSerializer, request_fingerprint, turn_serializer_settings
+from starlette.concurrency import run_in_threadpool
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -137,12 +168,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+install_readiness(app, readiness)
+
 # Mount static files directory
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
-# Initialize session storage for conversations
-sessions: Dict[str, SalesGPTClass] = {}
-conversation_history: Dict[str, List[Dict[str, str]]] = {}
+class AppSession:
+    """An agent and the chat history the API keeps for it."""
+
+    def __init__(self, session_id: str, agent_id: Optional[int], agent, history: Optional[List[Dict[str, str]]] = None):
+        self.session_id = session_id
+        self.agent_id = agent_id
+        self.agent = agent
+        self.history = history if history is not None else []
+
+
+def dump_session(session: AppSession) -> Dict:
+    """History plus stage only: the agent itself is rebuilt from its config."""
+    return {
+        "session_id": session.session_id,
+        "agent_id": session.agent_id,
+        "history": session.history,
+        "agent_history": getattr(session.agent, "conversation_history", None),
+        "stage": getattr(session.agent, "conversation_stage_id", None),
+    }
+
+
+def load_session(cache_key: str, state: Dict) -> AppSession:
+    agent = create_agent(state["session_id"], state.get("agent_id"))
+    if state.get("agent_history") is not None and hasattr(agent, "conversation_history"):
+        agent.conversation_history = state["agent_history"]
+    if state.get("stage") is not None and hasattr(agent, "conversation_stage_id"):
+        agent.conversation_stage_id = state["stage"]
+        if hasattr(agent, "retrieve_conversation_stage"):
+            agent.current_conversation_stage = agent.retrieve_conversation_stage(state["stage"])
+    return AppSession(state["session_id"], state.get("agent_id"), agent, state.get("history", []))
+
+
+# Bounded session storage: idle and least recently used conversations spill to disk
+metrics = get_app_metrics()
+sessions: SessionStore = SessionStore(
+    dump=dump_session, load=load_session, metrics=metrics, **session_store_settings()
+)
+if sessions.tier is not None:
+    metrics.spilled_sessions.set_function(lambda: len(sessions.tier))
+
+# One turn at a time per session; duplicate retries share the in-flight reply
+turns = TurnSerializer(metrics=metrics, **turn_serializer_settings())
+
+# Prometheus-style /metrics: per-route latency, TTS latency and size, sessions, loop lag
+instrument_app(app, metrics=metrics, active_sessions=lambda: len(sessions))
+
+# Shared cap on concurrent LLM and TTS work, with priority classes and load shedding
+admission = install_admission_control(app)
+
+# Per-request deadlines from X-Request-Timeout (or REQUEST_TIMEOUT), answered with 504
+install_deadlines(app, metrics=metrics, **deadline_settings())
 
 # Define request/response models
 class ChatRequest(BaseModel):
@@ -164,14 +245,8 @@ class VoiceResponse(BaseModel):
     audio_url: str = Field(..., description="URL to the generated audio file")
 
 # Helper functions
-def get_or_create_agent(session_id: str, agent_id: Optional[int] = None) -> SalesGPTClass:
-    """Get an existing agent or create a new one for the session."""
-    # Create a composite key that includes the agent_id if provided
-    cache_key = f"{session_id}_{agent_id}" if agent_id else session_id
-    
-    if cache_key in sessions:
-        return sessions[cache_key]
-    
+def create_agent(session_id: str, agent_id: Optional[int] = None) -> SalesGPTClass:
+    """Create a new agent for the session."""
     if not SalesGPTClass:
         raise HTTPException(status_code=503, detail="SalesGPT agent is not available")
     
@@ -194,22 +269,28 @@ def get_or_create_agent(session_id: str, agent_id: Optional[int] = None) -> Sale
         }
         
         logger.info(f"Creating new agent for session {session_id} with agent_id {agent_id}")
-        agent = SalesGPTClass(**config)
-        sessions[cache_key] = agent
-        conversation_history[cache_key] = []
-        
-        return agent
+        return SalesGPTClass(**config)
     except Exception as e:
         logger.error(f"Error creating SalesGPT agent: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to create sales agent: {str(e)}")
 
+def get_or_create_session(session_id: str, agent_id: Optional[int] = None) -> AppSession:
+    """Get an existing session, rehydrating it if it was spilled, or create a new one."""
+    # Create a composite key that includes the agent_id if provided
+    cache_key = f"{session_id}_{agent_id}" if agent_id else session_id
+    return sessions.get_or_create(
+        cache_key, lambda key: AppSession(session_id, agent_id, create_agent(session_id, agent_id))
+    )
+
 def generate_audio(text: str, session_id: str) -> Optional[str]:
-    """Generate audio from text using ElevenLabs helper module."""
+    """Generate audio from text using ElevenLabs helper module, within the request's deadline."""
     # Use the helper module's is_available() function 
     if not is_available():
         logger.warning("ElevenLabs not available for voice synthesis")
         return None
-    
+
+    # Raises DeadlineExceeded rather than starting synthesis nobody will wait for
+    timeout = bounded_timeout(what="speech synthesis")
     try:
         # Create filename with session_id for organization
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
@@ -218,15 +299,18 @@ def generate_audio(text: str, session_id: str) -> Optional[str]:
         
         # Use the helper module to generate speech
         logger.info(f"Generating speech with text: {text[:50]}...")
+        started = time.monotonic()
         audio = generate_speech(
             text=text,
             voice_name="Matthew",  # Match the voice used in TwiML for consistency
-            model="eleven_monolingual_v1"
+            model="eleven_monolingual_v1",
+            timeout=timeout,
         )
         
         if audio is None:
             logger.error("Failed to generate audio with elevenlabs_helper")
             return None
+        metrics.observe_tts("elevenlabs", time.monotonic() - started, len(audio))
             
         # Save the audio to a file
         success = save_speech(audio, str(filepath))
@@ -255,7 +339,8 @@ async def root():
         "endpoints": [
             "/chat - Chat with the sales agent",
             "/voice - Generate voice for a message",
-            "/health - Health check"
+            "/health - Health check",
+            "/metrics - Prometheus metrics"
         ]
     }
 
@@ -271,6 +356,9 @@ async def health_check():
         "salesgpt_available": SalesGPTClass is not None,
         "elevenlabs_available": elevenlabs_status,
         "active_sessions": len(sessions),
+        "sessions": sessions.stats(),
+        "turns": turns.stats(),
+        "admission": admission.stats(),
         "elevenlabs_api_key": os.getenv("ELEVENLABS_API_KEY") is not None
     }
     return status
@@ -335,8 +423,8 @@ async def elevenlabs_test():
         }
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Process a chat message and return the agent's response."""
+async def chat(request: ChatRequest, http_request: Request):
+    """Process a chat message and return the agent's response, cancelling it if the client leaves."""
     session_id = request.session_id
     human_message = request.message
     agent_id = request.agent_id
@@ -344,48 +432,63 @@ async def chat(request: ChatRequest):
     # Log the request for debugging
     logger.info(f"Chat request received: session_id={session_id}, agent_id={agent_id}, message={human_message[:30]}...")
     
-    try:
-        # Get or create the agent for this session with the specified agent_id
-        agent = get_or_create_agent(session_id, agent_id)
-        
-        # Create a composite key for conversation history that includes agent_id
-        history_key = f"{session_id}_{agent_id}" if agent_id else session_id
+    # Create a composite key for the session and its audio files that includes agent_id
+    history_key = f"{session_id}_{agent_id}" if agent_id else session_id
+
+    async def take_turn() -> ChatResponse:
+        # Get or create the session for this conversation with the specified agent_id
+        session = await run_in_threadpool(get_or_create_session, session_id, agent_id)
+        agent = session.agent
         
         # Update conversation history
-        if history_key not in conversation_history:
-            conversation_history[history_key] = []
-        
-        conversation_history[history_key].append({
+        session.history.append({
             "role": "user",
             "content": human_message
         })
         
-        # Get response from agent
+        # Get response from agent, off the event loop now that turns are serialized
         logger.info(f"Getting response from agent for session {session_id} with agent_id {agent_id}")
-        response = agent.step(human_message)
+        try:
+            async with admission.slot():
+                response = await run_in_threadpool(agent.step, human_message)
+        except (asyncio.CancelledError, AdmissionRejected):
+            # Abandoned before a reply: don't leave the message unanswered in the history
+            session.history.pop()
+            raise
         logger.info(f"Agent response: {response[:50]}...")
         
-        conversation_history[history_key].append({
+        session.history.append({
             "role": "assistant",
             "content": response
         })
         
         # Generate audio for the response
         logger.info(f"Generating audio for response in session {session_id}")
-        audio_url = generate_audio(response, history_key)
+        async with admission.slot():
+            audio_url = await run_in_threadpool(generate_audio, response, history_key)
         
         return ChatResponse(
             session_id=session_id,
             response=response,
             audio_url=audio_url
         )
+
+    try:
+        turn = turns.run(history_key, take_turn, fingerprint=request_fingerprint(human_message))
+        return await cancel_on_disconnect(
+            http_request, run_within_deadline(turn, "chat turn"), metrics=metrics
+        )
+    except SessionBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except (AdmissionRejected, DeadlineExceeded, ClientDisconnected):
+        raise
     except Exception as e:
         logger.error(f"Error in chat: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
 @app.post("/voice", response_model=VoiceResponse)
-async def voice(request: VoiceRequest):
-    """Generate voice for a given text message."""
+async def voice(request: VoiceRequest, http_request: Request):
+    """Generate voice for a given text message, cancelling it if the client leaves."""
     if not is_available():
         raise HTTPException(status_code=503, detail="Voice synthesis is not available")
     
@@ -396,16 +499,32 @@ async def voice(request: VoiceRequest):
         # Use agent_id in the key if provided
         history_key = f"{request.session_id}_{request.agent_id}" if request.agent_id else request.session_id
         
-        audio_url = generate_audio(request.message, history_key)
+        async def synthesize() -> Optional[str]:
+            async with admission.slot():
+                return await run_in_threadpool(generate_audio, request.message, history_key)
+
+        audio_url = await cancel_on_disconnect(
+            http_request, run_within_deadline(synthesize(), "speech synthesis"), metrics=metrics
+        )
         
         if not audio_url:
             raise HTTPException(status_code=500, detail="Failed to generate audio")
         
         return VoiceResponse(audio_url=audio_url)
+    except (AdmissionRejected, DeadlineExceeded, ClientDisconnected):
+        raise
     except Exception as e:
         logger.error(f"Error generating voice: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating voice: {str(e)}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Spill live sessions so conversations survive a restart."""
+    expiry = getattr(app.state, "session_expiry", None)
+    if expiry is not None:
+        expiry.cancel()
+    sessions.spill_all()
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize the application on startup."""
@@ -414,6 +533,15 @@ async def startup_event():
     # Check for required API keys
     if not os.getenv("OPENAI_API_KEY"):
         logger.warning("No OpenAI API key found. Some functionality may be limited.")
+    # Idle sessions are spilled and stale spilled ones deleted, so neither grows unbounded.
+    app.state.session_expiry = asyncio.ensure_future(
+        run_periodically(sessions.expire, session_sweep_interval())
+    )
+    # Everything is imported eagerly here, so the server is ready once it starts.
+    readiness.mark_ready()
+
+
+readiness.imports_finished()
 
 if __name__ == "__main__":
     # Run the server
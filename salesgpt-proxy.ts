@@ -8,6 +8,7 @@
 
 import express from 'express';
 import { spawn } from 'child_process';
+import http from 'http';
 import { createProxyMiddleware } from 'http-proxy-middleware';
 import path from 'path';
 import fs from 'fs';
@@ -17,8 +18,42 @@ const router = express.Router();
 // Configuration
 const SALESGPT_PORT = 3001; // The port the SalesGPT FastAPI will run on
 const SALESGPT_ENDPOINT = `http://localhost:${SALESGPT_PORT}`;
+// How long the proxy waits for SalesGPT. Python is told a slightly shorter deadline
+// (X-Request-Timeout) so it gives up, and stops spending provider quota, first.
+const SALESGPT_TIMEOUT_MS = Number(process.env.SALESGPT_TIMEOUT_MS || 60000);
+const SALESGPT_DEADLINE_MARGIN_MS = 1000;
+// How long to wait for SalesGPT's /ready probe after spawning it, and how often to poll.
+const SALESGPT_STARTUP_TIMEOUT_MS = Number(process.env.SALESGPT_STARTUP_TIMEOUT_MS || 60000);
+const SALESGPT_READY_POLL_MS = 250;
 let serverProcess: any = null;
 
+// Resolves true once GET /ready answers 200, false if that takes longer than timeoutMs
+const waitUntilReady = (timeoutMs: number): Promise<boolean> => {
+  const startedAt = Date.now();
+  return new Promise((resolve) => {
+    const poll = () => {
+      const retry = () => {
+        if (Date.now() - startedAt >= timeoutMs) {
+          resolve(false);
+        } else {
+          setTimeout(poll, SALESGPT_READY_POLL_MS);
+        }
+      };
+      const req = http.get(`${SALESGPT_ENDPOINT}/ready`, (res) => {
+        res.resume();
+        if (res.statusCode === 200) {
+          resolve(true);
+        } else {
+          retry();
+        }
+      });
+      req.setTimeout(SALESGPT_READY_POLL_MS * 4, () => req.destroy());
+      req.on('error', retry);
+    };
+    poll();
+  });
+};
+
 // Function to start the SalesGPT server
 const startSalesGPTServer = () => {
   if (serverProcess) {
@@ -57,12 +92,14 @@ const startSalesGPTServer = () => {
     serverProcess = null;
   });
 
-  // Give the server some time to start
-  return new Promise((resolve) => {
-    setTimeout(() => {
-      console.log('SalesGPT server should be ready now');
-      resolve(true);
-    }, 5000);
+  // Wait for the server to bind and finish warming up instead of guessing a delay
+  return waitUntilReady(SALESGPT_STARTUP_TIMEOUT_MS).then((ready) => {
+    if (ready) {
+      console.log('SalesGPT server is ready');
+    } else {
+      console.error(`SalesGPT server not ready after ${SALESGPT_STARTUP_TIMEOUT_MS}ms`);
+    }
+    return ready;
   });
 };
 
@@ -99,10 +136,20 @@ const ensureServerRunning = async (req: express.Request, res: express.Response,
 const proxyMiddleware = createProxyMiddleware({
   target: SALESGPT_ENDPOINT,
   changeOrigin: true,
+  proxyTimeout: SALESGPT_TIMEOUT_MS,
+  timeout: SALESGPT_TIMEOUT_MS,
   pathRewrite: {
     '^/api/salesgpt': '', // Remove the /api/salesgpt prefix when forwarding
   },
   onProxyReq: (proxyReq, req, res) => {
+    const deadlineMs = Math.max(SALESGPT_TIMEOUT_MS - SALESGPT_DEADLINE_MARGIN_MS, 1000);
+    proxyReq.setHeader('X-Request-Timeout', String(deadlineMs / 1000));
+    // Closing the upstream socket when the browser leaves lets Python cancel the turn.
+    req.on('close', () => {
+      if (!res.writableEnded) {
+        proxyReq.destroy();
+      }
+    });
     // Log the request details
     if (req.body) {
       console.log(`[SalesGPT Proxy] Forwarding request to ${req.url}:`, req.body);